@@ -13,27 +13,43 @@ Highlights:
 - Duplicate checks:
   - DB-level: UNIQUE(dedupe_key) + UPSERT
   - Python-level: seen sets to avoid repeated inserts in a run
-- SQLite tuning PRAGMAs + per-server commit
+- SQLite tuning PRAGMAs + dedicated writer thread (bounded queue, batched
+  title upserts, in-memory dedupe_key -> id map, large transactions)
 - Optional skip live channels (default ON)
 - Optional only keep TMDB-matched titles (default OFF)
+- Persistent TMDB cache (SQLite, TTL per popular page) + in-memory match index
+  tolerant to year suffixes, language prefixes and quality tags
+- Per-server content fingerprints (servers.content_hash): unchanged VOD/series/live
+  catalogs skip all category/stream upserts, only last_checked is bumped; VOD/series
+  fingerprints also cover the TMDB cache and matching settings
 - Truncate plot to keep DB size small
 
 Env vars:
   MAX_WORKERS=20
   SKIP_LIVE=1
   TMDB_PAGES=5
+  TMDB_CACHE_FILE=_tools/tmdb_cache.db
+  TMDB_TTL_HOURS=72    (refetch a cached popular page after this age)
   PLOT_MAXLEN=200
   ONLY_TMDB_MATCHED=0
   REBUILD_DB=0  (set to 1 to delete DB and recreate fresh; useful once after schema changes)
+  WRITER_QUEUE_SIZE=8  (fetched servers waiting for the writer; bounds memory)
+  COMMIT_EVERY=50      (servers per write transaction)
+  FORCE_FULL=0         (set to 1 to ignore content fingerprints and rewrite every catalog)
 """
 
+import hashlib
+import json
 import os
+import queue
 import sqlite3
+import threading
+import time
 import requests
 import re
 from urllib.parse import urlparse, parse_qs
 import concurrent.futures
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 # ---------------- CONFIG ----------------
 XC_FILE_URL = "https://raw.githubusercontent.com/staycanuca/hub/refs/heads/main/_tools/xc.txt"
@@ -47,13 +63,44 @@ TIMEOUT = 10
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", "20"))
 SKIP_LIVE = os.getenv("SKIP_LIVE", "1") == "1"
 TMDB_PAGES = int(os.getenv("TMDB_PAGES", "5"))
+TMDB_CACHE_FILE = os.getenv(
+    "TMDB_CACHE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tmdb_cache.db")
+)
+TMDB_TTL = int(os.getenv("TMDB_TTL_HOURS", "72")) * 3600
+# Items not seen on any popular page for this long are dropped from the cache
+TMDB_RETENTION = 30 * 24 * 3600
 PLOT_MAXLEN = int(os.getenv("PLOT_MAXLEN", "200"))
 ONLY_TMDB_MATCHED = os.getenv("ONLY_TMDB_MATCHED", "0") == "1"
 REBUILD_DB = os.getenv("REBUILD_DB", "0") == "1"
+WRITER_QUEUE_SIZE = int(os.getenv("WRITER_QUEUE_SIZE", "8"))
+COMMIT_EVERY = int(os.getenv("COMMIT_EVERY", "50"))
+FORCE_FULL = os.getenv("FORCE_FULL", "0") == "1"
+SQL_IN_CHUNK = 500
 
 HEADERS = {"User-Agent": "VLC/3.0.20 (Windows; x86_64)"}
 
-TMDB_CACHE = {"movies": {}, "series": {}}
+# Quality / release tags and language markers stripped before TMDB matching
+RELEASE_TAGS = {
+    "4k", "uhd", "fhd", "hd", "sd", "hq", "lq", "hdr", "hdr10", "sdr", "dv", "imax",
+    "480p", "576p", "720p", "1080p", "1080i", "2160p", "x264", "x265", "h264", "h265", "hevc",
+    "webrip", "webdl", "web", "bluray", "bdrip", "brrip", "dvdrip", "hdrip", "hdtv", "cam", "ts",
+    "remux", "extended", "remastered", "unrated", "directors", "cut", "multi", "sub", "subs",
+    "subbed", "dub", "dubbed", "vostfr", "vf", "vo", "dual", "audio", "nf", "amzn",
+}
+LANGUAGE_TAGS = {
+    "en", "eng", "us", "uk", "ro", "rom", "fr", "de", "ger", "it", "ita", "es", "esp", "spa",
+    "pt", "br", "nl", "pl", "tr", "ru", "ar", "hu", "gr", "bg", "al", "ex", "yu", "in", "hi",
+    "latino", "lat",
+}
+LEADING_ARTICLES = {"the", "a", "an"}
+YEAR_RE = re.compile(r"(?:^|[\s(\[\-._])((?:19|20)\d{2})(?:[\s)\]\-._]|$)")
+BRACKET_PREFIX_RE = re.compile(r"^\s*[\[|(]\s*[A-Za-z0-9+ ]{1,12}\s*[\]|)]\s*")
+WORD_PREFIX_RE = re.compile(r"^\s*([A-Za-z]{2,4})\s*[:|-]\s*")
+
+TMDB_CACHE = {}  # {"movies": TmdbMatchIndex, "series": TmdbMatchIndex}, filled by pre_fetch_tmdb_popular
+TMDB_CACHE_VERSION = ""  # per-kind item count + newest fetch time, set by pre_fetch_tmdb_popular
+# Bump when match_key / TMDB matching rules change, so stored catalog hashes stop matching
+MATCH_RULES_VERSION = "2"
 
 
 # ---------------- UTILS ----------------
@@ -93,12 +140,32 @@ def fetch_json(url: str, timeout: int = TIMEOUT):
     return r.json()
 
 
-def fetch_list(url: str) -> list:
-    try:
-        data = fetch_json(url)
-        return data if isinstance(data, list) else []
-    except Exception:
-        return []
+def fetch_catalog(base: str, categories_action: str, streams_action: str) -> Tuple[list, list, Optional[str]]:
+    """
+    Fetch categories + streams for one content type and fingerprint the raw payloads.
+    The hash is None when either request failed, so a partial catalog is never
+    recorded as "unchanged".
+    """
+    digest = hashlib.sha1()
+    lists = []
+    ok = True
+    for action in (categories_action, streams_action):
+        try:
+            r = requests.get(f"{base}&action={action}", headers=HEADERS, timeout=TIMEOUT)
+            r.raise_for_status()
+            data = r.json()
+        except Exception:
+            lists.append([])
+            ok = False
+            continue
+        if not isinstance(data, list):
+            lists.append([])
+            ok = False
+            continue
+        digest.update(r.content)
+        digest.update(b"\0")
+        lists.append(data)
+    return lists[0], lists[1], (digest.hexdigest() if ok else None)
 
 
 def make_dedupe_key(tmdb_id: Optional[int], name_norm: str, year: Optional[int]) -> str:
@@ -145,6 +212,8 @@ def connect_db_live():
         )
     """)
 
+    ensure_content_hash_column(cur)
+
     # Categories (per server)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS categories (
@@ -211,6 +280,8 @@ def connect_db_movies():
         )
     """)
 
+    ensure_content_hash_column(cur)
+
     # Categories (per server)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS categories (
@@ -297,6 +368,8 @@ def connect_db_series():
         )
     """)
 
+    ensure_content_hash_column(cur)
+
     # Categories (per server)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS categories (
@@ -381,30 +454,235 @@ def parse_servers_from_url():
 
 
 # ---------------- TMDB CACHE ----------------
+def _is_marker_case(raw: str) -> bool:
+    """Tags are written "4K" / "EN" / "x265"; a Capitalised word belongs to the title."""
+    return not (raw[:1].isupper() and not raw.isupper())
+
+
+def match_key(name: str) -> Tuple[str, Optional[int]]:
+    """
+    Reduce a provider stream name to (token key, year).
+
+    Release and language tags are only dropped from the tail (and a language
+    tag from the head) when written like a tag, and never down to an empty key:
+
+    >>> match_key("RO | The Matrix (1999) [4K HEVC]")
+    ('matrix', 1999)
+    >>> match_key("|EN| Dune Part Two 2024 MULTI-SUB")
+    ('dune part two', 2024)
+    >>> match_key("Us (2019)"), match_key("It"), match_key("Let Me In")
+    (('us', 2019), ('it', None), ('let me in', None))
+    >>> match_key("Cut Throat City"), match_key("Hi-Fi"), match_key("TS Eliot")
+    (('cut throat city', None), ('hi fi', None), ('ts eliot', None))
+    >>> match_key("The Cut 1080p x265"), match_key("EN The Matrix")
+    (('cut', None), ('matrix', None))
+    """
+    if not name:
+        return "", None
+
+    text = name.strip()
+    # Leading "RO - ", "|EN|", "[4K]" style markers (repeatable)
+    for _ in range(3):
+        m = BRACKET_PREFIX_RE.match(text)
+        if not m:
+            m = WORD_PREFIX_RE.match(text)
+            # "RO - Title" / "EN: Title", but keep "Dune: Part Two" and "Hi-Fi"
+            if m and not (_is_marker_case(m.group(1))
+                          and (m.group(1).lower() in LANGUAGE_TAGS or m.group(1).isupper())):
+                m = None
+        if not m:
+            break
+        text = text[m.end():]
+
+    year = None
+    years = YEAR_RE.findall(text)
+    if years:
+        # Only a year after the title counts, so titles like "1917" or "2012" survive
+        idx = text.rfind(years[-1])
+        if idx > 0:
+            year = int(years[-1])
+            text = text[:idx]
+
+    raw = re.sub(r"[^\w\s]", " ", text).split()
+    tokens = [t.lower() for t in raw]
+    all_caps = text.isupper()
+
+    def tail_is_tag():
+        if not (tokens[-1] in RELEASE_TAGS or tokens[-1] in LANGUAGE_TAGS) or not _is_marker_case(raw[-1]):
+            return False
+        # Keep at least one real title word ("The Cut" must not become "the")
+        return len(tokens) > 2 or (len(tokens) == 2 and tokens[0] not in LEADING_ARTICLES)
+
+    while tokens and tail_is_tag():
+        tokens.pop()
+        raw.pop()
+    # "EN The Matrix"; in all-caps names case can't tell "IT CHAPTER TWO" from a tag
+    while len(tokens) > 1 and tokens[0] in LANGUAGE_TAGS and raw[0].isupper() and not all_caps:
+        tokens.pop(0)
+        raw.pop(0)
+    if len(tokens) > 1 and tokens[0] in LEADING_ARTICLES:
+        tokens.pop(0)
+    # "Matrix, The"
+    if len(tokens) > 1 and tokens[-1] in LEADING_ARTICLES:
+        tokens.pop()
+    return " ".join(tokens), year
+
+
+class TmdbMatchIndex:
+    """Precomputed (token key -> TMDB items) index with a per-run memo of stream-name lookups."""
+
+    def __init__(self, date_key: str):
+        self.date_key = date_key
+        self.by_key: Dict[str, List[dict]] = {}
+        self.by_sorted: Dict[str, List[dict]] = {}
+        self._memo: Dict[str, Optional[dict]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(items) for items in self.by_key.values())
+
+    def add(self, item: dict, *titles: str):
+        year = safe_year(item.get(self.date_key))
+        item["_year"] = year
+        for title in titles:
+            key, _ = match_key(title)
+            if not key:
+                continue
+            bucket = self.by_key.setdefault(key, [])
+            if all(existing.get("id") != item.get("id") for existing in bucket):
+                bucket.append(item)
+            sorted_key = " ".join(sorted(key.split()))
+            bucket = self.by_sorted.setdefault(sorted_key, [])
+            if all(existing.get("id") != item.get("id") for existing in bucket):
+                bucket.append(item)
+
+    @staticmethod
+    def _pick(candidates: List[dict], year: Optional[int]) -> Optional[dict]:
+        if not candidates:
+            return None
+        if year is not None:
+            close = [c for c in candidates if c.get("_year") is not None and abs(c["_year"] - year) <= 1]
+            if close:
+                return max(close, key=lambda c: c.get("popularity") or 0)
+            # A different, known year means a different title (remake etc.)
+            if all(c.get("_year") is not None for c in candidates):
+                return None
+        return max(candidates, key=lambda c: c.get("popularity") or 0)
+
+    def match(self, name: str) -> Optional[dict]:
+        with self._lock:
+            if name in self._memo:
+                return self._memo[name]
+
+        key, year = match_key(name)
+        found = None
+        if key:
+            found = self._pick(self.by_key.get(key, []), year)
+            if found is None and " " in key:
+                found = self._pick(self.by_sorted.get(" ".join(sorted(key.split())), []), year)
+
+        with self._lock:
+            self._memo[name] = found
+        return found
+
+
+def open_tmdb_cache():
+    conn = sqlite3.connect(TMDB_CACHE_FILE)
+    cur = conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA synchronous=NORMAL;")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tmdb_items (
+            kind TEXT NOT NULL,
+            tmdb_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            fetched_at INTEGER NOT NULL,
+            PRIMARY KEY(kind, tmdb_id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tmdb_pages (
+            kind TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            fetched_at INTEGER NOT NULL,
+            PRIMARY KEY(kind, page)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_tmdb_items_fetched ON tmdb_items(fetched_at);")
+    conn.commit()
+    return conn
+
+
+def refresh_tmdb_page(cur, kind: str, endpoint: str, page: int, now: int) -> bool:
+    """Fetch one popular page into the cache when its copy is older than TMDB_TTL."""
+    cur.execute("SELECT fetched_at FROM tmdb_pages WHERE kind=? AND page=?", (kind, page))
+    row = cur.fetchone()
+    if row and now - row[0] < TMDB_TTL:
+        return False
+
+    try:
+        data = fetch_json(f"https://api.themoviedb.org/3/{endpoint}/popular?api_key={TMDB_API_KEY}&page={page}")
+    except Exception:
+        return False
+
+    items = [item for item in data.get("results", []) if item.get("id") is not None]
+    cur.executemany(
+        """
+        INSERT INTO tmdb_items (kind, tmdb_id, payload, fetched_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(kind, tmdb_id) DO UPDATE SET payload=excluded.payload, fetched_at=excluded.fetched_at
+        """,
+        [(kind, int(item["id"]), json.dumps(item, separators=(",", ":")), now) for item in items],
+    )
+    cur.execute(
+        "INSERT OR REPLACE INTO tmdb_pages (kind, page, fetched_at) VALUES (?, ?, ?)",
+        (kind, page, now),
+    )
+    return True
+
+
 def pre_fetch_tmdb_popular(pages: int = TMDB_PAGES):
-    if not TMDB_API_KEY:
-        print("TMDB key missing; skipping TMDB cache.")
-        return
+    TMDB_CACHE["movies"] = TmdbMatchIndex("release_date")
+    TMDB_CACHE["series"] = TmdbMatchIndex("first_air_date")
 
-    print(f"Pre-fetching TMDB popular lists (pages={pages})...")
-    for page in range(1, pages + 1):
-        try:
-            m = fetch_json(f"https://api.themoviedb.org/3/movie/popular?api_key={TMDB_API_KEY}&page={page}")
-            for item in m.get("results", []):
-                norm = normalize_name(item.get("title", ""))
-                if norm:
-                    TMDB_CACHE["movies"][norm] = item
-        except Exception:
-            pass
+    try:
+        conn = open_tmdb_cache()
+    except sqlite3.Error as e:
+        print(f"TMDB cache unavailable ({e}); matching disabled.")
+        return
 
+    cur = conn.cursor()
+    now = int(time.time())
+
+    if TMDB_API_KEY:
+        print(f"Refreshing TMDB popular lists (pages={pages}, ttl={TMDB_TTL // 3600}h)...")
+        fetched = 0
+        for page in range(1, pages + 1):
+            fetched += refresh_tmdb_page(cur, "movies", "movie", page, now)
+            fetched += refresh_tmdb_page(cur, "series", "tv", page, now)
+        cur.execute("DELETE FROM tmdb_items WHERE fetched_at < ?", (now - TMDB_RETENTION,))
+        conn.commit()
+        print(f"TMDB pages fetched from network: {fetched}")
+    else:
+        print("TMDB key missing; using cached TMDB data only.")
+
+    global TMDB_CACHE_VERSION
+    cur.execute("SELECT kind, COUNT(*), MAX(fetched_at) FROM tmdb_items GROUP BY kind ORDER BY kind")
+    TMDB_CACHE_VERSION = ";".join(f"{kind}:{count}:{newest}" for kind, count, newest in cur.fetchall())
+
+    cur.execute("SELECT kind, payload FROM tmdb_items")
+    for kind, payload in cur.fetchall():
         try:
-            s = fetch_json(f"https://api.themoviedb.org/3/tv/popular?api_key={TMDB_API_KEY}&page={page}")
-            for item in s.get("results", []):
-                norm = normalize_name(item.get("name", ""))
-                if norm:
-                    TMDB_CACHE["series"][norm] = item
-        except Exception:
-            pass
+            item = json.loads(payload)
+        except ValueError:
+            continue
+        index = TMDB_CACHE.get(kind)
+        if index is None:
+            continue
+        if kind == "movies":
+            index.add(item, item.get("title", ""), item.get("original_title", ""))
+        else:
+            index.add(item, item.get("name", ""), item.get("original_name", ""))
+    conn.close()
 
     print(f"TMDB cache: movies={len(TMDB_CACHE['movies'])} series={len(TMDB_CACHE['series'])}")
 
@@ -423,13 +701,12 @@ def validate_and_fetch_server(server_data):
 
         user_info = auth["user_info"]
 
-        cats_live = [] if SKIP_LIVE else fetch_list(f"{base}&action=get_live_categories")
-        cats_vod = fetch_list(f"{base}&action=get_vod_categories")
-        cats_series = fetch_list(f"{base}&action=get_series_categories")
-
-        live = [] if SKIP_LIVE else fetch_list(f"{base}&action=get_live_streams")
-        vods = fetch_list(f"{base}&action=get_vod_streams")
-        series = fetch_list(f"{base}&action=get_series")
+        if SKIP_LIVE:
+            cats_live, live, hash_live = [], [], None
+        else:
+            cats_live, live, hash_live = fetch_catalog(base, "get_live_categories", "get_live_streams")
+        cats_vod, vods, hash_vod = fetch_catalog(base, "get_vod_categories", "get_vod_streams")
+        cats_series, series, hash_series = fetch_catalog(base, "get_series_categories", "get_series")
 
         return {
             "status": "success",
@@ -437,6 +714,7 @@ def validate_and_fetch_server(server_data):
             "info": user_info,
             "categories": {"live": cats_live, "movie": cats_vod, "series": cats_series},
             "streams": {"live": live, "movie": vods, "series": series},
+            "hashes": {"live": hash_live, "movie": hash_vod, "series": hash_series},
         }
     except Exception as e:
         return {"status": "failed", "server": server_data, "error": str(e)}
@@ -471,408 +749,473 @@ def upsert_server(cur, s_data, info) -> Tuple[int, str]:
     return server_id, server_name
 
 
-def upsert_movie_title(
-    cur,
-    *,
-    tmdb_id: Optional[int],
-    name: str,
-    name_norm: str,
-    year: Optional[int],
-    plot: Optional[str],
-    rating: Optional[float],
-    popularity: Optional[float],
-    vote_count: Optional[int],
-    release_date: Optional[str],
-) -> int:
-    dedupe_key = make_dedupe_key(tmdb_id, name_norm, year)
-    cur.execute(
-        """
-        INSERT INTO movie_titles
-        (dedupe_key, tmdb_id, name, name_normalized, year, plot, rating, popularity, vote_count, release_date, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-        ON CONFLICT(dedupe_key) DO UPDATE SET
-            tmdb_id=excluded.tmdb_id,
-            name=excluded.name,
-            name_normalized=excluded.name_normalized,
-            year=excluded.year,
-            plot=excluded.plot,
-            rating=excluded.rating,
-            popularity=excluded.popularity,
-            vote_count=excluded.vote_count,
-            release_date=excluded.release_date,
-            updated_at=excluded.updated_at
-        """,
-        (dedupe_key, tmdb_id, name, name_norm, year, plot, rating, popularity, vote_count, release_date),
-    )
-    cur.execute("SELECT id FROM movie_titles WHERE dedupe_key=?", (dedupe_key,))
-    return cur.fetchone()[0]
-
-
-def upsert_series_title(
-    cur,
-    *,
-    tmdb_id: Optional[int],
-    name: str,
-    name_norm: str,
-    year: Optional[int],
-    plot: Optional[str],
-    rating: Optional[float],
-    popularity: Optional[float],
-    vote_count: Optional[int],
-    first_air_date: Optional[str],
-) -> int:
-    dedupe_key = make_dedupe_key(tmdb_id, name_norm, year)
-    cur.execute(
-        """
-        INSERT INTO series_titles
-        (dedupe_key, tmdb_id, name, name_normalized, year, plot, rating, popularity, vote_count, first_air_date, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-        ON CONFLICT(dedupe_key) DO UPDATE SET
-            tmdb_id=excluded.tmdb_id,
-            name=excluded.name,
-            name_normalized=excluded.name_normalized,
-            year=excluded.year,
-            plot=excluded.plot,
-            rating=excluded.rating,
-            popularity=excluded.popularity,
-            vote_count=excluded.vote_count,
-            first_air_date=excluded.first_air_date,
-            updated_at=excluded.updated_at
-        """,
-        (dedupe_key, tmdb_id, name, name_norm, year, plot, rating, popularity, vote_count, first_air_date),
-    )
-    cur.execute("SELECT id FROM series_titles WHERE dedupe_key=?", (dedupe_key,))
-    return cur.fetchone()[0]
+def ensure_content_hash_column(cur):
+    """servers.content_hash was added after the first releases; migrate existing DBs in place."""
+    cur.execute("PRAGMA table_info(servers)")
+    if "content_hash" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE servers ADD COLUMN content_hash TEXT")
 
 
-# ---------------- MAIN ----------------
-def main():
-    # Connect to all 3 databases
-    conn_live = connect_db_live()
-    conn_movies = connect_db_movies()
-    conn_series = connect_db_series()
-    
-    cur_live = conn_live.cursor()
-    cur_movies = conn_movies.cursor()
-    cur_series = conn_series.cursor()
+def catalog_hash(payload_hash: Optional[str], content_type: str) -> Optional[str]:
+    """
+    Fingerprint stored for a catalog: the raw payload hash, plus (for movies and
+    series) everything else the written rows depend on - the TMDB cache contents,
+    the matching rules and ONLY_TMDB_MATCHED / PLOT_MAXLEN. A TMDB refresh or a
+    settings change then re-matches titles of otherwise unchanged catalogs.
+    """
+    if not payload_hash or content_type == "live":
+        return payload_hash
+    extra = f"{TMDB_CACHE_VERSION}|{MATCH_RULES_VERSION}|{int(ONLY_TMDB_MATCHED)}|{PLOT_MAXLEN}"
+    return hashlib.sha1(f"{payload_hash}|{extra}".encode("utf-8")).hexdigest()
+
+
+def load_content_hashes(cur) -> Dict[Tuple[str, str], Optional[str]]:
+    cur.execute("SELECT server_url, username, content_hash FROM servers")
+    return {(url, user): content_hash for url, user, content_hash in cur.fetchall()}
+
+
+def store_content_hash(cur, server_id: int, content_hash: Optional[str]):
+    cur.execute("UPDATE servers SET content_hash=? WHERE id=?", (content_hash, server_id))
+
+
+MOVIE_TITLE_UPSERT_SQL = """
+    INSERT INTO movie_titles
+    (dedupe_key, tmdb_id, name, name_normalized, year, plot, rating, popularity, vote_count, release_date, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(dedupe_key) DO UPDATE SET
+        tmdb_id=excluded.tmdb_id,
+        name=excluded.name,
+        name_normalized=excluded.name_normalized,
+        year=excluded.year,
+        plot=excluded.plot,
+        rating=excluded.rating,
+        popularity=excluded.popularity,
+        vote_count=excluded.vote_count,
+        release_date=excluded.release_date,
+        updated_at=excluded.updated_at
+"""
 
-    servers_to_check = parse_servers_from_url()
-    pre_fetch_tmdb_popular()
+SERIES_TITLE_UPSERT_SQL = """
+    INSERT INTO series_titles
+    (dedupe_key, tmdb_id, name, name_normalized, year, plot, rating, popularity, vote_count, first_air_date, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(dedupe_key) DO UPDATE SET
+        tmdb_id=excluded.tmdb_id,
+        name=excluded.name,
+        name_normalized=excluded.name_normalized,
+        year=excluded.year,
+        plot=excluded.plot,
+        rating=excluded.rating,
+        popularity=excluded.popularity,
+        vote_count=excluded.vote_count,
+        first_air_date=excluded.first_air_date,
+        updated_at=excluded.updated_at
+"""
 
-    print(
-        f"Starting parallel validation of {len(servers_to_check)} servers "
-        f"(workers={MAX_WORKERS}, skip_live={int(SKIP_LIVE)}, only_tmdb={int(ONLY_TMDB_MATCHED)}, plot_maxlen={PLOT_MAXLEN}, rebuild_db={int(REBUILD_DB)})"
-    )
+CATEGORY_UPSERT_SQL = """
+    INSERT INTO categories (category_id, server_id, category_name, content_type, updated_at)
+    VALUES (?, ?, ?, ?, datetime('now'))
+    ON CONFLICT(category_id, server_id, content_type) DO UPDATE SET
+        category_name=excluded.category_name,
+        updated_at=excluded.updated_at
+"""
 
-    # Python-level dedupe during this run (cuts repeated work)
-    seen_movie_titles = set()   # dedupe_key
-    seen_series_titles = set()  # dedupe_key
 
-    valid_count = 0
-    total_movie_streams = 0
-    total_series_streams = 0
-    total_live = 0
+def load_title_ids(cur, table: str) -> Dict[str, int]:
+    """Load the full dedupe_key -> id map once, so title ids never need a SELECT per stream."""
+    cur.execute(f"SELECT dedupe_key, id FROM {table}")
+    return {key: title_id for key, title_id in cur.fetchall()}
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(validate_and_fetch_server, s): s for s in servers_to_check}
 
-        for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
-            res = future.result()
-            s_data = res["server"]
+def fetch_title_ids(cur, table: str, keys: List[str], title_ids: Dict[str, int]):
+    """Fill title_ids for freshly inserted keys (chunked IN queries)."""
+    for start in range(0, len(keys), SQL_IN_CHUNK):
+        chunk = keys[start : start + SQL_IN_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        cur.execute(f"SELECT dedupe_key, id FROM {table} WHERE dedupe_key IN ({placeholders})", chunk)
+        for key, title_id in cur.fetchall():
+            title_ids[key] = title_id
 
-            if res["status"] != "success":
-                print(f"[{i}/{len(servers_to_check)}] ❌ {s_data['url']} ({res['status']})")
-                continue
 
-            valid_count += 1
-            
-            # Upsert server in all 3 databases
-            server_id_live, server_name = upsert_server(cur_live, s_data, res["info"])
-            server_id_movies, _ = upsert_server(cur_movies, s_data, res["info"])
-            server_id_series, _ = upsert_server(cur_series, s_data, res["info"])
-
-            # Categories - Live DB
-            if not SKIP_LIVE and res["categories"]["live"]:
-                cat_batch_live = [(c.get("category_id"), server_id_live, c.get("category_name"), "live") for c in res["categories"]["live"]]
-                if cat_batch_live:
-                    cur_live.executemany(
-                        """
-                        INSERT INTO categories (category_id, server_id, category_name, content_type, updated_at)
-                        VALUES (?, ?, ?, ?, datetime('now'))
-                        ON CONFLICT(category_id, server_id, content_type) DO UPDATE SET
-                            category_name=excluded.category_name,
-                            updated_at=excluded.updated_at
-                        """,
-                        cat_batch_live,
-                    )
-
-            # Categories - Movies DB
-            if res["categories"]["movie"]:
-                cat_batch_movies = [(c.get("category_id"), server_id_movies, c.get("category_name"), "movie") for c in res["categories"]["movie"]]
-                if cat_batch_movies:
-                    cur_movies.executemany(
-                        """
-                        INSERT INTO categories (category_id, server_id, category_name, content_type, updated_at)
-                        VALUES (?, ?, ?, ?, datetime('now'))
-                        ON CONFLICT(category_id, server_id, content_type) DO UPDATE SET
-                            category_name=excluded.category_name,
-                            updated_at=excluded.updated_at
-                        """,
-                        cat_batch_movies,
-                    )
-
-            # Categories - Series DB
-            if res["categories"]["series"]:
-                cat_batch_series = [(c.get("category_id"), server_id_series, c.get("category_name"), "series") for c in res["categories"]["series"]]
-                if cat_batch_series:
-                    cur_series.executemany(
-                        """
-                        INSERT INTO categories (category_id, server_id, category_name, content_type, updated_at)
-                        VALUES (?, ?, ?, ?, datetime('now'))
-                        ON CONFLICT(category_id, server_id, content_type) DO UPDATE SET
-                            category_name=excluded.category_name,
-                            updated_at=excluded.updated_at
-                        """,
-                        cat_batch_series,
-                    )
-
-            # Movies: upsert titles + upsert streams (movies DB)
-            movie_stream_batch = []
-            for m in res["streams"]["movie"]:
-                name = m.get("name") or ""
-                if not name:
-                    continue
-                name_norm = normalize_name(name)
-                tmdb = TMDB_CACHE["movies"].get(name_norm)
-                if ONLY_TMDB_MATCHED and not tmdb:
-                    continue
+def to_float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "", "N/A") else None
+    except Exception:
+        return None
 
-                tmdb_id = (tmdb or {}).get("id")
-                release_date = (tmdb or {}).get("release_date") or m.get("releaseDate")
-                year = safe_year(release_date)
-                plot = safe_trunc((tmdb or {}).get("overview") or m.get("plot"), PLOT_MAXLEN)
 
-                rating = (tmdb or {}).get("vote_average") or m.get("rating")
-                try:
-                    rating_f = float(rating) if rating not in (None, "", "N/A") else None
-                except Exception:
-                    rating_f = None
+def to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except Exception:
+        return None
 
-                popularity = (tmdb or {}).get("popularity")
-                try:
-                    pop_f = float(popularity) if popularity is not None else None
-                except Exception:
-                    pop_f = None
 
-                vote_count = (tmdb or {}).get("vote_count")
-                try:
-                    vc_i = int(vote_count) if vote_count is not None else None
-                except Exception:
-                    vc_i = None
-
-                dedupe_key = make_dedupe_key(tmdb_id, name_norm, year)
-
-                if dedupe_key in seen_movie_titles:
-                    cur_movies.execute("SELECT id FROM movie_titles WHERE dedupe_key=?", (dedupe_key,))
-                    row = cur_movies.fetchone()
-                    title_id = row[0] if row else upsert_movie_title(
-                        cur_movies,
-                        tmdb_id=int(tmdb_id) if tmdb_id is not None else None,
-                        name=name, name_norm=name_norm, year=year, plot=plot,
-                        rating=rating_f, popularity=pop_f, vote_count=vc_i,
-                        release_date=release_date
-                    )
-                else:
-                    seen_movie_titles.add(dedupe_key)
-                    title_id = upsert_movie_title(
-                        cur_movies,
-                        tmdb_id=int(tmdb_id) if tmdb_id is not None else None,
-                        name=name, name_norm=name_norm, year=year, plot=plot,
-                        rating=rating_f, popularity=pop_f, vote_count=vc_i,
-                        release_date=release_date
-                    )
-
-                stream_id = m.get("stream_id")
-                if stream_id is None:
-                    continue
+def build_title_row(item: dict, tmdb: Optional[dict], date_key: str) -> Tuple[str, tuple]:
+    """Return (dedupe_key, upsert params) for a VOD/series entry."""
+    tmdb = tmdb or {}
+    name = item.get("name") or ""
+    name_norm = normalize_name(name)
 
-                movie_stream_batch.append(
-                    (
-                        server_id_movies,
-                        int(stream_id),
-                        title_id,
-                        m.get("stream_icon"),
-                        m.get("container_extension"),
-                    )
-                )
+    tmdb_id = tmdb.get("id")
+    tmdb_id = int(tmdb_id) if tmdb_id is not None else None
+    date_value = tmdb.get(date_key) or item.get("releaseDate")
+    year = safe_year(date_value)
+    plot = safe_trunc(tmdb.get("overview") or item.get("plot"), PLOT_MAXLEN)
 
-            if movie_stream_batch:
-                cur_movies.executemany(
-                    """
-                    INSERT INTO movie_streams
-                    (server_id, stream_id, title_id, stream_icon, container_extension, updated_at)
-                    VALUES (?, ?, ?, ?, ?, datetime('now'))
-                    ON CONFLICT(server_id, stream_id) DO UPDATE SET
-                        title_id=excluded.title_id,
-                        stream_icon=excluded.stream_icon,
-                        container_extension=excluded.container_extension,
-                        updated_at=excluded.updated_at
-                    """,
-                    movie_stream_batch,
-                )
-                total_movie_streams += len(movie_stream_batch)
+    dedupe_key = make_dedupe_key(tmdb_id, name_norm, year)
+    params = (
+        dedupe_key,
+        tmdb_id,
+        name,
+        name_norm,
+        year,
+        plot,
+        to_float(tmdb.get("vote_average") or item.get("rating")),
+        to_float(tmdb.get("popularity")),
+        to_int(tmdb.get("vote_count")),
+        date_value,
+    )
+    return dedupe_key, params
 
-            # Series: upsert titles + upsert streams (series DB)
-            series_stream_batch = []
-            for s in res["streams"]["series"]:
-                name = s.get("name") or ""
-                if not name:
-                    continue
-                name_norm = normalize_name(name)
-                tmdb = TMDB_CACHE["series"].get(name_norm)
-                if ONLY_TMDB_MATCHED and not tmdb:
-                    continue
 
-                tmdb_id = (tmdb or {}).get("id")
-                first_air = (tmdb or {}).get("first_air_date") or s.get("releaseDate")
-                year = safe_year(first_air)
-                plot = safe_trunc((tmdb or {}).get("overview") or s.get("plot"), PLOT_MAXLEN)
+class TitleStore:
+    """Batched title upserts for one titles table with an in-memory id map."""
 
-                rating = (tmdb or {}).get("vote_average") or s.get("rating")
-                try:
-                    rating_f = float(rating) if rating not in (None, "", "N/A") else None
-                except Exception:
-                    rating_f = None
+    def __init__(self, cur, table: str, upsert_sql: str):
+        self.cur = cur
+        self.table = table
+        self.upsert_sql = upsert_sql
+        self.title_ids = load_title_ids(cur, table)
+        # Python-level dedupe during this run (each title upserted once per run)
+        self.seen = set()
 
-                popularity = (tmdb or {}).get("popularity")
-                try:
-                    pop_f = float(popularity) if popularity is not None else None
-                except Exception:
-                    pop_f = None
+    def resolve(self, rows: Iterable[Tuple[str, tuple]]) -> Dict[str, int]:
+        pending = {}
+        for dedupe_key, params in rows:
+            if dedupe_key not in self.seen and dedupe_key not in pending:
+                pending[dedupe_key] = params
 
-                vote_count = (tmdb or {}).get("vote_count")
+        if pending:
+            self.cur.executemany(self.upsert_sql, list(pending.values()))
+            self.seen.update(pending)
+            missing = [key for key in pending if key not in self.title_ids]
+            if missing:
+                fetch_title_ids(self.cur, self.table, missing, self.title_ids)
+
+        return self.title_ids
+
+
+class DbWriter:
+    """
+    Single writer stage: owns the 3 SQLite connections and consumes fetched
+    server results from a bounded queue, so network workers never wait on SQLite
+    and SQLite never waits on the network except when the queue is empty.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, WRITER_QUEUE_SIZE))
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.error: Optional[BaseException] = None
+
+        self.valid_count = 0
+        self.unchanged_catalogs = 0
+        self.total_movie_streams = 0
+        self.total_series_streams = 0
+        self.total_live = 0
+        self._pending_servers = 0
+
+    def start(self):
+        self.thread.start()
+
+    def put(self, index: int, res: dict):
+        if self.error is not None:
+            raise RuntimeError("DB writer stopped") from self.error
+        self.queue.put((index, res))
+
+    def finish(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise RuntimeError("DB writer failed") from self.error
+
+    # ---- writer thread ----
+    def _open(self):
+        self.conn_live = connect_db_live()
+        self.conn_movies = connect_db_movies()
+        self.conn_series = connect_db_series()
+        self.cur_live = self.conn_live.cursor()
+        self.cur_movies = self.conn_movies.cursor()
+        self.cur_series = self.conn_series.cursor()
+        self.movie_titles = TitleStore(self.cur_movies, "movie_titles", MOVIE_TITLE_UPSERT_SQL)
+        self.series_titles = TitleStore(self.cur_series, "series_titles", SERIES_TITLE_UPSERT_SQL)
+        self.content_hashes = {
+            "live": load_content_hashes(self.cur_live),
+            "movie": load_content_hashes(self.cur_movies),
+            "series": load_content_hashes(self.cur_series),
+        }
+        print(
+            f"Writer ready: movie_titles={len(self.movie_titles.title_ids)} "
+            f"series_titles={len(self.series_titles.title_ids)}"
+        )
+
+    def _commit(self):
+        self.conn_live.commit()
+        self.conn_movies.commit()
+        self.conn_series.commit()
+        self._pending_servers = 0
+
+    def _run(self):
+        try:
+            self._open()
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                index, res = item
+                self._write_server(index, res)
+                self._pending_servers += 1
+                if self._pending_servers >= max(1, COMMIT_EVERY):
+                    self._commit()
+            self._commit()
+            self._close()
+        except BaseException as e:
+            self.error = e
+            print(f"DB writer error: {e}")
+            # Keep draining so producers blocked on put() can finish.
+            while True:
                 try:
-                    vc_i = int(vote_count) if vote_count is not None else None
-                except Exception:
-                    vc_i = None
-
-                dedupe_key = make_dedupe_key(tmdb_id, name_norm, year)
-
-                if dedupe_key in seen_series_titles:
-                    cur_series.execute("SELECT id FROM series_titles WHERE dedupe_key=?", (dedupe_key,))
-                    row = cur_series.fetchone()
-                    title_id = row[0] if row else upsert_series_title(
-                        cur_series,
-                        tmdb_id=int(tmdb_id) if tmdb_id is not None else None,
-                        name=name, name_norm=name_norm, year=year, plot=plot,
-                        rating=rating_f, popularity=pop_f, vote_count=vc_i,
-                        first_air_date=first_air
-                    )
-                else:
-                    seen_series_titles.add(dedupe_key)
-                    title_id = upsert_series_title(
-                        cur_series,
-                        tmdb_id=int(tmdb_id) if tmdb_id is not None else None,
-                        name=name, name_norm=name_norm, year=year, plot=plot,
-                        rating=rating_f, popularity=pop_f, vote_count=vc_i,
-                        first_air_date=first_air
-                    )
-
-                series_id = s.get("series_id")
-                if series_id is None:
+                    if self.queue.get(timeout=1) is None:
+                        break
+                except queue.Empty:
                     continue
 
-                series_stream_batch.append(
-                    (
-                        server_id_series,
-                        int(series_id),
-                        title_id,
-                        s.get("cover"),
-                    )
+    def _close(self):
+        # Optional vacuum for size (can take time on big db; keep it if size is priority)
+        for conn, name in [
+            (self.conn_live, DB_FILE_LIVE),
+            (self.conn_movies, DB_FILE_MOVIES),
+            (self.conn_series, DB_FILE_SERIES),
+        ]:
+            try:
+                cur = conn.cursor()
+                cur.execute("VACUUM;")
+                conn.commit()
+                print(f"Vacuumed {name}")
+            except Exception as e:
+                print(f"Vacuum failed for {name}: {e}")
+
+        self.conn_live.close()
+        self.conn_movies.close()
+        self.conn_series.close()
+
+    def _write_categories(self, cur, server_id: int, categories: list, content_type: str):
+        batch = [(c.get("category_id"), server_id, c.get("category_name"), content_type) for c in categories]
+        if batch:
+            cur.executemany(CATEGORY_UPSERT_SQL, batch)
+
+    def _write_movies(self, server_id: int, streams: list) -> int:
+        rows = []
+        for m in streams:
+            if not m.get("name"):
+                continue
+            tmdb = TMDB_CACHE["movies"].match(m["name"]) if TMDB_CACHE else None
+            if ONLY_TMDB_MATCHED and not tmdb:
+                continue
+            rows.append((m, build_title_row(m, tmdb, "release_date")))
+
+        title_ids = self.movie_titles.resolve(row for _, row in rows)
+
+        batch = []
+        for m, (dedupe_key, _) in rows:
+            stream_id = m.get("stream_id")
+            if stream_id is None:
+                continue
+            batch.append(
+                (
+                    server_id,
+                    int(stream_id),
+                    title_ids[dedupe_key],
+                    m.get("stream_icon"),
+                    m.get("container_extension"),
                 )
+            )
 
-            if series_stream_batch:
-                cur_series.executemany(
-                    """
-                    INSERT INTO series_streams
-                    (server_id, series_id, title_id, cover, updated_at)
-                    VALUES (?, ?, ?, ?, datetime('now'))
-                    ON CONFLICT(server_id, series_id) DO UPDATE SET
-                        title_id=excluded.title_id,
-                        cover=excluded.cover,
-                        updated_at=excluded.updated_at
-                    """,
-                    series_stream_batch,
+        if batch:
+            self.cur_movies.executemany(
+                """
+                INSERT INTO movie_streams
+                (server_id, stream_id, title_id, stream_icon, container_extension, updated_at)
+                VALUES (?, ?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(server_id, stream_id) DO UPDATE SET
+                    title_id=excluded.title_id,
+                    stream_icon=excluded.stream_icon,
+                    container_extension=excluded.container_extension,
+                    updated_at=excluded.updated_at
+                """,
+                batch,
+            )
+        return len(batch)
+
+    def _write_series(self, server_id: int, streams: list) -> int:
+        rows = []
+        for s in streams:
+            if not s.get("name"):
+                continue
+            tmdb = TMDB_CACHE["series"].match(s["name"]) if TMDB_CACHE else None
+            if ONLY_TMDB_MATCHED and not tmdb:
+                continue
+            rows.append((s, build_title_row(s, tmdb, "first_air_date")))
+
+        title_ids = self.series_titles.resolve(row for _, row in rows)
+
+        batch = []
+        for s, (dedupe_key, _) in rows:
+            series_id = s.get("series_id")
+            if series_id is None:
+                continue
+            batch.append((server_id, int(series_id), title_ids[dedupe_key], s.get("cover")))
+
+        if batch:
+            self.cur_series.executemany(
+                """
+                INSERT INTO series_streams
+                (server_id, series_id, title_id, cover, updated_at)
+                VALUES (?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(server_id, series_id) DO UPDATE SET
+                    title_id=excluded.title_id,
+                    cover=excluded.cover,
+                    updated_at=excluded.updated_at
+                """,
+                batch,
+            )
+        return len(batch)
+
+    def _write_live(self, server_id: int, streams: list) -> int:
+        batch = []
+        for l in streams:
+            name = l.get("name") or ""
+            stream_id = l.get("stream_id")
+            if not name or stream_id is None:
+                continue
+            batch.append(
+                (
+                    server_id,
+                    int(stream_id),
+                    name,
+                    l.get("category_id"),
+                    l.get("stream_icon"),
+                    l.get("epg_channel_id"),
                 )
-                total_series_streams += len(series_stream_batch)
-
-            # Live (optional)
-            if not SKIP_LIVE:
-                live_batch = []
-                for l in res["streams"]["live"]:
-                    name = l.get("name") or ""
-                    stream_id = l.get("stream_id")
-                    if not name or stream_id is None:
-                        continue
-                    live_batch.append(
-                        (
-                            server_id_live,
-                            int(stream_id),
-                            name,
-                            l.get("category_id"),
-                            l.get("stream_icon"),
-                            l.get("epg_channel_id"),
-                        )
-                    )
-                if live_batch:
-                    cur_live.executemany(
-                        """
-                        INSERT INTO live_channels
-                        (server_id, stream_id, name, category_id, stream_icon, epg_channel_id, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
-                        ON CONFLICT(server_id, stream_id) DO UPDATE SET
-                            name=excluded.name,
-                            category_id=excluded.category_id,
-                            stream_icon=excluded.stream_icon,
-                            epg_channel_id=excluded.epg_channel_id,
-                            updated_at=excluded.updated_at
-                        """,
-                        live_batch,
-                    )
-                    total_live += len(live_batch)
-
-            # Commit all databases
-            conn_live.commit()
-            conn_movies.commit()
-            conn_series.commit()
-
-            print(
-                f"[{i}/{len(servers_to_check)}] ✅ {server_name} | "
-                f"movie_streams+{len(movie_stream_batch)} series_streams+{len(series_stream_batch)}"
-                + (" live(skipped)" if SKIP_LIVE else f" live+{len(res['streams']['live'])}")
             )
+        if batch:
+            self.cur_live.executemany(
+                """
+                INSERT INTO live_channels
+                (server_id, stream_id, name, category_id, stream_icon, epg_channel_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(server_id, stream_id) DO UPDATE SET
+                    name=excluded.name,
+                    category_id=excluded.category_id,
+                    stream_icon=excluded.stream_icon,
+                    epg_channel_id=excluded.epg_channel_id,
+                    updated_at=excluded.updated_at
+                """,
+                batch,
+            )
+        return len(batch)
+
+    def _write_server(self, index: int, res: dict):
+        s_data = res["server"]
+        self.valid_count += 1
+
+        # Upsert server in all 3 databases
+        server_id_live, server_name = upsert_server(self.cur_live, s_data, res["info"])
+        server_id_movies, _ = upsert_server(self.cur_movies, s_data, res["info"])
+        server_id_series, _ = upsert_server(self.cur_series, s_data, res["info"])
+
+        hashes = res.get("hashes") or {}
+        server_key = (s_data["url"], s_data["user"])
+        targets = {
+            "live": (self.cur_live, server_id_live, self._write_live),
+            "movie": (self.cur_movies, server_id_movies, self._write_movies),
+            "series": (self.cur_series, server_id_series, self._write_series),
+        }
+        counts = {"live": 0, "movie": 0, "series": 0}
+        unchanged = []
 
-    # Optional vacuum for size (can take time on big db; keep it if size is priority)
-    for conn, name in [(conn_live, DB_FILE_LIVE), (conn_movies, DB_FILE_MOVIES), (conn_series, DB_FILE_SERIES)]:
-        try:
-            cur = conn.cursor()
-            cur.execute("VACUUM;")
-            conn.commit()
-            print(f"Vacuumed {name}")
-        except Exception as e:
-            print(f"Vacuum failed for {name}: {e}")
+        for content_type, (cur, server_id, write_streams) in targets.items():
+            if content_type == "live" and SKIP_LIVE:
+                continue
+            new_hash = catalog_hash(hashes.get(content_type), content_type)
+            old_hash = self.content_hashes[content_type].get(server_key)
+            if new_hash and new_hash == old_hash and not FORCE_FULL:
+                unchanged.append(content_type)
+                continue
+
+            self._write_categories(cur, server_id, res["categories"][content_type], content_type)
+            counts[content_type] = write_streams(server_id, res["streams"][content_type])
+            store_content_hash(cur, server_id, new_hash)
+            self.content_hashes[content_type][server_key] = new_hash
+
+        self.unchanged_catalogs += len(unchanged)
+        movie_count, series_count, live_count = counts["movie"], counts["series"], counts["live"]
+
+        self.total_movie_streams += movie_count
+        self.total_series_streams += series_count
+        self.total_live += live_count
+
+        print(
+            f"[{index}/{self.total}] ✅ {server_name} | "
+            f"movie_streams+{movie_count} series_streams+{series_count}"
+            + (" live(skipped)" if SKIP_LIVE else f" live+{live_count}")
+            + (f" unchanged={','.join(unchanged)}" if unchanged else "")
+        )
 
-    conn_live.close()
-    conn_movies.close()
-    conn_series.close()
+
+# ---------------- MAIN ----------------
+def main():
+    servers_to_check = parse_servers_from_url()
+    pre_fetch_tmdb_popular()
+
+    print(
+        f"Starting parallel validation of {len(servers_to_check)} servers "
+        f"(workers={MAX_WORKERS}, skip_live={int(SKIP_LIVE)}, only_tmdb={int(ONLY_TMDB_MATCHED)}, plot_maxlen={PLOT_MAXLEN}, rebuild_db={int(REBUILD_DB)}, "
+        f"commit_every={COMMIT_EVERY}, force_full={int(FORCE_FULL)})"
+    )
+
+    writer = DbWriter(len(servers_to_check))
+    writer.start()
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(validate_and_fetch_server, s): s for s in servers_to_check}
+
+            for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                res = future.result()
+                s_data = res["server"]
+
+                if res["status"] != "success":
+                    print(f"[{i}/{len(servers_to_check)}] ❌ {s_data['url']} ({res['status']})")
+                    continue
+
+                # Blocks when the writer falls behind (bounded queue = bounded memory)
+                writer.put(i, res)
+    finally:
+        writer.finish()
 
     print("=" * 70)
     print("BUILD COMPLETE: 3 Database files created")
     print(f"  - {DB_FILE_LIVE}")
     print(f"  - {DB_FILE_MOVIES}")
     print(f"  - {DB_FILE_SERIES}")
-    print(f"Valid Servers: {valid_count}/{len(servers_to_check)}")
-    print(f"Movie streams: {total_movie_streams} | Series streams: {total_series_streams} | Live: {total_live}")
+    print(f"Valid Servers: {writer.valid_count}/{len(servers_to_check)}")
+    print(f"Unchanged catalogs skipped: {writer.unchanged_catalogs}")
+    print(
+        f"Movie streams: {writer.total_movie_streams} | Series streams: {writer.total_series_streams} | "
+        f"Live: {writer.total_live}"
+    )
     print("=" * 70)
 
 
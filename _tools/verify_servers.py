@@ -3,9 +3,12 @@ import hashlib
 import os
 import re
 import sys
+import threading
 import time
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
+from urllib.parse import urlparse
 
 import requests
 
@@ -49,6 +52,35 @@ SERVERS_URL = os.environ.get(
 OUTPUT_FILE = os.environ.get("OUTPUT_FILE", "servers.json")
 GITHUB_OUTPUT = os.environ.get("GITHUB_OUTPUT")
 
+# Concurrency: cate servere se verifica in paralel, cate MAC-uri simultan pe
+# acelasi host si termenul global dupa care nu mai pornim verificari noi.
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "16"))
+MACS_PER_HOST = int(os.environ.get("MACS_PER_HOST", "4"))
+GLOBAL_DEADLINE = float(os.environ.get("VERIFY_DEADLINE", "3000"))
+
+# Registrul local de verificari: MAC-urile confirmate recent nu se mai
+# reverifica, iar cele care pica repetat sunt amanate exponential.
+LEDGER_FILE = os.environ.get(
+    "VERIFY_LEDGER",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "verify_ledger.json"),
+)
+FRESH_WINDOW = float(os.environ.get("VERIFY_FRESH_WINDOW", str(12 * 3600)))
+BACKOFF_BASE = float(os.environ.get("VERIFY_BACKOFF_BASE", str(6 * 3600)))
+BACKOFF_MAX = float(os.environ.get("VERIFY_BACKOFF_MAX", str(7 * 24 * 3600)))
+LEDGER_RETENTION = 30 * 24 * 3600
+
+_thread_state = threading.local()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "macs_checked": 0,
+    "macs_valid": 0,
+    "macs_cached": 0,
+    "portals_dead": 0,
+    "skipped": 0,
+}
+
 
 def build_session():
     session = requests.Session()
@@ -56,6 +88,153 @@ def build_session():
     return session
 
 
+def get_thread_session():
+    session = getattr(_thread_state, "session", None)
+    if session is None:
+        session = build_session()
+        _thread_state.session = session
+    return session
+
+
+def host_slot(url):
+    host = (urlparse(url).hostname or url).lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(max(1, MACS_PER_HOST))
+            _host_slots[host] = slot
+    return slot
+
+
+def bump_stat(key, amount=1):
+    with _stats_lock:
+        _stats[key] = _stats.get(key, 0) + amount
+
+
+class VerificationLedger:
+    """Rezultatele verificarilor anterioare, pe portal si pe portal + MAC."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.macs = {}
+        self.portals = {}
+        self.load()
+
+    @staticmethod
+    def mac_key(portal_url, mac):
+        return f"{portal_url.rstrip('/').lower()}|{mac}"
+
+    @staticmethod
+    def portal_key(portal_url):
+        return portal_url.rstrip("/").lower()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict):
+            self.macs = data.get("macs") or {}
+            self.portals = data.get("portals") or {}
+
+    def save(self):
+        if not self.path:
+            return
+        cutoff = time.time() - LEDGER_RETENTION
+        with self.lock:
+            data = {
+                "macs": {
+                    key: entry
+                    for key, entry in self.macs.items()
+                    if entry.get("checked", 0) >= cutoff
+                },
+                "portals": {
+                    key: entry
+                    for key, entry in self.portals.items()
+                    if entry.get("checked", 0) >= cutoff
+                },
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get_mac(self, portal_url, mac):
+        with self.lock:
+            return self.macs.get(self.mac_key(portal_url, mac))
+
+    def cached_result(self, portal_url, mac, now=None):
+        """True/False daca rezultatul anterior e inca valabil, altfel None."""
+        entry = self.get_mac(portal_url, mac)
+        if not entry:
+            return None
+        now = now or time.time()
+        if entry.get("ok"):
+            if now - entry.get("checked", 0) < FRESH_WINDOW:
+                return True
+            return None
+        if now < entry.get("next_check", 0):
+            return False
+        return None
+
+    def priority(self, portal_url, mac):
+        """Cheie de sortare: intai MAC-urile bune/necunoscute, apoi cele care pica."""
+        entry = self.get_mac(portal_url, mac)
+        if not entry:
+            return (1, 0)
+        if entry.get("ok"):
+            return (0, -entry.get("checked", 0))
+        return (2, entry.get("fails", 0))
+
+    def record_mac(self, portal_url, mac, portal_path):
+        now = time.time()
+        key = self.mac_key(portal_url, mac)
+        with self.lock:
+            previous = self.macs.get(key) or {}
+            if portal_path:
+                self.macs[key] = {"ok": True, "path": portal_path, "checked": now, "fails": 0}
+                return
+            fails = int(previous.get("fails", 0)) + 1
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (fails - 1)))
+            self.macs[key] = {
+                "ok": False,
+                "path": previous.get("path"),
+                "checked": now,
+                "fails": fails,
+                "next_check": now + backoff,
+            }
+
+    def portal_paths(self, portal_url):
+        with self.lock:
+            entry = self.portals.get(self.portal_key(portal_url))
+        if entry and time.time() - entry.get("checked", 0) < FRESH_WINDOW:
+            return tuple(entry.get("paths") or ()) or None
+        return None
+
+    def record_portal_paths(self, portal_url, paths):
+        with self.lock:
+            self.portals[self.portal_key(portal_url)] = {
+                "paths": list(paths),
+                "checked": time.time(),
+            }
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.started = time.monotonic()
+        self.expires = self.started + seconds if seconds > 0 else None
+
+    def expired(self):
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
 def normalize_mac(mac):
     if not isinstance(mac, str):
         return None
@@ -200,6 +379,18 @@ def detect_portal_paths(base_url):
     return tuple(ordered_paths)
 
 
+def resolve_portal_paths(portal_url, ledger=None, preferred_path=None):
+    paths = ledger.portal_paths(portal_url) if ledger else None
+    if paths is None:
+        paths = detect_portal_paths(portal_url)
+        if ledger:
+            ledger.record_portal_paths(portal_url, paths)
+
+    if preferred_path and preferred_path in paths:
+        return (preferred_path, *[path for path in paths if path != preferred_path])
+    return paths
+
+
 def portal_request(session, endpoint, action, cookies, extra_headers=None, **params):
     request_headers = {}
     if extra_headers:
@@ -302,11 +493,11 @@ def has_account_evidence(account_payload):
     return False
 
 
-def check_portal(session, url):
+def check_portal(session, url, ledger=None):
     url = url.rstrip("/")
     probe_urls = [url, f"{url}/c/", f"{url}/stalker_portal/c/"]
 
-    for portal_path in detect_portal_paths(url):
+    for portal_path in resolve_portal_paths(url, ledger):
         probe_urls.append(build_endpoint(url, portal_path))
 
     seen = set()
@@ -331,7 +522,8 @@ def check_portal(session, url):
     return False
 
 
-def check_mac(session, portal_url, mac):
+def check_mac(session, portal_url, mac, ledger=None, preferred_path=None):
+    """Returneaza calea portalului pe care MAC-ul a functionat sau False."""
     normalized_mac = normalize_mac(mac)
     if not normalized_mac:
         return False
@@ -339,7 +531,7 @@ def check_mac(session, portal_url, mac):
     identity = build_device_identity(normalized_mac)
     cookies = build_cookies(normalized_mac, identity)
 
-    for portal_path in detect_portal_paths(portal_url):
+    for portal_path in resolve_portal_paths(portal_url, ledger, preferred_path):
         endpoint = build_endpoint(portal_url, portal_path)
         handshake_data, handshake_response = portal_request(
             session,
@@ -425,38 +617,113 @@ def check_mac(session, portal_url, mac):
             account_payloads.append(extract_payload(extra_data))
 
         if any(has_account_evidence(payload) for payload in account_payloads):
-            return True
+            return portal_path
 
         if has_profile_evidence(profile_payload, normalized_mac):
-            return True
+            return portal_path
 
     return False
 
 
-def verify_server(server):
+def check_mac_limited(portal_url, mac, deadline, ledger=None):
+    if ledger:
+        cached = ledger.cached_result(portal_url, mac)
+        if cached is not None:
+            bump_stat("macs_cached")
+            return cached
+
+    if deadline.expired():
+        return None
+
+    entry = ledger.get_mac(portal_url, mac) if ledger else None
+    with host_slot(portal_url):
+        if deadline.expired():
+            return None
+        portal_path = check_mac(
+            get_thread_session(),
+            portal_url,
+            mac,
+            ledger=ledger,
+            preferred_path=(entry or {}).get("path"),
+        )
+
+    if ledger:
+        ledger.record_mac(portal_url, mac, portal_path)
+
+    bump_stat("macs_checked")
+    if portal_path:
+        bump_stat("macs_valid")
+    return bool(portal_path)
+
+
+def verify_server(server, deadline, mac_pool, ledger=None):
+    """Returneaza (portal_works, valid_macs, complete).
+
+    Un portal mort nu mai trece prin verificarea MAC-urilor. Daca termenul
+    global expira inainte ca toate MAC-urile sa fie verificate, complete este
+    False si serverul trebuie pastrat neschimbat.
+    """
     portal_url = server.get("portal_url", "")
     if not portal_url:
-        return False, None
+        return False, None, True
 
-    session = build_session()
-    portal_works = check_portal(session, portal_url)
+    if deadline.expired():
+        return False, None, False
 
-    valid_macs = []
-    seen_macs = set()
+    with host_slot(portal_url):
+        portal_works = check_portal(get_thread_session(), portal_url, ledger)
 
+    if not portal_works:
+        bump_stat("portals_dead")
+        return False, None, True
+
+    macs = []
+    seen_macs = set()
     for raw_mac in server.get("macs", []):
         normalized_mac = normalize_mac(raw_mac)
         if not normalized_mac or normalized_mac in seen_macs:
             continue
-
         seen_macs.add(normalized_mac)
-        if check_mac(session, portal_url, normalized_mac):
-            valid_macs.append(normalized_mac)
+        macs.append(normalized_mac)
+
+    if ledger:
+        macs_to_check = sorted(macs, key=lambda mac: ledger.priority(portal_url, mac))
+    else:
+        macs_to_check = macs
 
+    futures = {
+        mac_pool.submit(check_mac_limited, portal_url, mac, deadline, ledger): mac
+        for mac in macs_to_check
+    }
+
+    results = {}
+    complete = True
+    for future in as_completed(futures):
+        try:
+            valid = future.result()
+        except Exception:
+            valid = False
+        if valid is None:
+            complete = False
+            continue
+        results[futures[future]] = valid
+
+    valid_macs = [mac for mac in macs if results.get(mac)]
     if not valid_macs:
-        return portal_works, None
+        return portal_works, None, complete
+
+    return portal_works, valid_macs, complete
 
-    return portal_works, valid_macs
+
+def print_progress(done, total, deadline):
+    elapsed = max(deadline.elapsed(), 0.001)
+    with _stats_lock:
+        macs_checked = _stats["macs_checked"]
+    print(
+        f"  [{done}/{total}] {elapsed:.0f}s, "
+        f"{done / elapsed:.2f} servere/s, {macs_checked / elapsed:.2f} MAC/s",
+        flush=True,
+    )
 
 
 def main():
@@ -469,28 +736,82 @@ def main():
     servers = data.get("servers", [])
     valid_servers = []
 
-    print(f"Verificare {len(servers)} servere...")
-
-    for server in servers:
-        print(f"Verificare server: {server.get('name')} - {server.get('portal_url')}")
+    print(
+        f"Verificare {len(servers)} servere "
+        f"({SERVER_WORKERS} in paralel, {MACS_PER_HOST} MAC/host, "
+        f"termen {GLOBAL_DEADLINE:.0f}s)..."
+    )
 
-        portal_works, valid_macs = verify_server(server)
-        print(f"  Portal: {'OK' if portal_works else 'FAIL'}")
+    deadline = Deadline(GLOBAL_DEADLINE)
+    ledger = VerificationLedger(LEDGER_FILE)
+    results = [None] * len(servers)
+    mac_workers = max(1, SERVER_WORKERS * MACS_PER_HOST)
+
+    with ThreadPoolExecutor(max_workers=mac_workers) as mac_pool, ThreadPoolExecutor(
+        max_workers=max(1, SERVER_WORKERS)
+    ) as server_pool:
+        futures = {
+            server_pool.submit(verify_server, server, deadline, mac_pool, ledger): index
+            for index, server in enumerate(servers)
+        }
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            server = servers[index]
+            try:
+                results[index] = future.result()
+            except Exception as exc:
+                print(f"  Eroare la {server.get('portal_url')}: {exc}")
+                results[index] = (False, None, False)
+
+            portal_works, valid_macs, complete = results[index]
+            if not complete:
+                status = "NEVERIFICAT (termen depasit)"
+            elif valid_macs is None:
+                status = "STERS"
+            else:
+                status = f"OK, {len(valid_macs)} MAC-uri valide"
+            print(
+                f"Server: {server.get('name')} - {server.get('portal_url')} | "
+                f"Portal: {'OK' if portal_works else 'FAIL'} -> {status}",
+                flush=True,
+            )
+            if done % 10 == 0 or done == len(servers):
+                print_progress(done, len(servers), deadline)
+
+    for server, (portal_works, valid_macs, complete) in zip(servers, results):
+        if not complete:
+            # Nu stergem servere doar pentru ca nu am apucat sa le verificam.
+            bump_stat("skipped")
+            valid_servers.append(server)
+            continue
 
         if valid_macs is None:
-            print("  -> Server invalid sau toate MAC-urile nefunctionale - STERS")
             continue
 
         server["macs"] = valid_macs
         valid_servers.append(server)
-        print(f"  -> Server OK, {len(valid_macs)} MAC-uri valide")
 
     data["servers"] = valid_servers
 
     with open(OUTPUT_FILE, "w") as f:
         json.dump(data, f, indent=4)
 
+    try:
+        ledger.save()
+    except OSError as exc:
+        print(f"Nu am putut salva registrul de verificari: {exc}")
+
+    elapsed = max(deadline.elapsed(), 0.001)
     print(f"\nTerminat: {len(valid_servers)}/{len(servers)} servere ramase")
+    print(
+        f"Rezumat: {_stats['macs_checked']} MAC-uri verificate "
+        f"({_stats['macs_valid']} valide, {_stats['macs_cached']} din registru) "
+        f"in {elapsed:.0f}s, "
+        f"{_stats['macs_checked'] / elapsed:.2f} MAC/s; "
+        f"{_stats['portals_dead']} portaluri moarte, "
+        f"{_stats['skipped']} servere neverificate"
+    )
 
     if GITHUB_OUTPUT:
         with open(GITHUB_OUTPUT, "a") as f:
@@ -0,0 +1,398 @@
+import time
+
+import xbmc
+
+from hublive_db import get_connection, get_profile_path
+
+
+AUTH_STORE_FILE = "auth.db"
+AUTH_TOKEN_TTL = 3600
+# The service renews tokens this long before expiry, for servers used within the idle window.
+AUTH_REFRESH_MARGIN = 600
+AUTH_REFRESH_IDLE = 1800
+_AUTH_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS server_auth(
+    server TEXT PRIMARY KEY,
+    portal_url TEXT NOT NULL,
+    token TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    random TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    last_used REAL NOT NULL,
+    refresh_requested REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS portal_online(
+    portal_url TEXT PRIMARY KEY,
+    online INTEGER NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mac_stats(
+    server TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    successes REAL NOT NULL,
+    failures REAL NOT NULL,
+    busy REAL NOT NULL,
+    latency_ms REAL,
+    last_success REAL NOT NULL DEFAULT 0,
+    last_failure REAL NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY(server, mac)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS play_stats(
+    server TEXT PRIMARY KEY,
+    plays INTEGER NOT NULL,
+    attempts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS server_latency(
+    server TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    latency_ms REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    timeouts INTEGER NOT NULL,
+    last_timeout REAL NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY(server, operation)
+) WITHOUT ROWID;
+"""
+# last_used is only rewritten when it is older than this, so warm reads stay read-only.
+_TOUCH_INTERVAL = 60
+# A refresh launched by the service gets this long before it may be requested again.
+_REFRESH_RETRY_AFTER = 120
+# MAC outcome counters halve every week so a MAC that died (or recovered) is re-ranked.
+_MAC_STATS_HALF_LIFE = 7 * 86400
+_LATENCY_SMOOTHING = 0.3
+
+
+def _store():
+    return get_connection(get_profile_path(AUTH_STORE_FILE), _AUTH_STORE_SCHEMA)
+
+
+def _log_failure(action, exc):
+    xbmc.log(f"[AuthStore] Failed to {action}: {exc}", level=xbmc.LOGWARNING)
+
+
+def load_server_auth(server):
+    """Persisted auth for a server as the in-memory cache entry shape, or {}."""
+    try:
+        row = _store().execute(
+            """
+            SELECT portal_url, token, mac, random, timestamp, last_used
+            FROM server_auth WHERE server = ?
+            """,
+            (server,),
+        ).fetchone()
+    except Exception as exc:
+        _log_failure(f"load auth for {server}", exc)
+        return {}
+    if not row:
+        return {}
+    return {
+        "portal_url": row[0],
+        "token": row[1],
+        "mac": row[2],
+        "random": row[3],
+        "timestamp": row[4],
+        "last_used": row[5],
+    }
+
+
+def save_server_auth(server, portal_url, token, mac, random_value, timestamp):
+    now = time.time()
+    try:
+        connection = _store()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO server_auth VALUES(?,?,?,?,?,?,?,0)",
+                (
+                    server,
+                    (portal_url or "").rstrip("/"),
+                    token,
+                    mac,
+                    str(random_value or "0"),
+                    float(timestamp),
+                    now,
+                ),
+            )
+    except Exception as exc:
+        _log_failure(f"save auth for {server}", exc)
+
+
+def touch_server_auth(server, last_used):
+    now = time.time()
+    if now - float(last_used or 0) < _TOUCH_INTERVAL:
+        return
+    try:
+        connection = _store()
+        with connection:
+            connection.execute(
+                "UPDATE server_auth SET last_used = ? WHERE server = ?", (now, server)
+            )
+    except Exception as exc:
+        _log_failure(f"touch auth for {server}", exc)
+
+
+def delete_server_auth(server, mac=None):
+    try:
+        connection = _store()
+        with connection:
+            if mac is None:
+                connection.execute("DELETE FROM server_auth WHERE server = ?", (server,))
+            else:
+                connection.execute(
+                    "DELETE FROM server_auth WHERE server = ? AND upper(mac) = ?",
+                    (server, (mac or "").strip().upper()),
+                )
+    except Exception as exc:
+        _log_failure(f"delete auth for {server}", exc)
+
+
+def servers_due_for_refresh(
+    token_ttl=AUTH_TOKEN_TTL,
+    refresh_margin=AUTH_REFRESH_MARGIN,
+    idle_limit=AUTH_REFRESH_IDLE,
+):
+    """
+    Servers whose token expires within refresh_margin and that were used in
+    the last idle_limit seconds. Marks them as requested so a slow refresh is
+    not launched twice.
+    """
+    now = time.time()
+    try:
+        connection = _store()
+        with connection:
+            servers = [
+                row[0]
+                for row in connection.execute(
+                    """
+                    SELECT server FROM server_auth
+                    WHERE timestamp <= ? AND timestamp > ?
+                      AND last_used >= ? AND refresh_requested <= ?
+                    """,
+                    (
+                        now - (token_ttl - refresh_margin),
+                        now - token_ttl,
+                        now - idle_limit,
+                        now - _REFRESH_RETRY_AFTER,
+                    ),
+                )
+            ]
+            connection.executemany(
+                "UPDATE server_auth SET refresh_requested = ? WHERE server = ?",
+                [(now, server) for server in servers],
+            )
+        return servers
+    except Exception as exc:
+        _log_failure("list servers due for refresh", exc)
+        return []
+
+
+def load_portal_online(portal_url, ttl):
+    """Cached reachability for a portal as {"online", "timestamp"}, or {} when stale."""
+    try:
+        row = _store().execute(
+            "SELECT online, timestamp FROM portal_online WHERE portal_url = ?",
+            (portal_url,),
+        ).fetchone()
+    except Exception as exc:
+        _log_failure(f"load portal status for {portal_url}", exc)
+        return {}
+    if not row or (time.time() - row[1]) >= ttl:
+        return {}
+    return {"online": bool(row[0]), "timestamp": row[1]}
+
+
+def save_portal_online(portal_url, online, timestamp):
+    try:
+        connection = _store()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO portal_online VALUES(?,?,?)",
+                (portal_url, 1 if online else 0, float(timestamp)),
+            )
+    except Exception as exc:
+        _log_failure(f"save portal status for {portal_url}", exc)
+
+
+def delete_portal_online(portal_url):
+    try:
+        connection = _store()
+        with connection:
+            connection.execute("DELETE FROM portal_online WHERE portal_url = ?", (portal_url,))
+    except Exception as exc:
+        _log_failure(f"delete portal status for {portal_url}", exc)
+
+
+def _decay(value, elapsed):
+    if elapsed <= 0:
+        return value
+    return value * 0.5 ** (elapsed / _MAC_STATS_HALF_LIFE)
+
+
+def record_mac_result(server, mac, success, latency=None, busy=False):
+    """Fold one auth/playback outcome into the MAC's decayed scoreboard entry."""
+    mac = (mac or "").strip().upper()
+    if not mac:
+        return
+    now = time.time()
+    try:
+        connection = _store()
+        with connection:
+            row = connection.execute(
+                """
+                SELECT successes, failures, busy, latency_ms, last_success, last_failure, updated
+                FROM mac_stats WHERE server = ? AND mac = ?
+                """,
+                (server, mac),
+            ).fetchone()
+            successes, failures, busy_count, latency_ms, last_success, last_failure, updated = (
+                row or (0.0, 0.0, 0.0, None, 0, 0, now)
+            )
+            elapsed = now - updated
+            successes = _decay(successes, elapsed)
+            failures = _decay(failures, elapsed)
+            busy_count = _decay(busy_count, elapsed)
+            if success:
+                successes += 1
+                last_success = now
+            else:
+                failures += 1
+                last_failure = now
+                if busy:
+                    busy_count += 1
+            if latency is not None:
+                sample = latency * 1000.0
+                latency_ms = (
+                    sample
+                    if latency_ms is None
+                    else latency_ms + _LATENCY_SMOOTHING * (sample - latency_ms)
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO mac_stats VALUES(?,?,?,?,?,?,?,?,?)",
+                (
+                    server,
+                    mac,
+                    successes,
+                    failures,
+                    busy_count,
+                    latency_ms,
+                    last_success,
+                    last_failure,
+                    now,
+                ),
+            )
+    except Exception as exc:
+        _log_failure(f"record MAC result for {server}", exc)
+
+
+def load_mac_stats(server):
+    """{MAC: stats dict} for a server, with counters decayed to now."""
+    try:
+        rows = _store().execute(
+            """
+            SELECT mac, successes, failures, busy, latency_ms, last_success, last_failure, updated
+            FROM mac_stats WHERE server = ?
+            """,
+            (server,),
+        ).fetchall()
+    except Exception as exc:
+        _log_failure(f"load MAC stats for {server}", exc)
+        return {}
+
+    now = time.time()
+    stats = {}
+    for mac, successes, failures, busy, latency_ms, last_success, last_failure, updated in rows:
+        elapsed = now - updated
+        stats[mac] = {
+            "successes": _decay(successes, elapsed),
+            "failures": _decay(failures, elapsed),
+            "busy": _decay(busy, elapsed),
+            "latency_ms": latency_ms,
+            "last_success": last_success,
+            "last_failure": last_failure,
+        }
+    return stats
+
+
+def record_play_attempts(server, attempts):
+    try:
+        connection = _store()
+        with connection:
+            connection.execute(
+                """
+                INSERT INTO play_stats VALUES(?, 1, ?)
+                ON CONFLICT(server) DO UPDATE SET
+                    plays = plays + 1,
+                    attempts = attempts + excluded.attempts
+                """,
+                (server, max(1, int(attempts))),
+            )
+    except Exception as exc:
+        _log_failure(f"record play attempts for {server}", exc)
+
+
+def load_play_stats():
+    """{server: (plays, average auth attempts per successful play)}."""
+    try:
+        rows = _store().execute("SELECT server, plays, attempts FROM play_stats").fetchall()
+    except Exception as exc:
+        _log_failure("load play stats", exc)
+        return {}
+    return {server: (plays, attempts / plays) for server, plays, attempts in rows if plays}
+
+
+def record_server_latency(server, operation, elapsed, timed_out=False):
+    """
+    Fold one call duration into the server's latency average for an operation.
+    `timeouts` counts consecutive deadline misses and resets on a completed call.
+    """
+    if not server:
+        return
+    now = time.time()
+    sample = float(elapsed) * 1000.0
+    try:
+        connection = _store()
+        with connection:
+            row = connection.execute(
+                """
+                SELECT latency_ms, samples, timeouts, last_timeout FROM server_latency
+                WHERE server = ? AND operation = ?
+                """,
+                (server, operation),
+            ).fetchone()
+            latency_ms, samples, timeouts, last_timeout = row or (sample, 0, 0, 0)
+            latency_ms += _LATENCY_SMOOTHING * (sample - latency_ms)
+            if timed_out:
+                timeouts += 1
+                last_timeout = now
+            else:
+                timeouts = 0
+            connection.execute(
+                "INSERT OR REPLACE INTO server_latency VALUES(?,?,?,?,?,?,?)",
+                (server, operation, latency_ms, samples + 1, timeouts, last_timeout, now),
+            )
+    except Exception as exc:
+        _log_failure(f"record latency for {server}", exc)
+
+
+def load_server_latency(operation):
+    """{server: {"latency_ms", "samples", "timeouts", "last_timeout"}} for one operation."""
+    try:
+        rows = _store().execute(
+            """
+            SELECT server, latency_ms, samples, timeouts, last_timeout
+            FROM server_latency WHERE operation = ?
+            """,
+            (operation,),
+        ).fetchall()
+    except Exception as exc:
+        _log_failure(f"load server latency for {operation}", exc)
+        return {}
+    return {
+        server: {
+            "latency_ms": latency_ms,
+            "samples": samples,
+            "timeouts": timeouts,
+            "last_timeout": last_timeout,
+        }
+        for server, latency_ms, samples, timeouts, last_timeout in rows
+    }
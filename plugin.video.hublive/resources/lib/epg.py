@@ -1,4 +1,5 @@
 # Epg.py
+import bisect
 import logging
 import time
 import math
@@ -85,6 +86,53 @@ def _truncate(s: Optional[str], max_chars: int) -> str:
     return cut + "…"
 
 
+def _dt_epoch(dt: Optional[datetime]) -> float:
+    return dt.timestamp() if isinstance(dt, datetime) else math.inf
+
+
+class EpgSchedule(list):
+    """
+    Normalized EPG items sorted by start time, with parallel start/end epoch
+    arrays so "now/next" is a bisect instead of a scan with datetime compares.
+    Items without a start time sort last.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, items=()):
+        super().__init__(sorted(items, key=lambda it: _dt_epoch(it.get("start_dt"))))
+        self.starts = [_dt_epoch(it.get("start_dt")) for it in self]
+        self.ends = [_dt_epoch(it.get("end_dt")) for it in self]
+
+    def locate(self, now_ts: Optional[float] = None) -> Tuple[Optional[int], Optional[int]]:
+        """Return (index airing now or None, index of first upcoming or None)."""
+        if not self:
+            return None, None
+        if now_ts is None:
+            now_ts = time.time()
+        pos = bisect.bisect_right(self.starts, now_ts)
+        current = None
+        if pos > 0:
+            idx = pos - 1
+            if now_ts < self.ends[idx] and self.ends[idx] != math.inf:
+                current = idx
+        upcoming = pos if pos < len(self) and self.starts[pos] != math.inf else None
+        return current, upcoming
+
+    def now_next(self, now_ts: Optional[float] = None) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        current, upcoming = self.locate(now_ts)
+        return (
+            self[current] if current is not None else None,
+            self[upcoming] if upcoming is not None else None,
+        )
+
+
+def as_schedule(items) -> "EpgSchedule":
+    if isinstance(items, EpgSchedule):
+        return items
+    return EpgSchedule(items or ())
+
+
 def _pick_current_only(items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """
     Pick exactly ONE item to display:
@@ -95,22 +143,20 @@ def _pick_current_only(items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not items:
         return None
 
-    now = datetime.now()
-    first_upcoming = None
-    last_past = None
-
-    for it in items:
-        sd = it.get("start_dt")
-        ed = it.get("end_dt")
-        if sd and ed:
-            if sd <= now < ed:
-                return it  # current
-            if now < sd and first_upcoming is None:
-                first_upcoming = it
-            if ed <= now:
-                last_past = it
+    schedule = as_schedule(items)
+    now_ts = time.time()
+    current, upcoming = schedule.locate(now_ts)
+    if current is not None:
+        return schedule[current]
+    if upcoming is not None:
+        return schedule[upcoming]
 
-    return first_upcoming or last_past or items[0]
+    # Most recent programme that already ended (ends are not monotonic, so look back)
+    pos = bisect.bisect_right(schedule.starts, now_ts)
+    for idx in range(pos - 1, -1, -1):
+        if schedule.ends[idx] <= now_ts:
+            return schedule[idx]
+    return schedule[0]
 
 
 def format_epg_tooltip(items: List[Dict[str, Any]]) -> str:
@@ -121,21 +167,12 @@ def format_epg_tooltip(items: List[Dict[str, Any]]) -> str:
     if not items:
         return "No EPG."
 
+    items = as_schedule(items)
     now = datetime.now()
 
     # Find current or next upcoming program index
-    start_index = 0
-    for i, it in enumerate(items):
-        sd = it.get("start_dt")
-        ed = it.get("end_dt")
-        if sd and ed and sd <= now < ed:
-            # Current program found
-            start_index = i
-            break
-        if sd and now < sd:
-            # Next upcoming program
-            start_index = i
-            break
+    current, upcoming = items.locate(now.timestamp())
+    start_index = current if current is not None else (upcoming or 0)
 
     # Get up to 5 programs starting from current/next
     programs_to_show = items[start_index:start_index + 5]
@@ -241,6 +278,7 @@ class EpgManager(threading.Thread):
 
     Public API:
       - request(channel_dict, size=6)
+      - request_many(channel_dicts, size=6)   # bulk feed first, per-channel fallback
       - reconfigure(mode, base_url, session, mac, token_provider)
     """
 
@@ -258,7 +296,9 @@ class EpgManager(threading.Thread):
         backoff_factor: float = 0.2,    # gentle ramp
         cache_ttl: float = 180.0,       # seconds; reuse while navigating
         max_items_default: int = 6,
-        num_workers: int = 10           # NEW: number of parallel workers
+        num_workers: int = 10,          # NEW: number of parallel workers
+        bulk_period_hours: int = 6,     # window requested from the portal-wide feed
+        bulk_min_channels: int = 8      # below this, per-channel requests are cheaper
     ):
         super().__init__()
         self.callback = callback
@@ -272,6 +312,8 @@ class EpgManager(threading.Thread):
         self.cache_ttl = float(cache_ttl)
         self.max_items_default = int(max_items_default)
         self.num_workers = num_workers
+        self.bulk_period_hours = int(bulk_period_hours)
+        self.bulk_min_channels = int(bulk_min_channels)
 
         # Queue entries: (key, channel_dict, requested_size)
         self._queue: "queue.Queue[Tuple[str, Dict[str, Any], int]]" = queue.Queue()
@@ -288,6 +330,9 @@ class EpgManager(threading.Thread):
         self._last_requested: Dict[str, float] = {}
         self._debounce_sec = 0.15
 
+        # Portals whose bulk EPG feed came back empty; they only get per-channel requests
+        self._bulk_unsupported = set()
+
         self.start()
 
 
@@ -347,14 +392,41 @@ class EpgManager(threading.Thread):
         """
         req_size = int(size or self.max_items_default)
         key = self._channel_key(channel)
-        if not key:
+        if not key or not self._should_fetch(key, req_size):
+            return
+
+        self._queue.put((key, channel, req_size))
+
+    def request_many(self, channels: List[Dict[str, Any]], size: Optional[int] = None):
+        """
+        Prefetch EPG for a whole category/portal through the bulk get_epg_info
+        feed (a few requests instead of one per channel). Channels the feed
+        does not cover are re-queued on the per-channel path.
+        """
+        req_size = int(size or self.max_items_default)
+        pending = []
+        for channel in channels:
+            key = self._channel_key(channel)
+            if key and self._should_fetch(key, req_size):
+                pending.append((key, channel))
+
+        if not pending:
+            return
+        if len(pending) < self.bulk_min_channels or self.base_url in self._bulk_unsupported:
+            for key, channel in pending:
+                self._queue.put((key, channel, req_size))
             return
 
+        # key=None marks a bulk job for the worker loop
+        self._queue.put((None, pending, req_size))
+
+    def _should_fetch(self, key: str, req_size: int) -> bool:
+        """Debounce and serve from cache; True if the channel still needs a fetch."""
         # Debounce identical rapid requests
         now = time.time()
         last = self._last_requested.get(key, 0.0)
         if (now - last) < self._debounce_sec:
-            return
+            return False
         self._last_requested[key] = now
 
         # Serve from cache if fresh & large enough
@@ -365,10 +437,9 @@ class EpgManager(threading.Thread):
                 fresh = (now - ts) <= self.cache_ttl
                 if fresh and len(cached_full) >= req_size:
                     self.callback(key, cached_full[:req_size])
-                    return
+                    return False
                 # If fresh but not enough items, we'll try to refetch below
-
-        self._queue.put((key, channel, req_size))
+        return True
 
     # ----------------- Thread loop -----------------
 
@@ -395,6 +466,42 @@ class EpgManager(threading.Thread):
         # Emit only what caller asked for
         self.callback(key, normalized_full[:req_size])
 
+    def _process_bulk(self, pending: List[Tuple[str, Dict[str, Any]]], req_size: int):
+        """Fill the cache from the portal-wide feed; queue per-channel fetches for the rest."""
+        base_url = self.base_url
+        try:
+            token, headers, cookies = self._get_auth()
+            feed = self._fetch_bulk_epg(headers, cookies)
+        except Exception as e:
+            logging.warning(f"[EPG] bulk fetch unexpected error: {e}")
+            feed = {}
+
+        if not feed:
+            logging.info(f"[EPG] Bulk EPG unavailable on {base_url}, using per-channel requests")
+            self._bulk_unsupported.add(base_url)
+
+        now = time.time()
+        missed = []
+        for key, channel in pending:
+            raw = None
+            for ch_id in (self._choose_channel_id(channel), channel.get("id")):
+                if ch_id is not None and str(ch_id) in feed:
+                    raw = feed[str(ch_id)]
+                    break
+            normalized_full = self._normalize_items(raw) if raw else None
+            if not normalized_full:
+                missed.append((key, channel))
+                continue
+            with self._cache_lock:
+                self._cache[key] = (now, normalized_full)
+            self.callback(key, normalized_full[:req_size])
+
+        logging.info(
+            f"[EPG] Bulk feed covered {len(pending) - len(missed)}/{len(pending)} channels"
+        )
+        for key, channel in missed:
+            self._queue.put((key, channel, req_size))
+
     def run(self):
         """Main worker loop with thread pool for parallel processing."""
         with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
@@ -404,8 +511,12 @@ class EpgManager(threading.Thread):
                 # Submit new tasks from queue
                 try:
                     key, channel, req_size = self._queue.get(timeout=0.1)
-                    future = executor.submit(self._process_one_channel, key, channel, req_size)
-                    futures[future] = key
+                    if key is None:
+                        future = executor.submit(self._process_bulk, channel, req_size)
+                        futures[future] = "bulk"
+                    else:
+                        future = executor.submit(self._process_one_channel, key, channel, req_size)
+                        futures[future] = key
                 except queue.Empty:
                     pass
 
@@ -546,6 +657,33 @@ class EpgManager(threading.Thread):
         items = self._extract_items(js2)
         return items
 
+    def _fetch_bulk_epg(
+        self,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Portal-wide EPG: get_epg_info with a period returns programmes for every
+        channel keyed by ch_id. Returns {ch_id: raw_items} ({} if unsupported).
+        """
+        params = {
+            "type": "itv",
+            "action": "get_epg_info",
+            "JsHttpRequest": "1-xml",
+            "period": str(max(1, self.bulk_period_hours)),
+        }
+        js = self._portal_get(params, headers, cookies)
+        data = js.get("js") if isinstance(js, dict) else None
+        if isinstance(data, dict) and isinstance(data.get("data"), dict):
+            data = data["data"]
+        if not isinstance(data, dict):
+            return {}
+        return {
+            str(ch_id): items
+            for ch_id, items in data.items()
+            if isinstance(items, list) and items
+        }
+
     # ----------------- Helpers -----------------
 
     def _extract_items(self, js: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -650,12 +788,7 @@ class EpgManager(threading.Thread):
                 "duration_min": duration_min,
             })
 
-        def _key(x):
-            dt = x.get("start_dt")
-            return dt.timestamp() if isinstance(dt, datetime) else math.inf
-
-        norm.sort(key=_key)
-        return norm
+        return EpgSchedule(norm)
 
     # -------------------------------------------------
 
@@ -1,6 +1,7 @@
 import hashlib
 import json
 import os
+import queue
 import random
 import re
 import threading
@@ -24,7 +25,9 @@ import xbmcvfs
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from epg import EpgManager
+from epg import EpgManager, as_schedule
+import auth_store
+from hublive_db import get_connection
 
 try:
     import orjson
@@ -91,6 +94,8 @@ TIMEOUTS = {
     "playprobe": 6,
     "play": 15,
 }
+# Upper bound for one round of raced handshakes, so a flaky portal cannot stall a listing.
+_AUTH_RACE_DEADLINE = TIMEOUTS["handshake"] * 2
 
 
 def _append_kodi_headers(url, mac=None, token=None, portal_url=None, random_val="0"):
@@ -156,6 +161,18 @@ EPG_CACHE_FILE = None
 DEFAULT_EPG_CACHE_TTL = 1800
 MAX_EPG_CHANNELS = 2000
 _epg_lock = threading.RLock()
+_epg_dirty_keys = set()
+_epg_evicted_dirty = {}
+_epg_store_misses = set()
+_EPG_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS epg_channels(
+    storage_key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    items TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_epg_channels_expires ON epg_channels(expires_at);
+"""
+_EPG_SQL_CHUNK = 500
 
 
 def get_epg_cache_ttl():
@@ -177,107 +194,203 @@ def get_epg_cache_file():
 
         if not os.path.exists(addon_path):
             os.makedirs(addon_path)
-        EPG_CACHE_FILE = os.path.join(addon_path, "epg_cache.json")
+        EPG_CACHE_FILE = os.path.join(addon_path, "epg_cache.db")
+        # Drop the JSON cache written by older versions.
+        legacy_file = os.path.join(addon_path, "epg_cache.json")
+        if os.path.exists(legacy_file):
+            try:
+                os.remove(legacy_file)
+            except OSError:
+                pass
     return EPG_CACHE_FILE
 
 
-def load_epg_cache():
-    cache_file = get_epg_cache_file()
-    cache_ttl = get_epg_cache_ttl()
-    try:
-        if os.path.exists(cache_file):
-            with open(cache_file, "r", encoding="utf-8") as handle:
-                cache_data = json_loads(handle)
-                current_time = time.time()
-
-                loaded_count = 0
-                for stream_id, cache_entry in cache_data.items():
-                    timestamp = cache_entry.get("timestamp", 0)
-                    if current_time - timestamp < cache_ttl:
-                        items = cache_entry.get("items", [])
-                        for item in items:
-                            if item.get("start_dt"):
-                                from datetime import datetime
-
-                                item["start_dt"] = datetime.fromisoformat(
-                                    item["start_dt"]
-                                )
-                            if item.get("end_dt"):
-                                from datetime import datetime
-
-                                item["end_dt"] = datetime.fromisoformat(
-                                    item["end_dt"]
-                                )
-                        _set_epg_items(stream_id, items)
-                        loaded_count += 1
+def _epg_store():
+    return get_connection(get_epg_cache_file(), _EPG_STORE_SCHEMA)
 
-                xbmc.log(
-                    f"[EPG] Loaded {loaded_count} channels from cache",
-                    level=xbmc.LOGDEBUG,
-                )
-    except Exception as exc:
-        xbmc.log(f"[EPG] Failed to load cache: {exc}", level=xbmc.LOGWARNING)
 
+def _epoch_or_none(value):
+    return int(value.timestamp()) if value else None
 
-def save_epg_cache():
-    cache_file = get_epg_cache_file()
-    try:
-        cache_data = {}
-        current_time = time.time()
 
-        with _epg_lock:
-            epg_snapshot = list(epg_data.items())
-
-        for stream_id, items in epg_snapshot:
-            serializable_items = []
-            for item in items:
-                serializable_item = item.copy()
-                if item.get("start_dt"):
-                    serializable_item["start_dt"] = item["start_dt"].isoformat()
-                if item.get("end_dt"):
-                    serializable_item["end_dt"] = item["end_dt"].isoformat()
-                serializable_items.append(serializable_item)
-
-            cache_data[stream_id] = {
-                "timestamp": current_time,
-                "items": serializable_items,
+def _encode_epg_items(items):
+    """Compact row per programme: [name, start, end, descr, category, duration]."""
+    return json_dumps(
+        [
+            [
+                item.get("name") or "",
+                _epoch_or_none(item.get("start_dt")),
+                _epoch_or_none(item.get("end_dt")),
+                item.get("descr") or "",
+                item.get("category") or "",
+                item.get("duration"),
+            ]
+            for item in items
+        ]
+    )
+
+
+def _decode_epg_items(payload):
+    from datetime import datetime
+
+    items = []
+    for name, start, end, descr, category, duration in json_loads(payload):
+        items.append(
+            {
+                "name": name,
+                "start_dt": datetime.fromtimestamp(start) if start else None,
+                "end_dt": datetime.fromtimestamp(end) if end else None,
+                "descr": descr,
+                "category": category,
+                "duration": duration,
+                "duration_min": (duration // 60) if isinstance(duration, int) and duration > 0 else None,
             }
+        )
+    return as_schedule(items)
 
-        with open(cache_file, "w", encoding="utf-8") as handle:
-            json_dumps(cache_data, handle)
 
-        xbmc.log(f"[EPG] Saved {len(cache_data)} channels to cache", level=xbmc.LOGINFO)
+def _load_epg_from_store(storage_keys):
+    """Pull the given channels from disk into memory; unknown keys are remembered as misses."""
+    with _epg_lock:
+        wanted = [
+            key
+            for key in dict.fromkeys(storage_keys)
+            if key and key not in epg_data and key not in _epg_store_misses
+        ]
+    if not wanted:
+        return 0
+
+    now = time.time()
+    loaded = {}
+    try:
+        connection = _epg_store()
+        for start in range(0, len(wanted), _EPG_SQL_CHUNK):
+            chunk = wanted[start : start + _EPG_SQL_CHUNK]
+            rows = connection.execute(
+                f"""
+                SELECT storage_key, items FROM epg_channels
+                WHERE expires_at > ? AND storage_key IN ({','.join('?' for _ in chunk)})
+                """,
+                [now, *chunk],
+            ).fetchall()
+            for storage_key, payload in rows:
+                try:
+                    loaded[storage_key] = _decode_epg_items(payload)
+                except Exception:
+                    continue
     except Exception as exc:
+        xbmc.log(f"[EPG] Failed to read cache: {exc}", level=xbmc.LOGWARNING)
+        return 0
+
+    with _epg_lock:
+        for storage_key in wanted:
+            items = loaded.get(storage_key)
+            if items is None:
+                _epg_store_misses.add(storage_key)
+                continue
+            if storage_key in epg_data:
+                continue
+            epg_data[storage_key] = items
+            epg_data.move_to_end(storage_key)
+        _evict_epg_if_needed()
+    return len(loaded)
+
+
+def load_epg_cache(channel_keys=None):
+    """Preload cached EPG for the given channels in one query.
+
+    Without keys nothing is read up front; channels are then loaded on demand
+    by epg_contains/get_epg_items.
+    """
+    if not channel_keys:
+        return
+    loaded_count = _load_epg_from_store(
+        [_get_epg_storage_key(key) for key in channel_keys if key is not None]
+    )
+    xbmc.log(
+        f"[EPG] Loaded {loaded_count} channels from cache",
+        level=xbmc.LOGDEBUG,
+    )
+
+
+def save_epg_cache():
+    """Write only the channels that changed since the last save, and expire old rows."""
+    with _epg_lock:
+        dirty = list(_epg_evicted_dirty.items())
+        dirty.extend((key, list(epg_data[key])) for key in _epg_dirty_keys if key in epg_data)
+        _epg_dirty_keys.clear()
+        _epg_evicted_dirty.clear()
+
+    try:
+        now = time.time()
+        expires_at = now + get_epg_cache_ttl()
+        rows = [(key, expires_at, _encode_epg_items(items)) for key, items in dirty]
+        connection = _epg_store()
+        with connection:
+            if rows:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO epg_channels VALUES(?,?,?)", rows
+                )
+            connection.execute("DELETE FROM epg_channels WHERE expires_at <= ?", (now,))
+
+        xbmc.log(f"[EPG] Saved {len(rows)} channels to cache", level=xbmc.LOGINFO)
+    except Exception as exc:
+        with _epg_lock:
+            _epg_evicted_dirty.update(dirty)
         xbmc.log(f"[EPG] Failed to save cache: {exc}", level=xbmc.LOGWARNING)
 
 
-def get_current_program(epg_items):
+def get_current_program(epg_items, now_ts=None):
     if not epg_items:
         return None
 
-    from datetime import datetime
+    current, upcoming = as_schedule(epg_items).now_next(now_ts)
+    if current is not None:
+        name = current.get("name") or current.get("title") or ""
+        return name.strip()
 
-    now = datetime.now()
+    if upcoming is not None:
+        name = upcoming.get("name") or upcoming.get("title") or ""
+        return f"Urmează: {name.strip()}"
 
-    for item in epg_items:
-        start_dt = item.get("start_dt")
-        end_dt = item.get("end_dt")
-        if start_dt and end_dt and start_dt <= now < end_dt:
-            name = item.get("name") or item.get("title") or ""
-            return name.strip()
+    return None
 
-    for item in epg_items:
-        start_dt = item.get("start_dt")
-        if start_dt and now < start_dt:
-            name = item.get("name") or item.get("title") or ""
-            return f"Urmează: {name.strip()}"
 
-    return None
+def get_epg_now_next(channel_keys):
+    """Resolve the now/next label for a whole channel list in one pass.
+
+    Returns {channel_key: (label or None, schedule)} for channels that have
+    EPG; the schedule is shared with the cache and must not be modified.
+    """
+    keyed = {}
+    for channel_key in channel_keys:
+        storage_key = _get_epg_storage_key(channel_key)
+        if storage_key:
+            keyed[channel_key] = storage_key
+    if not keyed:
+        return {}
+
+    _load_epg_from_store(keyed.values())
+    now_ts = time.time()
+    with _epg_lock:
+        schedules = {
+            channel_key: epg_data[storage_key]
+            for channel_key, storage_key in keyed.items()
+            if epg_data.get(storage_key)
+        }
+    return {
+        channel_key: (get_current_program(schedule, now_ts), schedule)
+        for channel_key, schedule in schedules.items()
+    }
 
 
 def _evict_epg_if_needed():
     while len(epg_data) > MAX_EPG_CHANNELS:
-        epg_data.popitem(last=False)
+        storage_key, items = epg_data.popitem(last=False)
+        if storage_key in _epg_dirty_keys:
+            # Still written by the next save_epg_cache().
+            _epg_dirty_keys.discard(storage_key)
+            _epg_evicted_dirty[storage_key] = items
 
 
 def _get_epg_storage_key(channel_key, server=None):
@@ -294,9 +407,12 @@ def _set_epg_items(channel_key, items):
     storage_key = _get_epg_storage_key(channel_key)
     if not storage_key:
         return
+    items = as_schedule(items)
     with _epg_lock:
         epg_data[storage_key] = items
         epg_data.move_to_end(storage_key)
+        _epg_dirty_keys.add(storage_key)
+        _epg_store_misses.discard(storage_key)
         _evict_epg_if_needed()
 
 
@@ -304,34 +420,49 @@ def epg_contains(channel_key):
     storage_key = _get_epg_storage_key(channel_key)
     if not storage_key:
         return False
+    with _epg_lock:
+        if storage_key in epg_data:
+            return True
+    _load_epg_from_store([storage_key])
     with _epg_lock:
         return storage_key in epg_data
 
 
 def epg_contains_any(*channel_keys):
     storage_keys = [_get_epg_storage_key(key) for key in channel_keys if key is not None]
+    storage_keys = [key for key in storage_keys if key is not None]
+    with _epg_lock:
+        if any(key in epg_data for key in storage_keys):
+            return True
+    _load_epg_from_store(storage_keys)
     with _epg_lock:
-        return any(key in epg_data for key in storage_keys if key is not None)
+        return any(key in epg_data for key in storage_keys)
 
 
 def get_epg_items(channel_key):
     storage_key = _get_epg_storage_key(channel_key)
     if not storage_key:
         return []
+    _load_epg_from_store([storage_key])
     with _epg_lock:
-        items = epg_data.get(storage_key, [])
-        return list(items) if items else []
+        # The schedule is immutable once stored, so hand it out without copying.
+        return epg_data.get(storage_key) or []
 
 
 def set_server_auth(server, token, mac, random_value="0", timestamp=None):
+    timestamp = timestamp if timestamp is not None else time.time()
     with _cache_lock:
         _auth_cache[server] = {
             "token": token,
             "mac": mac,
             "random": random_value,
-            "timestamp": timestamp if timestamp is not None else time.time(),
+            "timestamp": timestamp,
+            "last_used": time.time(),
         }
         _auth_failure_cache.pop(server, None)
+    portal_url = get_portal_url_for_server(server)
+    if portal_url and token and mac:
+        auth_store.save_server_auth(server, portal_url, token, mac, random_value, timestamp)
 
 
 def clear_token_cache():
@@ -341,6 +472,26 @@ def clear_token_cache():
         _token_cache["timestamp"] = 0
 
 
+def _get_portal_online(portal_url):
+    with _cache_lock:
+        cached = dict(_portal_online_cache.get(portal_url, {}))
+    if cached:
+        return cached
+    return auth_store.load_portal_online(portal_url, _PORTAL_ONLINE_CACHE_TTL)
+
+
+def _set_portal_online(portal_url, online, timestamp):
+    with _cache_lock:
+        _portal_online_cache[portal_url] = {"online": online, "timestamp": timestamp}
+    auth_store.save_portal_online(portal_url, online, timestamp)
+
+
+def _forget_portal_online(portal_url):
+    with _cache_lock:
+        _portal_online_cache.pop(portal_url, None)
+    auth_store.delete_portal_online(portal_url)
+
+
 def epg_callback(channel_key, items):
     xbmc.log(
         f"[DEBUG] EPG callback for channel {channel_key} with {len(items)} items. Data: {items}",
@@ -520,6 +671,12 @@ _mac_list_cache = {}
 _MAC_CACHE_TTL = 7200
 _failed_mac_cache = {}
 _FAILED_MAC_TTL = 900
+# Handshake latency at which a MAC's sampled score is halved.
+_MAC_LATENCY_SCALE_MS = 3000
+_CONCURRENT_USE_RE = re.compile(
+    r"HTTP (?:429|458|509)\b|too many|max(?:imum)? connections|connection limit",
+    re.IGNORECASE,
+)
 _fetch_status = {}
 _selected_mac_override = {}
 _token_cache = {"token": None, "mac": None, "timestamp": 0}
@@ -532,7 +689,7 @@ _AUTH_FAILURE_COOLDOWN = 45
 _server_cache_folder_path = None
 _auth_cache = {}
 _auth_failure_cache = {}
-_AUTH_TOKEN_TTL = 3600
+_AUTH_TOKEN_TTL = auth_store.AUTH_TOKEN_TTL
 _channels_memory_cache = {}
 _category_channels_memory_cache = {}
 _portal_online_cache = {}
@@ -626,6 +783,14 @@ def get_auth_max_attempts():
     return max(1, min(value, 12))
 
 
+def get_auth_race_width():
+    try:
+        value = int((_ADDON.getSetting("auth_race_width") or "").strip())
+    except (TypeError, ValueError):
+        value = 3
+    return max(1, min(value, 6))
+
+
 def get_mac_pool(server="server1"):
     global _mac_list_cache
     current_time = time.time()
@@ -659,12 +824,52 @@ def get_recent_failed_macs(server="server1"):
     return set(fresh_entries.keys())
 
 
-def note_failed_mac(server, mac):
+def _is_concurrent_use_error(reason):
+    return bool(reason) and bool(_CONCURRENT_USE_RE.search(str(reason)))
+
+
+def note_failed_mac(server, mac, reason=""):
     norm_mac = _normalize_mac(mac)
     if not norm_mac:
         return
     with _cache_lock:
         _failed_mac_cache.setdefault(server, {})[norm_mac] = time.time()
+    auth_store.record_mac_result(
+        server, norm_mac, False, busy=_is_concurrent_use_error(reason)
+    )
+
+
+def note_mac_playback_success(server, mac, attempts):
+    """Credit the MAC that started playback and track auth attempts per play."""
+    clear_failed_mac(server, mac)
+    auth_store.record_mac_result(server, _normalize_mac(mac), True)
+    auth_store.record_play_attempts(server, attempts)
+
+
+def get_play_attempt_stats():
+    return auth_store.load_play_stats()
+
+
+def _rank_macs(server, macs):
+    """
+    Thompson-sampling order: each MAC draws from Beta(successes+1, failures+busy+1)
+    of its decayed scoreboard, scaled down by handshake latency. Unknown MACs draw
+    from Beta(1, 1), so new entries still get explored.
+    """
+    stats = auth_store.load_mac_stats(server)
+
+    def draw(mac):
+        entry = stats.get(_normalize_mac(mac))
+        if not entry:
+            return random.betavariate(1, 1)
+        score = random.betavariate(
+            entry["successes"] + 1, entry["failures"] + entry["busy"] + 1
+        )
+        if entry.get("latency_ms"):
+            score /= 1 + entry["latency_ms"] / _MAC_LATENCY_SCALE_MS
+        return score
+
+    return sorted(macs, key=draw, reverse=True)
 
 
 def clear_failed_mac(server, mac):
@@ -705,9 +910,7 @@ def get_candidate_macs(server="server1", exclude_macs=None, limit=None):
         else:
             preferred.append(mac)
 
-    random.shuffle(preferred)
-    random.shuffle(fallback)
-    candidates = preferred + fallback
+    candidates = _rank_macs(server, preferred) + _rank_macs(server, fallback)
     preferred_override = _selected_mac_override.get(server)
     if preferred_override:
         preferred_norm = _normalize_mac(preferred_override)
@@ -802,6 +1005,12 @@ def _activate_session(portal_url, mac, token, random_value, server="server1"):
 
 
 def handshake(portal_url, mac, server="server1"):
+    token, random_value, _ = handshake_with_reason(portal_url, mac, server)
+    return token, random_value
+
+
+def handshake_with_reason(portal_url, mac, server="server1"):
+    """handshake() plus the error text of a failure (empty on success), for MAC scoring."""
     session = requests.Session()
     retry = Retry(
         total=3,
@@ -859,7 +1068,7 @@ def handshake(portal_url, mac, server="server1"):
                 f"[Handshake] Failed to parse JSON response for {portal_url}. Status: {response.status_code}, Body: {response.text[:200]}",
                 level=xbmc.LOGWARNING,
             )
-            return None, "0"
+            return None, "0", f"HTTP {response.status_code}: {response.text[:200]}"
 
         if isinstance(data, dict):
             js_data = data.get("js", {})
@@ -869,18 +1078,18 @@ def handshake(portal_url, mac, server="server1"):
                 if token:
                     # After handshake, we MUST activate the session with get_profile
                     _activate_session(portal_url, mac_upper, token, random_value, server)
-                    return token, random_value
+                    return token, random_value, ""
                 xbmc.log(
                     f"[Handshake] No token in response for {portal_url}. js data: {js_data}",
                     level=xbmc.LOGWARNING,
                 )
-                return None, "0"
+                return None, "0", str(js_data)
             if isinstance(js_data, list):
                 xbmc.log(
                     f"[Handshake] Server returned error list: {js_data}",
                     level=xbmc.LOGWARNING,
                 )
-                return None, "0"
+                return None, "0", str(js_data)
             xbmc.log(
                 f"[Handshake] Unexpected js data type: {type(js_data)}",
                 level=xbmc.LOGWARNING,
@@ -888,14 +1097,14 @@ def handshake(portal_url, mac, server="server1"):
             _note_auth_failure(
                 server, portal_url, f"unexpected_js_type:{type(js_data).__name__}"
             )
-            return None, "0"
+            return None, "0", f"unexpected_js_type:{type(js_data).__name__}"
         if isinstance(data, list):
             xbmc.log(
                 f"[Handshake] Server returned error list at root level: {data}",
                 level=xbmc.LOGWARNING,
             )
             _note_auth_failure(server, portal_url, "root_error_list")
-            return None, "0"
+            return None, "0", str(data)
         xbmc.log(
             f"[Handshake] Unexpected response format: {type(data)}",
             level=xbmc.LOGWARNING,
@@ -903,25 +1112,21 @@ def handshake(portal_url, mac, server="server1"):
         _note_auth_failure(
             server, portal_url, f"unexpected_response_type:{type(data).__name__}"
         )
-        return None, "0"
+        return None, "0", f"unexpected_response_type:{type(data).__name__}"
     except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
         # Don't note permanent auth failure for connection resets or timeouts
         # This allows the iterator to try other MACs
         xbmc.log(f"[Handshake] Connection failed for {mac_upper}: {exc}", level=xbmc.LOGWARNING)
-        return None, "0"
+        return None, "0", str(exc)
     except requests.exceptions.RequestException as exc:
         _note_auth_failure(server, portal_url, type(exc).__name__)
-        with _cache_lock:
-            _portal_online_cache[portal_url.rstrip("/")] = {
-                "online": False,
-                "timestamp": time.time(),
-            }
+        _set_portal_online(portal_url.rstrip("/"), False, time.time())
         xbmc.log(f"[Handshake] Request failed: {exc}", level=xbmc.LOGERROR)
-        return None, "0"
+        return None, "0", str(exc)
     except Exception as exc:
         _note_auth_failure(server, portal_url, type(exc).__name__)
         xbmc.log(f"[Handshake] Error: {exc}", level=xbmc.LOGERROR)
-        return None, "0"
+        return None, "0", str(exc)
     finally:
         session.close()
 
@@ -966,14 +1171,129 @@ def invalidate_server_auth(server="server1", mac=None):
         with _cache_lock:
             if mac is None or _normalize_mac(cached.get("mac")) == _normalize_mac(mac):
                 _auth_cache.pop(server, None)
+    auth_store.delete_server_auth(server, mac=mac)
 
     portal_url = get_portal_url_for_server(server)
     if portal_url:
-        with _cache_lock:
-            _portal_online_cache.pop(portal_url.rstrip("/"), None)
-            _auth_failure_cache.pop(server, None)
-    else:
-        _clear_auth_failure(server)
+        _forget_portal_online(portal_url.rstrip("/"))
+    _clear_auth_failure(server)
+
+
+def _get_cached_server_auth(server, portal_url):
+    """In-process auth entry, falling back to the store shared by every plugin invocation."""
+    with _cache_lock:
+        cached = dict(_auth_cache.get(server, {}))
+    if cached:
+        return cached
+
+    stored = auth_store.load_server_auth(server)
+    if not stored or stored.get("portal_url") != (portal_url or "").rstrip("/"):
+        return {}
+    if (time.time() - stored.get("timestamp", 0)) >= _AUTH_TOKEN_TTL:
+        return {}
+    with _cache_lock:
+        _auth_cache.setdefault(server, stored)
+    return stored
+
+
+def refresh_server_auth(server="server1"):
+    """Renew the stored token with the same MAC before it expires (run by the service)."""
+    portal_url = get_portal_url_for_server(server)
+    stored = auth_store.load_server_auth(server)
+    if not portal_url or not stored.get("mac"):
+        return False
+
+    token, random_val = handshake(portal_url, stored["mac"], server)
+    if not token:
+        xbmc.log(
+            f"[Auth] Proactive refresh failed for {server}; next request will re-authenticate",
+            level=xbmc.LOGINFO,
+        )
+        invalidate_server_auth(server, mac=stored["mac"])
+        return False
+
+    set_server_auth(server, token, stored["mac"], random_val)
+    xbmc.log(f"[Auth] Refreshed token for {server} ahead of expiry", level=xbmc.LOGINFO)
+    return True
+
+
+def _race_handshakes(server, portal_url, macs, width=None):
+    """
+    Handshake up to `width` MACs at once and yield (mac, token, random) in
+    completion order. A failed MAC is replaced by the next candidate, so the
+    race keeps `width` handshakes in flight. Closing the generator (the caller
+    found a working MAC) stops starting new ones; handshakes already running
+    finish in daemon threads and are still scored, without keeping the
+    plugin process alive.
+    """
+    pending_macs = list(macs)
+    if not pending_macs:
+        return
+    width = min(width or get_auth_race_width(), len(pending_macs))
+    deadline = time.time() + _AUTH_RACE_DEADLINE
+    completed = queue.Queue()
+    in_flight = 0
+
+    def timed_handshake(mac):
+        started = time.time()
+        try:
+            token, random_val, reason = handshake_with_reason(portal_url, mac, server)
+        except Exception as exc:
+            xbmc.log(f"[Auth] Handshake error for {mac}: {exc}", level=xbmc.LOGWARNING)
+            token, random_val, reason = None, "0", str(exc)
+
+        # Scored as soon as it finishes, so losers of an abandoned race count too.
+        if token:
+            clear_failed_mac(server, mac)
+            auth_store.record_mac_result(
+                server, _normalize_mac(mac), True, latency=time.time() - started
+            )
+        else:
+            # The error text lets "concurrent use" count as busy rather than dead
+            note_failed_mac(server, mac, reason=reason)
+        completed.put((mac, token, random_val))
+
+    def submit_next():
+        nonlocal in_flight
+        if pending_macs:
+            mac = pending_macs.pop(0)
+            threading.Thread(
+                target=timed_handshake, args=(mac,), name="hublive-handshake", daemon=True
+            ).start()
+            in_flight += 1
+
+    for _ in range(width):
+        submit_next()
+
+    while in_flight:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            xbmc.log(
+                f"[Auth] Handshake race for {server} hit its {_AUTH_RACE_DEADLINE}s deadline "
+                f"with {in_flight} MAC(s) still pending",
+                level=xbmc.LOGWARNING,
+            )
+            return
+        try:
+            mac, token, random_val = completed.get(timeout=remaining)
+        except queue.Empty:
+            continue
+        in_flight -= 1
+
+        if not token:
+            if _get_auth_failure_entry(server):
+                xbmc.log(
+                    f"[Auth] Aborting further handshake attempts for {server} after portal-level auth failure.",
+                    level=xbmc.LOGINFO,
+                )
+                return
+            submit_next()
+            continue
+
+        yield mac, token, random_val
+        # Time spent by the caller using this MAC does not count against the race.
+        deadline = time.time() + _AUTH_RACE_DEADLINE
+        submit_next()
 
 
 def iter_server_auth_candidates(
@@ -995,8 +1315,7 @@ def iter_server_auth_candidates(
     }
     current_time = time.time()
     attempts_yielded = 0
-    with _cache_lock:
-        cached = dict(_auth_cache.get(server, {}))
+    cached = _get_cached_server_auth(server, portal_url)
     preferred_override = _selected_mac_override.get(server)
     preferred_norm = _normalize_mac(preferred_override)
 
@@ -1015,6 +1334,7 @@ def iter_server_auth_candidates(
         and _normalize_mac(cached["mac"]) not in excluded
         and (not preferred_norm or _normalize_mac(cached["mac"]) == preferred_norm)
     ):
+        auth_store.touch_server_auth(server, cached.get("last_used"))
         headers, cookies = _build_auth_headers_and_cookies(
             portal_url, cached["mac"], cached["token"], cached.get("random", "0")
         )
@@ -1029,25 +1349,10 @@ def iter_server_auth_candidates(
     if remaining_attempts <= 0:
         return
 
-    for mac in get_candidate_macs(server, exclude_macs=excluded, limit=remaining_attempts):
-        if attempts_yielded > 0:
-            time.sleep(0.5)  # Gentle delay between handshakes
-        
-        token, random_val = handshake(portal_url, mac, server)
-        if not token:
-            note_failed_mac(server, mac)
-            excluded.add(_normalize_mac(mac))
-            if _get_auth_failure_entry(server):
-                xbmc.log(
-                    f"[Auth] Aborting further handshake attempts for {server} after portal-level auth failure.",
-                    level=xbmc.LOGINFO,
-                )
-                return
-            continue
-
+    candidates = get_candidate_macs(server, exclude_macs=excluded, limit=remaining_attempts)
+    for mac, token, random_val in _race_handshakes(server, portal_url, candidates):
         set_server_auth(server, token, mac, random_val)
         _clear_auth_failure(server)
-        clear_failed_mac(server, mac)
         headers, cookies = _build_auth_headers_and_cookies(portal_url, mac, token, random_val)
         yield token, headers, cookies, portal_url, mac, random_val
         excluded.add(_normalize_mac(mac))
@@ -1085,18 +1390,6 @@ def get_channels_cache_file(server_id):
     return os.path.join(get_server_cache_folder(), f"{server_id}_channels.json")
 
 
-def get_category_channels_cache_file(server_id, category_id):
-    safe_category_id = str(category_id).strip().replace(os.sep, "_")
-    if os.altsep:
-        safe_category_id = safe_category_id.replace(os.altsep, "_")
-    # Sanitize invalid filename characters (Windows: < > : " / \ | ? *)
-    for char in ['<', '>', ':', '"', '/', '\\', '|', '?', '*']:
-        safe_category_id = safe_category_id.replace(char, "_")
-    return os.path.join(
-        get_server_cache_folder(), f"{server_id}_category_{safe_category_id}_channels.json"
-    )
-
-
 def load_categories_cache(server_id):
     cache_file = get_categories_cache_file(server_id)
     try:
@@ -1146,8 +1439,7 @@ def clear_all_cache(server="server1"):
                 _category_channels_memory_cache.pop(cache_key, None)
         portal_url = get_portal_url_for_server(server)
         if portal_url:
-            with _cache_lock:
-                _portal_online_cache.pop(portal_url.rstrip("/"), None)
+            _forget_portal_online(portal_url.rstrip("/"))
 
         categories_file = get_categories_cache_file(server)
         channels_file = get_channels_cache_file(server)
@@ -1163,6 +1455,9 @@ def clear_all_cache(server="server1"):
             deleted_count += 1
             xbmc.log(f"[Cache] Deleted channels cache: {channels_file}")
 
+        deleted_count += clear_category_channels_cache(server)
+
+        # Per-category JSON files written by older versions.
         for cache_name in os.listdir(get_server_cache_folder()):
             if not cache_name.startswith(f"{server}_category_"):
                 continue
@@ -1235,8 +1530,7 @@ def clear_all_cache_for_all_servers():
                     _category_channels_memory_cache.pop(cache_key, None)
             portal_url = get_portal_url_for_server(srv_id)
             if portal_url:
-                with _cache_lock:
-                    _portal_online_cache.pop(portal_url.rstrip("/"), None)
+                _forget_portal_online(portal_url.rstrip("/"))
 
             categories_file = get_categories_cache_file(srv_id)
             channels_file = get_channels_cache_file(srv_id)
@@ -1249,6 +1543,8 @@ def clear_all_cache_for_all_servers():
                 os.remove(channels_file)
                 deleted_count += 1
 
+            deleted_count += clear_category_channels_cache(srv_id)
+
             for cache_name in os.listdir(get_server_cache_folder()):
                 if not cache_name.startswith(f"{srv_id}_category_"):
                     continue
@@ -1312,17 +1608,93 @@ def save_channels_cache(server_id, channels):
         )
 
 
+_CHANNEL_STORE_FILE = "channels.db"
+_CHANNEL_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS category_channels(
+    server_id TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    stream_key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name_search TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY(server_id, category_id, stream_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_category_channels_order
+    ON category_channels(server_id, category_id, position);
+CREATE TABLE IF NOT EXISTS category_state(
+    server_id TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    channel_count INTEGER NOT NULL,
+    PRIMARY KEY(server_id, category_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS listing_rows(
+    server_id TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    stream_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    logo TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY(server_id, category_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS listing_state(
+    server_id TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY(server_id, category_id)
+) WITHOUT ROWID;
+"""
+
+
+def _channel_store():
+    return get_connection(
+        os.path.join(get_server_cache_folder(), _CHANNEL_STORE_FILE),
+        _CHANNEL_STORE_SCHEMA,
+    )
+
+
+def _channel_stream_key(channel):
+    return str(channel.get("id") or channel.get("stream_id") or channel.get("cmd") or "")
+
+
+def _channel_search_text(name):
+    return (name or "").lower()
+
+
+def _decode_channel_rows(rows):
+    channels = []
+    for (payload,) in rows:
+        try:
+            channels.append(json_loads(payload))
+        except Exception:
+            continue
+    return channels
+
+
 def load_category_channels_cache(server_id, category_id):
-    cache_file = get_category_channels_cache_file(server_id, category_id)
     try:
-        if os.path.exists(cache_file):
-            with open(cache_file, "r", encoding="utf-8") as handle:
-                data = json_loads(handle)
-            xbmc.log(
-                f"[ServerCache] Loaded category channels for {server_id}/{category_id}",
-                level=xbmc.LOGDEBUG,
-            )
-            return data
+        connection = _channel_store()
+        state = connection.execute(
+            "SELECT timestamp FROM category_state WHERE server_id = ? AND category_id = ?",
+            (str(server_id), str(category_id)),
+        ).fetchone()
+        if not state:
+            return None
+        rows = connection.execute(
+            """
+            SELECT payload FROM category_channels
+            WHERE server_id = ? AND category_id = ?
+            ORDER BY position
+            """,
+            (str(server_id), str(category_id)),
+        ).fetchall()
+        xbmc.log(
+            f"[ServerCache] Loaded category channels for {server_id}/{category_id}",
+            level=xbmc.LOGDEBUG,
+        )
+        return {"channels": _decode_channel_rows(rows), "timestamp": state[0]}
     except Exception as exc:
         xbmc.log(
             f"[ServerCache] Failed to load category channels for {server_id}/{category_id}: {exc}",
@@ -1332,10 +1704,36 @@ def load_category_channels_cache(server_id, category_id):
 
 
 def save_category_channels_cache(server_id, category_id, channels):
-    cache_file = get_category_channels_cache_file(server_id, category_id)
+    server_id = str(server_id)
+    category_id = str(category_id)
+    rows = []
+    for position, channel in enumerate(channels or []):
+        rows.append(
+            (
+                server_id,
+                category_id,
+                _channel_stream_key(channel),
+                position,
+                _channel_search_text(channel.get("name")),
+                json_dumps(channel),
+            )
+        )
     try:
-        with open(cache_file, "w", encoding="utf-8") as handle:
-            json_dumps({"channels": channels, "timestamp": time.time()}, handle)
+        connection = _channel_store()
+        with connection:
+            connection.execute(
+                "DELETE FROM category_channels WHERE server_id = ? AND category_id = ?",
+                (server_id, category_id),
+            )
+            # First occurrence wins, like the old per-file dedupe.
+            connection.executemany(
+                "INSERT OR IGNORE INTO category_channels VALUES(?,?,?,?,?,?)",
+                rows,
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO category_state VALUES(?,?,?,?)",
+                (server_id, category_id, time.time(), len(rows)),
+            )
         xbmc.log(
             f"[ServerCache] Saved category channels for {server_id}/{category_id}",
             level=xbmc.LOGDEBUG,
@@ -1347,61 +1745,164 @@ def save_category_channels_cache(server_id, category_id, channels):
         )
 
 
-def load_cached_category_channels(server_id, allowed_category_ids=None, cache_ttl=None):
-    cache_folder = get_server_cache_folder()
-    if not os.path.isdir(cache_folder):
-        return []
+def clear_category_channels_cache(server_id):
+    """Drop every cached category of a server; returns the number of categories removed."""
+    try:
+        connection = _channel_store()
+        with connection:
+            removed = connection.execute(
+                "DELETE FROM category_state WHERE server_id = ?", (str(server_id),)
+            ).rowcount
+            connection.execute(
+                "DELETE FROM category_channels WHERE server_id = ?", (str(server_id),)
+            )
+            connection.execute(
+                "DELETE FROM listing_state WHERE server_id = ?", (str(server_id),)
+            )
+            connection.execute(
+                "DELETE FROM listing_rows WHERE server_id = ?", (str(server_id),)
+            )
+        return max(removed, 0)
+    except Exception as exc:
+        xbmc.log(
+            f"[ServerCache] Failed to clear category channels for {server_id}: {exc}",
+            level=xbmc.LOGWARNING,
+        )
+        return 0
 
-    ttl = float(cache_ttl if cache_ttl is not None else _CHANNELS_CACHE_TTL)
-    allowed_ids = None
-    if allowed_category_ids is not None:
-        allowed_ids = {str(cat_id) for cat_id in allowed_category_ids}
 
-    now = time.time()
-    merged = []
-    seen = set()
-    prefix = f"{server_id}_category_"
+def save_listing_rows(server_id, category_id, rows):
+    """
+    Store the display rows of a live category as compact
+    (stream_id, name, logo, url) tuples, so later pages are read with
+    LIMIT/OFFSET instead of refetching and reconverting the whole category.
+    """
+    server_id = str(server_id)
+    category_id = str(category_id)
+    try:
+        connection = _channel_store()
+        with connection:
+            connection.execute(
+                "DELETE FROM listing_rows WHERE server_id = ? AND category_id = ?",
+                (server_id, category_id),
+            )
+            connection.executemany(
+                "INSERT INTO listing_rows VALUES(?,?,?,?,?,?,?)",
+                [
+                    (server_id, category_id, position, *row)
+                    for position, row in enumerate(rows)
+                ],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO listing_state VALUES(?,?,?,?)",
+                (server_id, category_id, time.time(), len(rows)),
+            )
+    except Exception as exc:
+        xbmc.log(
+            f"[ServerCache] Failed to save listing rows for {server_id}/{category_id}: {exc}",
+            level=xbmc.LOGWARNING,
+        )
 
-    for cache_name in os.listdir(cache_folder):
-        if not cache_name.startswith(prefix) or not cache_name.endswith("_channels.json"):
-            continue
 
-        category_id = cache_name[len(prefix) : -len("_channels.json")]
-        if allowed_ids is not None and category_id not in allowed_ids:
-            continue
+def load_listing_rows(server_id, category_id, offset=0, limit=None):
+    """(rows, total) for one page of a cached category listing, or (None, 0) when stale."""
+    server_id = str(server_id)
+    category_id = str(category_id)
+    try:
+        connection = _channel_store()
+        state = connection.execute(
+            """
+            SELECT row_count FROM listing_state
+            WHERE server_id = ? AND category_id = ? AND timestamp > ?
+            """,
+            (server_id, category_id, time.time() - _CHANNELS_CACHE_TTL),
+        ).fetchone()
+        if not state:
+            return None, 0
+        rows = connection.execute(
+            """
+            SELECT stream_id, name, logo, url FROM listing_rows
+            WHERE server_id = ? AND category_id = ?
+            ORDER BY position
+            LIMIT ? OFFSET ?
+            """,
+            (server_id, category_id, -1 if limit is None else int(limit), int(offset)),
+        ).fetchall()
+        return rows, state[0]
+    except Exception as exc:
+        xbmc.log(
+            f"[ServerCache] Failed to load listing rows for {server_id}/{category_id}: {exc}",
+            level=xbmc.LOGWARNING,
+        )
+        return None, 0
 
-        cache_path = os.path.join(cache_folder, cache_name)
-        if not os.path.isfile(cache_path):
-            continue
 
-        try:
-            with open(cache_path, "r", encoding="utf-8") as handle:
-                payload = json_loads(handle)
-        except Exception as exc:
-            xbmc.log(
-                f"[ServerCache] Failed to load merged category cache {cache_path}: {exc}",
-                level=xbmc.LOGWARNING,
-            )
-            continue
+def load_cached_category_channels(
+    server_id,
+    allowed_category_ids=None,
+    cache_ttl=None,
+    search_text=None,
+    return_cache_status=False,
+):
+    """
+    Fresh cached channels of a server, optionally pre-filtered by name in SQL.
 
-        timestamp = float((payload or {}).get("timestamp", 0) or 0)
-        if not timestamp or (now - timestamp) >= ttl:
-            continue
+    With return_cache_status, returns (channels, has_fresh_cache): a fresh
+    cache with no name match is still a cache hit, not a reason to refetch.
+    """
+    ttl = float(cache_ttl if cache_ttl is not None else _CHANNELS_CACHE_TTL)
+    params = [str(server_id), time.time() - ttl]
+    where = ["s.server_id = ?", "s.timestamp > ?"]
 
-        for channel in (payload or {}).get("channels") or []:
-            item_id = channel.get("id") or channel.get("stream_id") or channel.get("cmd")
-            dedupe_key = (str(category_id), str(item_id))
-            if dedupe_key in seen:
-                continue
-            seen.add(dedupe_key)
-            merged.append(channel)
+    if allowed_category_ids is not None:
+        allowed_ids = sorted({str(cat_id) for cat_id in allowed_category_ids})
+        if not allowed_ids:
+            return ([], False) if return_cache_status else []
+        where.append(f"s.category_id IN ({','.join('?' for _ in allowed_ids)})")
+        params.extend(allowed_ids)
+    state_where = list(where)
+    state_params = list(params)
+
+    if search_text:
+        where.append("instr(c.name_search, ?) > 0")
+        params.append(_channel_search_text(search_text))
+
+    try:
+        connection = _channel_store()
+        rows = connection.execute(
+            f"""
+            SELECT c.payload
+            FROM category_state AS s
+            JOIN category_channels AS c
+              ON c.server_id = s.server_id AND c.category_id = s.category_id
+            WHERE {' AND '.join(where)}
+            ORDER BY s.category_id, c.position
+            """,
+            params,
+        ).fetchall()
+        has_fresh_cache = bool(rows)
+        if return_cache_status and not rows:
+            has_fresh_cache = (
+                connection.execute(
+                    f"SELECT 1 FROM category_state AS s WHERE {' AND '.join(state_where)} LIMIT 1",
+                    state_params,
+                ).fetchone()
+                is not None
+            )
+    except Exception as exc:
+        xbmc.log(
+            f"[ServerCache] Failed to query category channel store for {server_id}: {exc}",
+            level=xbmc.LOGWARNING,
+        )
+        return ([], False) if return_cache_status else []
 
+    merged = _decode_channel_rows(rows)
     if merged:
         xbmc.log(
             f"[ServerCache] Loaded {len(merged)} channels from category caches for {server_id}",
             level=xbmc.LOGDEBUG,
         )
-    return merged
+    return (merged, has_fresh_cache) if return_cache_status else merged
 
 
 def get_server_auth(server="server1", force_refresh=False, exclude_macs=None, max_attempts=None):
@@ -2383,8 +2884,7 @@ def check_server_online(portal_url, timeout=3):
         return False
 
     portal_url = portal_url.rstrip("/")
-    with _cache_lock:
-        cached = dict(_portal_online_cache.get(portal_url, {}))
+    cached = _get_portal_online(portal_url)
     current_time = time.time()
     if cached and (current_time - cached.get("timestamp", 0)) < _PORTAL_ONLINE_CACHE_TTL:
         xbmc.log(
@@ -2411,11 +2911,7 @@ def check_server_online(portal_url, timeout=3):
                 allow_redirects=True,
                 verify=False,
             )
-            with _cache_lock:
-                _portal_online_cache[portal_url] = {
-                    "online": True,
-                    "timestamp": current_time,
-                }
+            _set_portal_online(portal_url, True, current_time)
             return True
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             pass
@@ -2430,25 +2926,13 @@ def check_server_online(portal_url, timeout=3):
                 allow_redirects=True,
                 verify=False,
             )
-            with _cache_lock:
-                _portal_online_cache[portal_url] = {
-                    "online": True,
-                    "timestamp": current_time,
-                }
+            _set_portal_online(portal_url, True, current_time)
             return True
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-            with _cache_lock:
-                _portal_online_cache[portal_url] = {
-                    "online": False,
-                    "timestamp": current_time,
-                }
+            _set_portal_online(portal_url, False, current_time)
             return False
         except Exception:
-            with _cache_lock:
-                _portal_online_cache[portal_url] = {
-                    "online": True,
-                    "timestamp": current_time,
-                }
+            _set_portal_online(portal_url, True, current_time)
             return True
     finally:
         probe_session.close()
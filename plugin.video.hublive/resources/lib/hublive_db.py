@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import threading
+
+import xbmc
+import xbmcaddon
+import xbmcvfs
+
+
+ADDON_ID = "plugin.video.hublive"
+_BUSY_TIMEOUT = 10
+_thread_state = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _get_addon():
+    try:
+        return xbmcaddon.Addon(ADDON_ID)
+    except Exception:
+        return xbmcaddon.Addon()
+
+
+def get_profile_path(*parts):
+    profile_path = _get_addon().getAddonInfo("profile")
+    try:
+        resolved = xbmcvfs.translatePath(profile_path)
+    except Exception:
+        resolved = xbmc.translatePath(profile_path)
+
+    path = os.path.join(resolved, *parts)
+    folder = os.path.dirname(path) if parts else path
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    return path
+
+
+def _open(path, schema):
+    connection = sqlite3.connect(path, timeout=_BUSY_TIMEOUT)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT * 1000}")
+    if schema:
+        with _schema_lock:
+            if path not in _schema_ready:
+                connection.executescript(schema)
+                _schema_ready.add(path)
+    return connection
+
+
+def get_connection(path, schema=None):
+    """Return this thread's connection to a profile SQLite store.
+
+    Every store is a disposable cache: a corrupt file is removed and
+    recreated instead of breaking the listing that needed it.
+    """
+    connections = getattr(_thread_state, "connections", None)
+    if connections is None:
+        connections = {}
+        _thread_state.connections = connections
+
+    connection = connections.get(path)
+    if connection is not None:
+        return connection
+
+    try:
+        connection = _open(path, schema)
+    except sqlite3.DatabaseError as exc:
+        xbmc.log(
+            f"[HubLiveDB] Recreating unreadable store {path}: {exc}",
+            level=xbmc.LOGWARNING,
+        )
+        with _schema_lock:
+            _schema_ready.discard(path)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+        connection = _open(path, schema)
+
+    connections[path] = connection
+    return connection
+
+
+def close_connection(path):
+    connections = getattr(_thread_state, "connections", None) or {}
+    connection = connections.pop(path, None)
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -1,10 +1,6 @@
 import os
 import time
-from concurrent.futures import (
-    ThreadPoolExecutor,
-    TimeoutError as FuturesTimeoutError,
-    as_completed,
-)
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import quote_plus, urlencode
 
 import xbmc
@@ -13,10 +9,20 @@ import xbmcgui
 import xbmcplugin
 import xbmcvfs
 
+from auth_store import load_server_latency, record_server_latency
+from hublive_db import get_profile_path
+from kv_cache import KVCache
+
 _SEARCH_CACHE_TTL = 120
 _MEGA_SEARCH_MAX_WORKERS = 8
 _MEGA_SEARCH_SERVER_TIMEOUT = 10
-_search_cache = {}
+# Whole mega search (API fan-out plus fallback fetches) stops here.
+_MEGA_SEARCH_DEADLINE = 25
+# A server that missed its deadline this many times in a row sits out the cooldown.
+_MEGA_SEARCH_SKIP_AFTER_TIMEOUTS = 3
+_MEGA_SEARCH_SLOW_COOLDOWN = 1800
+_MEGA_SEARCH_POLL_INTERVAL = 0.25
+_search_cache = KVCache("search", _SEARCH_CACHE_TTL, max_bytes=8 * 1024 * 1024)
 
 
 def _get_saved_searches_file():
@@ -247,99 +253,31 @@ def _add_save_search_item(
     )
 
 
-def _get_search_cache_file():
-    addon = xbmcaddon.Addon()
-    profile_path = addon.getAddonInfo("profile")
-    try:
-        resolved = xbmcvfs.translatePath(profile_path)
-    except Exception:
-        resolved = xbmc.translatePath(profile_path)
-
-    if not os.path.exists(resolved):
-        os.makedirs(resolved)
-    return os.path.join(resolved, "search_cache.json")
-
-
-def _load_persisted_search_cache():
-    cache_file = _get_search_cache_file()
-    try:
-        if not os.path.exists(cache_file):
-            return
-        import json
-
-        with open(cache_file, "r", encoding="utf-8") as handle:
-            payload = json.load(handle)
-        if not isinstance(payload, dict):
-            return
-        now = time.time()
-        for raw_key, entry in payload.items():
-            if not isinstance(entry, dict):
-                continue
-            timestamp = float(entry.get("timestamp", 0) or 0)
-            if not timestamp or (now - timestamp) >= _SEARCH_CACHE_TTL:
-                continue
-            try:
-                server, type_param, query = raw_key.split("||", 2)
-            except ValueError:
-                continue
-            _search_cache[(server, type_param, query)] = entry
-    except Exception as exc:
-        xbmc.log(f"[SearchCache] Failed to load persisted cache: {exc}", level=xbmc.LOGWARNING)
-
-
-def _persist_search_cache():
-    cache_file = _get_search_cache_file()
-    try:
-        import json
-
-        payload = {}
-        now = time.time()
-        for key, entry in list(_search_cache.items()):
-            timestamp = float(entry.get("timestamp", 0) or 0)
-            if not timestamp or (now - timestamp) >= _SEARCH_CACHE_TTL:
-                _search_cache.pop(key, None)
-                continue
-            payload["||".join(key)] = entry
-        with open(cache_file, "w", encoding="utf-8") as handle:
-            json.dump(payload, handle, ensure_ascii=True)
-    except Exception as exc:
-        xbmc.log(f"[SearchCache] Failed to persist cache: {exc}", level=xbmc.LOGWARNING)
-
-
-_load_persisted_search_cache()
-
-
 def _search_cache_key(server, type_param, query):
-    return (server or "", type_param or "", (query or "").strip().lower())
+    return "||".join((server or "", type_param or "", (query or "").strip().lower()))
 
 
 def _get_cached_search_results(server, type_param, query):
-    cache_key = _search_cache_key(server, type_param, query)
-    entry = _search_cache.get(cache_key)
-    if not entry:
-        return None
-    if (time.time() - entry.get("timestamp", 0)) >= _SEARCH_CACHE_TTL:
-        _search_cache.pop(cache_key, None)
-        _persist_search_cache()
+    entry = _search_cache.get(_search_cache_key(server, type_param, query))
+    if entry is None:
         return None
     return entry.get("results")
 
 
 def _set_cached_search_results(server, type_param, query, results):
-    _search_cache[_search_cache_key(server, type_param, query)] = {
-        "results": results,
-        "timestamp": time.time(),
-    }
-    _persist_search_cache()
+    _search_cache.set(
+        _search_cache_key(server, type_param, query), {"results": results}
+    )
 
 
 def clear_search_cache(server=None):
     if server is None:
         _search_cache.clear()
-        cache_file = _get_search_cache_file()
+        # search_cache.json was written by older versions.
+        legacy_file = get_profile_path("search_cache.json")
         try:
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
+            if os.path.exists(legacy_file):
+                os.remove(legacy_file)
         except Exception as exc:
             xbmc.log(
                 f"[SearchCache] Failed to clear search cache: {exc}",
@@ -347,31 +285,35 @@ def clear_search_cache(server=None):
             )
         return
 
-    for cache_key in list(_search_cache):
-        cache_server = cache_key[0] if cache_key else ""
-        if cache_server in (server, "mega_search"):
-            _search_cache.pop(cache_key, None)
-    _persist_search_cache()
+    _search_cache.delete_prefix(f"{server}||", "mega_search||")
 
 
-def _dedupe_search_results(items, search_type):
-    unique_items = []
-    seen = set()
+def _search_result_key(item, search_type):
+    server_id = item.get("_server_id") or item.get("server") or ""
+    if search_type == "live":
+        cmd = item.get("cmd", "")
+        item_id = item.get("id") or item.get("stream_id") or cmd
+    else:
+        item_id = item.get("id") or item.get("movie_id") or item.get("name")
+    return (server_id, str(item_id))
 
-    for item in items or []:
-        server_id = item.get("_server_id") or item.get("server") or ""
-        if search_type == "live":
-            cmd = item.get("cmd", "")
-            item_id = item.get("id") or item.get("stream_id") or cmd
-        else:
-            item_id = item.get("id") or item.get("movie_id") or item.get("name")
 
-        dedupe_key = (server_id, str(item_id))
+def _merge_search_results(merged, seen, items, search_type):
+    """Append the items not merged yet; returns how many were new."""
+    added = 0
+    for item in items or []:
+        dedupe_key = _search_result_key(item, search_type)
         if dedupe_key in seen:
             continue
         seen.add(dedupe_key)
-        unique_items.append(item)
+        merged.append(item)
+        added += 1
+    return added
 
+
+def _dedupe_search_results(items, search_type):
+    unique_items = []
+    _merge_search_results(unique_items, set(), items, search_type)
     return unique_items
 
 
@@ -487,21 +429,27 @@ def _search_live_channels_locally(
     all_channels = _load_live_channels_from_cache(
         server, load_channels_cache_fn, channels_cache_ttl
     )
+    had_cache = bool(all_channels)
     if not all_channels and load_cached_category_channels_fn:
         try:
-            all_channels = load_cached_category_channels_fn(
+            # The channel store filters names in SQL; the loop below re-checks.
+            # Cache presence is reported apart from the filter, so a fresh cache
+            # without a match does not trigger a full refetch.
+            all_channels, had_cache = load_cached_category_channels_fn(
                 server,
                 allowed_category_ids=allowed_category_ids,
                 cache_ttl=channels_cache_ttl,
+                search_text=search_term_lower,
+                return_cache_status=True,
             )
         except Exception as exc:
             xbmc.log(
                 f"[MegaSearch] Failed to inspect category channel caches for {server}: {exc}",
                 level=xbmc.LOGWARNING,
             )
-            all_channels = []
+            all_channels, had_cache = [], False
     if not all_channels:
-        return ([], False) if return_cache_status else []
+        return ([], had_cache) if return_cache_status else []
 
     filtered_channels = _filter_live_results_by_mode(all_channels, allowed_category_ids)
     matches = []
@@ -704,28 +652,353 @@ def fetch_stalker_search(
         return []
 
 
-def _shutdown_executor_without_waiting(executor):
-    try:
-        executor.shutdown(wait=False, cancel_futures=True)
-    except TypeError:
-        executor.shutdown(wait=False)
+class MegaSearchScheduler:
+    """
+    One worker pool for a whole mega search. Every server call gets its own
+    deadline, counted from when the call actually starts, and everything
+    stops at the global deadline. Durations are recorded per server and
+    operation so slow servers are queried last, and servers that keep
+    timing out are skipped for a while.
+    """
+
+    def __init__(
+        self,
+        max_workers=_MEGA_SEARCH_MAX_WORKERS,
+        deadline=_MEGA_SEARCH_DEADLINE,
+        server_timeout=_MEGA_SEARCH_SERVER_TIMEOUT,
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._deadline = time.monotonic() + deadline
+        self._server_timeout = server_timeout
+        self._started = {}
+        self._futures = []
+        self.timed_out = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # Queued calls are dropped; running ones finish in the background unwaited.
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
+    def remaining(self):
+        return max(0.0, self._deadline - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def order_servers(self, servers, operation):
+        """(servers fastest first, skipped slow servers); unknown servers keep config order."""
+        stats = load_server_latency(operation)
+        now = time.time()
+        unknown_latency = self._server_timeout * 500.0
+        ranked = []
+        skipped = []
+        for server in servers:
+            entry = stats.get(server.get("id"))
+            if not entry:
+                ranked.append((unknown_latency, server))
+                continue
+            if self._is_sitting_out(entry, now):
+                skipped.append(server)
+                continue
+            ranked.append((entry["latency_ms"], server))
+        ranked.sort(key=lambda pair: pair[0])
+        return [server for _, server in ranked], skipped
+
+    def is_slow(self, server_id, operation):
+        entry = load_server_latency(operation).get(server_id)
+        return bool(entry) and self._is_sitting_out(entry, time.time())
+
+    @staticmethod
+    def _is_sitting_out(entry, now):
+        return (
+            entry["timeouts"] >= _MEGA_SEARCH_SKIP_AFTER_TIMEOUTS
+            and now - entry["last_timeout"] < _MEGA_SEARCH_SLOW_COOLDOWN
+        )
 
+    def _run_timed(self, server_id, operation, call):
+        self._started[(server_id, operation)] = time.monotonic()
+        return call()
+
+    def _call_deadline(self, server_id, operation):
+        started = self._started.get((server_id, operation))
+        if started is None:
+            return self._deadline
+        return min(self._deadline, started + self._server_timeout)
+
+    def _finish(self, server_id, operation, timed_out=False):
+        started = self._started.get((server_id, operation))
+        if timed_out:
+            self.timed_out.add(server_id)
+        if started is None:
+            return
+        elapsed = time.monotonic() - started
+        if timed_out and elapsed < self._server_timeout:
+            # Cut short by the global deadline: says nothing about this server.
+            return
+        record_server_latency(server_id, operation, elapsed, timed_out=timed_out)
+
+    def iter_results(self, jobs, operation, should_stop=None):
+        """
+        Submit `(server, call)` jobs right away and return an iterator of
+        `(server, result)` in completion order. Servers that miss a deadline
+        are dropped and end up in `timed_out`.
+        """
+        pending = {}
+        for server, call in jobs:
+            future = self._executor.submit(
+                self._run_timed, server.get("id"), operation, call
+            )
+            pending[future] = server
+            self._futures.append(future)
+        return self._drain(pending, operation, should_stop)
 
-def _run_mega_search_call_with_timeout(call, server_id, operation):
-    executor = ThreadPoolExecutor(max_workers=1)
-    future = executor.submit(call)
+    def _drain(self, pending, operation, should_stop):
+        try:
+            while pending:
+                if should_stop and should_stop():
+                    break
+                now = time.monotonic()
+                for future, server in list(pending.items()):
+                    server_id = server.get("id")
+                    if now < self._call_deadline(server_id, operation):
+                        continue
+                    future.cancel()
+                    del pending[future]
+                    self._finish(server_id, operation, timed_out=True)
+                    xbmc.log(
+                        f"[MegaSearch] Skipping slow server {server_id}: {operation} "
+                        f"missed its deadline",
+                        level=xbmc.LOGWARNING,
+                    )
+                if not pending:
+                    break
+
+                next_deadline = min(
+                    self._call_deadline(server.get("id"), operation)
+                    for server in pending.values()
+                )
+                done, _ = wait(
+                    pending,
+                    timeout=max(0.0, min(next_deadline - now, _MEGA_SEARCH_POLL_INTERVAL)),
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    server = pending.pop(future)
+                    self._finish(server.get("id"), operation)
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        xbmc.log(
+                            f"[MegaSearch] {operation} failed for {server.get('id')}: {exc}",
+                            level=xbmc.LOGWARNING,
+                        )
+                        result = None
+                    yield server, result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def run(self, server, operation, call):
+        """One call under the same deadlines; None when it times out or fails."""
+        for _, result in self.iter_results([(server, call)], operation):
+            return result
+        return None
+
+
+def _run_mega_api_search(
+    scheduler,
+    query,
+    search_type,
+    stalker_type,
+    search_operation,
+    servers,
+    fetch_stalker_search_fn,
+    load_channels_cache_fn,
+    load_cached_category_channels_fn,
+    channels_cache_ttl,
+    all_results,
+    seen_results,
+):
+    """
+    Fan the portal search out over the scheduler and merge each server's hits
+    as they arrive. While the portals answer, live searches are seeded from
+    the local channel caches so cached hits come first.
+    """
+    api_servers, slow_servers = scheduler.order_servers(servers, search_operation)
+    if slow_servers:
+        xbmc.log(
+            f"[MegaSearch] Skipping servers that keep timing out: "
+            f"{[server.get('id') for server in slow_servers]}",
+            level=xbmc.LOGWARNING,
+        )
+
+    def make_call(server):
+        server_id = server.get("id")
+        server_name = server.get("name", server_id)
+
+        def call():
+            results = fetch_stalker_search_fn(stalker_type, query, server=server_id)
+            xbmc.log(
+                f"[MegaSearch] Got {len(results) if results else 0} results from {server_id}",
+                level=xbmc.LOGINFO,
+            )
+            return [
+                _copy_item_with_server(item, server_name, server_id)
+                for item in results or []
+            ]
+
+        return call
+
+    dp = xbmcgui.DialogProgress()
+    dp.create("Mega Cautare", "Se cauta pe toate serverele...")
     try:
-        return future.result(timeout=_MEGA_SEARCH_SERVER_TIMEOUT)
-    except FuturesTimeoutError:
-        future.cancel()
+        results_iter = scheduler.iter_results(
+            [(server, make_call(server)) for server in api_servers],
+            search_operation,
+            should_stop=dp.iscanceled,
+        )
+
+        if search_type == "live":
+            for server in api_servers:
+                if dp.iscanceled():
+                    break
+                server_id = server.get("id")
+                _merge_search_results(
+                    all_results,
+                    seen_results,
+                    _search_live_channels_locally(
+                        query,
+                        server_id,
+                        server.get("name", server_id),
+                        load_channels_cache_fn,
+                        load_cached_category_channels_fn,
+                        channels_cache_ttl,
+                    ),
+                    search_type,
+                )
+
+        completed = 0
+        total = len(api_servers) or 1
+        for server, result in results_iter:
+            completed += 1
+            added = _merge_search_results(all_results, seen_results, result, search_type)
+            dp.update(
+                int((completed / total) * 100),
+                f"Finalizat: [COLOR yellow]{server.get('name')}[/COLOR] "
+                f"({completed}/{total}) - {len(all_results)} rezultate (+{added})",
+            )
+    finally:
+        dp.close()
+
+    if scheduler.timed_out:
         xbmc.log(
-            f"[MegaSearch] Skipping slow server {server_id}: {operation} exceeded "
-            f"{_MEGA_SEARCH_SERVER_TIMEOUT}s",
+            f"[MegaSearch] Servers past their deadline: {sorted(scheduler.timed_out)}",
             level=xbmc.LOGWARNING,
         )
-        return None
+
+
+def _run_mega_live_fallback(
+    scheduler,
+    query,
+    batch_servers,
+    batch_start,
+    fetch_channels_by_category_from_server,
+    load_channels_cache_fn,
+    load_cached_category_channels_fn,
+    channels_cache_ttl,
+    fetch_missing_channel_lists,
+    all_results,
+    seen_results,
+):
+    """Search one batch of portals through their channel lists; returns how many were processed."""
+    dp = xbmcgui.DialogProgress()
+    dp.create("Mega Căutare", "Se caută secvențial pe portaluri...")
+    processed = 0
+    try:
+        total_servers = len(batch_servers) or 1
+        for idx, server in enumerate(batch_servers, start=1):
+            if dp.iscanceled():
+                break
+            if scheduler.expired():
+                # The next page resumes from the first portal not searched.
+                xbmc.log(
+                    "[MegaSearch] Global deadline reached during fallback",
+                    level=xbmc.LOGWARNING,
+                )
+                break
+            processed = idx
+
+            server_id = server.get("id")
+            server_name = server.get("name", server_id)
+            if server_id in scheduler.timed_out:
+                xbmc.log(
+                    f"[MegaSearch] Skipping fallback for timed-out server {server_id}",
+                    level=xbmc.LOGWARNING,
+                )
+                continue
+
+            dp.update(
+                int(((idx - 1) / total_servers) * 100),
+                f"Portal {batch_start + idx}: [COLOR yellow]{server_name}[/COLOR] ({idx}/{total_servers})",
+            )
+            try:
+                matches, had_cache = _search_live_channels_locally(
+                    query,
+                    server_id,
+                    server_name,
+                    load_channels_cache_fn,
+                    load_cached_category_channels_fn,
+                    channels_cache_ttl,
+                    return_cache_status=True,
+                )
+                if matches:
+                    _merge_search_results(all_results, seen_results, matches, "live")
+                    continue
+
+                if not fetch_missing_channel_lists or had_cache:
+                    continue
+                if scheduler.is_slow(server_id, "channel_list"):
+                    xbmc.log(
+                        f"[MegaSearch] Skipping channel list fetch for slow server {server_id}",
+                        level=xbmc.LOGWARNING,
+                    )
+                    continue
+
+                fetched_channels = scheduler.run(
+                    server,
+                    "channel_list",
+                    lambda: fetch_channels_by_category_from_server(None, server_id),
+                )
+                if not fetched_channels:
+                    continue
+                _merge_search_results(
+                    all_results,
+                    seen_results,
+                    _search_live_channels_locally(
+                        query,
+                        server_id,
+                        server_name,
+                        load_channels_cache_fn,
+                        load_cached_category_channels_fn,
+                        channels_cache_ttl,
+                    ),
+                    "live",
+                )
+            except Exception as exc:
+                xbmc.log(
+                    f"[MegaSearch] Sequential fallback failed for {server_id}: {exc}",
+                    level=xbmc.LOGWARNING,
+                )
     finally:
-        _shutdown_executor_without_waiting(executor)
+        dp.close()
+    return processed
 
 
 def show_mega_search_results(
@@ -832,49 +1105,29 @@ def show_mega_search_results(
 
     type_mapping = {"live": "itv", "vod": "vod", "series": "series"}
     stalker_type = type_mapping.get(search_type, "itv")
+    search_operation = f"search_{stalker_type}"
     all_results = []
-    timed_out_server_ids = set()
+    seen_results = set()
     playlist_covered_server_keys = set()
+    scheduler = MegaSearchScheduler()
 
-    if search_type == "live" and playlist_search_fn:
-        try:
-            playlist_results, playlist_covered_server_keys = playlist_search_fn(
-                query, available_servers
-            )
-            all_results.extend(playlist_results or [])
-        except Exception as exc:
-            xbmc.log(
-                f"[MegaSearch] Playlist index failed: {exc}",
-                level=xbmc.LOGWARNING,
-            )
-            playlist_covered_server_keys = set()
-
-    if not skip_api_search and effective_search_mode == "complete":
-        dp = xbmcgui.DialogProgress()
-        dp.create("Mega Cautare", "Se cauta pe toate serverele...")
-
-        def worker(server):
-            server_id = server.get("id")
-            server_name = server.get("name", server_id)
+    try:
+        if search_type == "live" and playlist_search_fn:
             try:
-                results = fetch_stalker_search_fn(stalker_type, query, server=server_id)
-                xbmc.log(
-                    f"[MegaSearch] Got {len(results) if results else 0} results from {server_id}",
-                    level=xbmc.LOGINFO,
+                playlist_results, playlist_covered_server_keys = playlist_search_fn(
+                    query, available_servers
+                )
+                _merge_search_results(
+                    all_results, seen_results, playlist_results, search_type
                 )
-                if results:
-                    return [
-                        _copy_item_with_server(item, server_name, server_id)
-                        for item in results
-                    ]
             except Exception as exc:
                 xbmc.log(
-                    f"[MegaSearch] Worker failed for {server_id}: {exc}",
+                    f"[MegaSearch] Playlist index failed: {exc}",
                     level=xbmc.LOGWARNING,
                 )
-            return []
+                playlist_covered_server_keys = set()
 
-        api_servers = [
+        uncovered_servers = [
             server
             for server in available_servers
             if (
@@ -884,166 +1137,65 @@ def show_mega_search_results(
             )
             not in playlist_covered_server_keys
         ]
-        max_workers = min(len(api_servers), _MEGA_SEARCH_MAX_WORKERS)
-        executor = None
-        try:
-            future_to_server = {}
-            if api_servers:
-                executor = ThreadPoolExecutor(max_workers=max_workers or 1)
-                future_to_server = {
-                    executor.submit(worker, server): server for server in api_servers
-                }
 
-            completed = 0
-            total = len(api_servers)
-            search_timeout = _MEGA_SEARCH_SERVER_TIMEOUT
-            try:
-                for future in as_completed(future_to_server, timeout=search_timeout):
-                    if dp.iscanceled():
-                        break
-
-                    result = future.result()
-                    if result:
-                        all_results.extend(result)
-
-                    completed += 1
-                    progress = int((completed / total) * 100)
-                    server = future_to_server[future]
-                    dp.update(
-                        progress,
-                        f"Finalizat: [COLOR yellow]{server.get('name')}[/COLOR] ({completed}/{total})",
-                    )
-            except FuturesTimeoutError:
-                slow_servers = []
-                for future, server in future_to_server.items():
-                    if future.done():
-                        continue
-                    future.cancel()
-                    server_id = server.get("id")
-                    if server_id:
-                        timed_out_server_ids.add(server_id)
-                    slow_servers.append(server.get("name", server_id))
+        if not skip_api_search and effective_search_mode == "complete":
+            _run_mega_api_search(
+                scheduler,
+                query,
+                search_type,
+                stalker_type,
+                search_operation,
+                uncovered_servers,
+                fetch_stalker_search_fn,
+                load_channels_cache_fn,
+                load_cached_category_channels_fn,
+                channels_cache_ttl,
+                all_results,
+                seen_results,
+            )
 
+        next_batch_start = None
+        next_batch_count = 0
+        if (
+            not all_results
+            and search_type == "live"
+            and effective_search_mode == "complete"
+        ):
+            if skip_api_search:
                 xbmc.log(
-                    f"[MegaSearch] Search timeout after {search_timeout}s; "
-                    f"skipping slow servers: {slow_servers}",
-                    level=xbmc.LOGWARNING,
+                    f"[MegaSearch] Continuing sequential live fallback from portal #{batch_start + 1}",
+                    level=xbmc.LOGINFO,
                 )
-        finally:
-            if executor is not None:
-                _shutdown_executor_without_waiting(executor)
-            dp.close()
-        all_results = _dedupe_search_results(all_results, search_type)
-
-    next_batch_start = None
-    next_batch_count = 0
-    if (
-        not all_results
-        and search_type == "live"
-        and effective_search_mode == "complete"
-    ):
-        if skip_api_search:
-            xbmc.log(
-                f"[MegaSearch] Continuing sequential live fallback from portal #{batch_start + 1}",
-                level=xbmc.LOGINFO,
-            )
-        else:
-            xbmc.log(
-                "[MegaSearch] No results from API, trying sequential local/fetch fallback for live",
-                level=xbmc.LOGINFO,
-            )
-
-        fallback_servers = [
-            server
-            for server in available_servers
-            if (
-                server.get("id") or "",
-                server.get("name") or "",
-                (server.get("portal_url") or "").rstrip("/"),
-            )
-            not in playlist_covered_server_keys
-        ]
-        batch_servers = fallback_servers[
-            batch_start : batch_start + fetch_batch_size
-        ]
-        next_batch_start = batch_start + len(batch_servers)
-        if next_batch_start < len(fallback_servers):
-            next_batch_count = min(
-                fetch_batch_size, len(fallback_servers) - next_batch_start
-            )
-        dp = xbmcgui.DialogProgress()
-        dp.create("Mega Căutare", "Se caută secvențial pe portaluri...")
-        try:
-            total_servers = len(batch_servers) or 1
-            for idx, server in enumerate(batch_servers, start=1):
-                if dp.iscanceled():
-                    break
-
-                server_id = server.get("id")
-                server_name = server.get("name", server_id)
-                server_key = (
-                    server_id or "",
-                    server_name or "",
-                    (server.get("portal_url") or "").rstrip("/"),
+            else:
+                xbmc.log(
+                    "[MegaSearch] No results from API, trying sequential local/fetch fallback for live",
+                    level=xbmc.LOGINFO,
                 )
-                if server_key in playlist_covered_server_keys:
-                    continue
-                if server_id in timed_out_server_ids:
-                    xbmc.log(
-                        f"[MegaSearch] Skipping fallback for timed-out server {server_id}",
-                        level=xbmc.LOGWARNING,
-                    )
-                    continue
 
-                dp.update(
-                    int(((idx - 1) / total_servers) * 100),
-                    f"Portal {batch_start + idx}: [COLOR yellow]{server_name}[/COLOR] ({idx}/{total_servers})",
+            # Batches keep config order so batch_start stays stable between pages.
+            batch_servers = uncovered_servers[
+                batch_start : batch_start + fetch_batch_size
+            ]
+            processed = _run_mega_live_fallback(
+                scheduler,
+                query,
+                batch_servers,
+                batch_start,
+                fetch_channels_by_category_from_server,
+                load_channels_cache_fn,
+                load_cached_category_channels_fn,
+                channels_cache_ttl,
+                fetch_missing_channel_lists,
+                all_results,
+                seen_results,
+            )
+            next_batch_start = batch_start + processed
+            if next_batch_start < len(uncovered_servers):
+                next_batch_count = min(
+                    fetch_batch_size, len(uncovered_servers) - next_batch_start
                 )
-                try:
-                    matches, had_cache = _search_live_channels_locally(
-                        query,
-                        server_id,
-                        server_name,
-                        load_channels_cache_fn,
-                        load_cached_category_channels_fn,
-                        channels_cache_ttl,
-                        return_cache_status=True,
-                    )
-                    if matches:
-                        all_results.extend(matches)
-                        continue
-
-                    if not fetch_missing_channel_lists:
-                        continue
-
-                    if not had_cache:
-                        fetched_channels = _run_mega_search_call_with_timeout(
-                            lambda: fetch_channels_by_category_from_server(
-                                None, server_id
-                            ),
-                            server_id,
-                            "channel list fetch",
-                        )
-                        if not fetched_channels:
-                            continue
-                        matches = _search_live_channels_locally(
-                            query,
-                            server_id,
-                            server_name,
-                            load_channels_cache_fn,
-                            load_cached_category_channels_fn,
-                            channels_cache_ttl,
-                        )
-                        if matches:
-                            all_results.extend(matches)
-                except Exception as exc:
-                    xbmc.log(
-                        f"[MegaSearch] Sequential fallback failed for {server_id}: {exc}",
-                        level=xbmc.LOGWARNING,
-                    )
-        finally:
-            dp.close()
-        all_results = _dedupe_search_results(all_results, search_type)
+    finally:
+        scheduler.close()
 
     # Cache the results with metadata before rendering
     cache_data = {
@@ -1257,9 +1409,7 @@ def show_search_results(
     channels_cache_ttl,
     load_favorite_stream_ids,
     is_epg_enabled,
-    epg_contains,
-    get_epg_items,
-    get_current_program,
+    get_epg_now_next,
     format_epg_tooltip,
     re_stream_id,
 ):
@@ -1318,23 +1468,30 @@ def show_search_results(
     )
     favorite_stream_ids = load_favorite_stream_ids(server)
 
+    resolved_channels = []
     for channel in matching_channels:
-        name = channel.get("name", "Unknown")
-        logo = channel.get("logo") or ""
-        cmd = channel.get("cmd", "")
-
-        stream_id_match = re_stream_id.search(cmd)
+        stream_id_match = re_stream_id.search(channel.get("cmd", ""))
         stream_id = (
             stream_id_match.group(1) if stream_id_match else channel.get("id")
         )
-        if not stream_id:
-            continue
+        if stream_id:
+            resolved_channels.append((channel, stream_id))
+
+    epg_now_next = (
+        get_epg_now_next([stream_id for _, stream_id in resolved_channels])
+        if is_epg_enabled()
+        else {}
+    )
+
+    for channel, stream_id in resolved_channels:
+        name = channel.get("name", "Unknown")
+        logo = channel.get("logo") or ""
+        cmd = channel.get("cmd", "")
 
         channel_label = name
         plot = ""
-        if is_epg_enabled() and epg_contains(stream_id):
-            epg_items = get_epg_items(stream_id)
-            current_prog = get_current_program(epg_items)
+        current_prog, epg_items = epg_now_next.get(stream_id, (None, None))
+        if epg_items:
             if current_prog:
                 channel_label = f"{name} - {current_prog}"
             plot = format_epg_tooltip(epg_items)
@@ -1,12 +1,12 @@
+import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import quote_plus
 
 import xbmc
-import xbmcaddon
 import xbmcgui
 import xbmcplugin
-import xbmcvfs
 
 from hublive_backend import (
     _append_kodi_headers,
@@ -27,68 +27,12 @@ from hublive_backend import (
     TIMEOUTS,
 )
 
+from hublive_db import get_connection, get_profile_path
+from kv_cache import KVCache
 from playback_state import clear_playback_state
 
 _BROWSE_CACHE_TTL = 300
-_browse_cache = {}
-
-
-def _get_browse_cache_file():
-    addon = xbmcaddon.Addon()
-    profile_path = addon.getAddonInfo("profile")
-    try:
-        resolved = xbmcvfs.translatePath(profile_path)
-    except Exception:
-        resolved = xbmc.translatePath(profile_path)
-
-    if not os.path.exists(resolved):
-        os.makedirs(resolved)
-    return os.path.join(resolved, "vod_series_cache.json")
-
-
-def _load_persisted_browse_cache():
-    cache_file = _get_browse_cache_file()
-    try:
-        if not os.path.exists(cache_file):
-            return
-        import json
-
-        with open(cache_file, "r", encoding="utf-8") as handle:
-            payload = json.load(handle)
-        if not isinstance(payload, dict):
-            return
-        now = time.time()
-        for key, entry in payload.items():
-            if not isinstance(entry, dict):
-                continue
-            timestamp = float(entry.get("timestamp", 0) or 0)
-            if not timestamp or (now - timestamp) >= _BROWSE_CACHE_TTL:
-                continue
-            _browse_cache[key] = entry
-    except Exception as exc:
-        xbmc.log(f"[BrowseCache] Failed to load persisted cache: {exc}", level=xbmc.LOGWARNING)
-
-
-def _persist_browse_cache():
-    cache_file = _get_browse_cache_file()
-    try:
-        import json
-
-        payload = {}
-        now = time.time()
-        for key, entry in list(_browse_cache.items()):
-            timestamp = float(entry.get("timestamp", 0) or 0)
-            if not timestamp or (now - timestamp) >= _BROWSE_CACHE_TTL:
-                _browse_cache.pop(key, None)
-                continue
-            payload[key] = entry
-        with open(cache_file, "w", encoding="utf-8") as handle:
-            json.dump(payload, handle, ensure_ascii=True)
-    except Exception as exc:
-        xbmc.log(f"[BrowseCache] Failed to persist cache: {exc}", level=xbmc.LOGWARNING)
-
-
-_load_persisted_browse_cache()
+_browse_cache = KVCache("browse", _BROWSE_CACHE_TTL)
 
 
 def _build_cache_key(*parts):
@@ -96,35 +40,34 @@ def _build_cache_key(*parts):
 
 
 def _get_cached_value(*parts):
-    cache_key = _build_cache_key(*parts)
-    entry = _browse_cache.get(cache_key)
-    if not entry:
-        return None
-    if (time.time() - entry.get("timestamp", 0)) >= _BROWSE_CACHE_TTL:
-        _browse_cache.pop(cache_key, None)
-        _persist_browse_cache()
+    entry = _browse_cache.get(_build_cache_key(*parts))
+    if entry is None:
         return None
     return entry.get("value")
 
 
 def _set_cached_value(value, *parts):
-    cache_key = _build_cache_key(*parts)
-    _browse_cache[cache_key] = {"value": value, "timestamp": time.time()}
-    _persist_browse_cache()
+    _browse_cache.set(_build_cache_key(*parts), {"value": value})
     return value
 
 
 def clear_vod_series_cache(server=None):
+    _clear_cached_pages(server)
     if server is None:
         _browse_cache.clear()
-        _persist_browse_cache()
+        # vod_series_cache.json was written by older versions.
+        legacy_file = get_profile_path("vod_series_cache.json")
+        try:
+            if os.path.exists(legacy_file):
+                os.remove(legacy_file)
+        except Exception as exc:
+            xbmc.log(
+                f"[BrowseCache] Failed to remove legacy cache file: {exc}",
+                level=xbmc.LOGWARNING,
+            )
         return
 
-    prefix = f"{server}:"
-    for cache_key in list(_browse_cache):
-        if cache_key.startswith(prefix):
-            _browse_cache.pop(cache_key, None)
-    _persist_browse_cache()
+    _browse_cache.delete_prefix(f"{server}:")
 
 
 def _get_cached_or_fetch(cache_parts, fetch_fn):
@@ -142,111 +85,278 @@ def _get_cached_or_fetch(cache_parts, fetch_fn):
     return fetched_value
 
 
-def fetch_stalker_paginated(type_param, category_id, server="server1", timeouts=None):
-    """Fetch all pages for a VOD/series category."""
-    cache_parts = (server, type_param, "category", category_id)
-    cached_items = _get_cached_value(*cache_parts)
-    if cached_items is not None:
-        return cached_items
+_PAGE_STORE_FILE = "vod_series_pages.db"
+_PAGE_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS category_pages(
+    server TEXT NOT NULL,
+    type TEXT NOT NULL,
+    category_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    total_pages INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY(server, type, category_id, page)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_category_pages_timestamp ON category_pages(timestamp);
+CREATE TABLE IF NOT EXISTS portal_endpoints(
+    portal_url TEXT PRIMARY KEY,
+    path TEXT NOT NULL
+);
+"""
+_ENDPOINT_PATHS = ("portal.php", "server/load.php")
+_MAX_CATEGORY_PAGES = 100
+_PAGE_FETCH_WORKERS = 6
+_working_endpoints = {}
+
+
+def _page_store():
+    return get_connection(get_profile_path(_PAGE_STORE_FILE), _PAGE_STORE_SCHEMA)
+
+
+def _ordered_endpoints(portal_url):
+    """Portal endpoints to try, the one that answered last time first."""
+    portal_url = portal_url.rstrip("/")
+    if portal_url not in _working_endpoints:
+        try:
+            row = _page_store().execute(
+                "SELECT path FROM portal_endpoints WHERE portal_url = ?", (portal_url,)
+            ).fetchone()
+        except Exception:
+            row = None
+        _working_endpoints[portal_url] = row[0] if row else None
 
-    token, headers, cookies, portal_url, random_val = get_server_auth(server)
-    if not token or not portal_url:
-        return []
+    preferred = _working_endpoints[portal_url]
+    paths = sorted(_ENDPOINT_PATHS, key=lambda path: path != preferred)
+    return [(path, f"{portal_url}/{path}") for path in paths]
 
-    base_url = f"{portal_url.rstrip('/')}/portal.php"
-    param_key = "category" if type_param in ["vod", "series"] else "genre"
 
-    all_items = []
-    current_page = 1
-    total_pages = 1
-    request_timeout = (timeouts or {}).get("channels", 20)
+def _remember_endpoint(portal_url, path):
+    portal_url = portal_url.rstrip("/")
+    if _working_endpoints.get(portal_url) == path:
+        return
+    _working_endpoints[portal_url] = path
+    try:
+        connection = _page_store()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO portal_endpoints VALUES(?,?)", (portal_url, path)
+            )
+    except Exception as exc:
+        xbmc.log(f"[Stalker] Failed to remember endpoint for {portal_url}: {exc}", level=xbmc.LOGDEBUG)
 
-    endpoints = [
-        f"{portal_url.rstrip('/')}/portal.php",
-        f"{portal_url.rstrip('/')}/server/load.php",
-    ]
 
-    while current_page <= total_pages:
+def _load_cached_pages(server, type_param, category_id):
+    """Fresh pages saved by an earlier (possibly partial) fetch: ({page: items}, total_pages)."""
+    try:
+        rows = _page_store().execute(
+            """
+            SELECT page, total_pages, payload FROM category_pages
+            WHERE server = ? AND type = ? AND category_id = ? AND timestamp > ?
+            """,
+            (server, type_param, str(category_id), time.time() - _BROWSE_CACHE_TTL),
+        ).fetchall()
+    except Exception as exc:
+        xbmc.log(f"[BrowseCache] Failed to load cached pages: {exc}", level=xbmc.LOGWARNING)
+        return {}, 0
+
+    pages = {}
+    total_pages = 0
+    for page, page_total, payload in rows:
         try:
-            # Re-build headers to ensure X-Random is fresh
-            headers, cookies = _build_auth_headers_and_cookies(portal_url, cookies.get("mac", ""), token, random_val)
-            
-            page_items = []
-            page_data = None
-
-            for url in endpoints:
-                params = {
-                    "type": type_param,
-                    "action": "get_ordered_list",
-                    param_key: category_id,
-                    "JsHttpRequest": "1-xml",
-                    "p": current_page,
-                }
-
-                try:
-                    response = get_session().get(
-                        url,
-                        params=params,
-                        headers=headers,
-                        cookies=cookies,
-                        timeout=request_timeout,
-                        verify=False,
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    js_data = data.get("js", {})
-
-                    if isinstance(js_data, dict):
-                        page_items = js_data.get("data") or js_data.get("channels") or js_data.get("items") or js_data.get("result") or []
-                        if page_items or js_data.get("total_items"):
-                            page_data = js_data
-                            break
-                    elif isinstance(js_data, list) and js_data:
-                        page_items = js_data
-                        page_data = {"js": js_data, "total_items": len(js_data)}
-                        break
-                    
-                    xbmc.log(f"[Stalker] Empty response from {url} for {type_param} cat {category_id} (page {current_page}), trying next...", level=xbmc.LOGDEBUG)
-                except Exception as exc:
-                    xbmc.log(f"[Stalker] Failed to fetch from {url} for {type_param} cat {category_id} (page {current_page}): {exc}", level=xbmc.LOGDEBUG)
-                    continue
-
-            if not page_items:
-                break
-
-            if current_page == 1 and page_data:
-                if isinstance(page_data, dict):
-                    total_items = int(page_data.get("total_items", 0) or 0)
-                    if not total_items and page_items:
-                        total_items = len(page_items)
-                    
-                    items_per_page = len(page_items)
-                    if items_per_page > 0:
-                        total_pages = (total_items + items_per_page - 1) // items_per_page
-                    
-                    xbmc.log(
-                        f"[Stalker] Total items: {total_items}, Pages: {total_pages} for {type_param} cat {category_id}",
-                        level=xbmc.LOGINFO,
-                    )
-                else:
-                    total_pages = 1
-
-            all_items.extend(page_items)
-            current_page += 1
-
-            if current_page > 100:
-                break
+            pages[page] = json.loads(payload)
+        except ValueError:
+            continue
+        total_pages = max(total_pages, page_total)
+    return pages, total_pages
 
-        except Exception as exc:
-            xbmc.log(
-                f"[Stalker] Pagination error at page {current_page}: {exc}",
-                level=xbmc.LOGERROR,
+
+def _save_cached_page(server, type_param, category_id, page, total_pages, items):
+    now = time.time()
+    try:
+        connection = _page_store()
+        with connection:
+            # Expired pages are never read again; drop them so the store stays bounded.
+            connection.execute(
+                "DELETE FROM category_pages WHERE timestamp <= ?", (now - _BROWSE_CACHE_TTL,)
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO category_pages VALUES(?,?,?,?,?,?,?)",
+                (
+                    server,
+                    type_param,
+                    str(category_id),
+                    page,
+                    total_pages,
+                    now,
+                    json.dumps(items, ensure_ascii=True),
+                ),
+            )
+    except Exception as exc:
+        xbmc.log(f"[BrowseCache] Failed to save page {page}: {exc}", level=xbmc.LOGWARNING)
+
+
+def _clear_cached_pages(server=None):
+    try:
+        connection = _page_store()
+        with connection:
+            if server is None:
+                connection.execute("DELETE FROM category_pages")
+            else:
+                connection.execute("DELETE FROM category_pages WHERE server = ?", (server,))
+    except Exception as exc:
+        xbmc.log(f"[BrowseCache] Failed to clear cached pages: {exc}", level=xbmc.LOGWARNING)
+
+
+def _fetch_category_page(portal_url, params, headers, cookies, request_timeout):
+    """One get_ordered_list page: (items, js_data) from the first endpoint that answers."""
+    page = params.get("p")
+    for path, url in _ordered_endpoints(portal_url):
+        try:
+            response = get_session().get(
+                url,
+                params=params,
+                headers=headers,
+                cookies=cookies,
+                timeout=request_timeout,
+                verify=False,
             )
-            break
+            response.raise_for_status()
+            data = response.json()
+            js_data = data.get("js", {})
+
+            if isinstance(js_data, dict):
+                page_items = js_data.get("data") or js_data.get("channels") or js_data.get("items") or js_data.get("result") or []
+                if page_items or js_data.get("total_items"):
+                    _remember_endpoint(portal_url, path)
+                    return page_items, js_data
+            elif isinstance(js_data, list) and js_data:
+                _remember_endpoint(portal_url, path)
+                return js_data, {"js": js_data, "total_items": len(js_data)}
+
+            xbmc.log(f"[Stalker] Empty response from {url} for {params.get('type')} (page {page}), trying next...", level=xbmc.LOGDEBUG)
+        except Exception as exc:
+            xbmc.log(f"[Stalker] Failed to fetch from {url} for {params.get('type')} (page {page}): {exc}", level=xbmc.LOGDEBUG)
+    return [], None
 
-    if all_items:
-        _set_cached_value(all_items, *cache_parts)
-    return all_items
+
+def iter_stalker_pages(type_param, category_id, server="server1", timeouts=None):
+    """
+    Yield the items of a VOD/series category page by page, in page order.
+
+    Page 1 gives the total; the remaining pages are fetched concurrently and
+    each is saved to disk as it arrives, so an interrupted fetch resumes from
+    the pages it already has. The fully assembled list goes to the browse cache.
+    """
+    cache_parts = (server, type_param, "category", category_id)
+    cached_items = _get_cached_value(*cache_parts)
+    if cached_items is not None:
+        yield cached_items
+        return
+
+    pages, total_pages = _load_cached_pages(server, type_param, category_id)
+    params_base = {
+        "type": type_param,
+        "action": "get_ordered_list",
+        "category" if type_param in ["vod", "series"] else "genre": category_id,
+        "JsHttpRequest": "1-xml",
+    }
+    request_timeout = (timeouts or {}).get("channels", 20)
+
+    auth = None
+    if 1 not in pages or len(pages) < total_pages:
+        token, headers, cookies, portal_url, random_val = get_server_auth(server)
+        if not token or not portal_url:
+            for page in sorted(pages):
+                yield pages[page]
+            return
+        headers, cookies = _build_auth_headers_and_cookies(portal_url, cookies.get("mac", ""), token, random_val)
+        auth = (portal_url, headers, cookies)
+
+    if 1 not in pages:
+        page_items, page_data = _fetch_category_page(
+            auth[0], dict(params_base, p=1), auth[1], auth[2], request_timeout
+        )
+        if not page_items:
+            return
+        total_items = int((page_data or {}).get("total_items", 0) or 0) or len(page_items)
+        total_pages = min(
+            (total_items + len(page_items) - 1) // len(page_items), _MAX_CATEGORY_PAGES
+        )
+        xbmc.log(
+            f"[Stalker] Total items: {total_items}, Pages: {total_pages} for {type_param} cat {category_id}",
+            level=xbmc.LOGINFO,
+        )
+        pages[1] = page_items
+        _save_cached_page(server, type_param, category_id, 1, total_pages, page_items)
+
+    total_pages = max(total_pages, 1)
+    missing = [page for page in range(2, total_pages + 1) if page not in pages]
+    next_page = 1
+    executor = None
+    futures = {}
+    try:
+        if missing:
+            executor = ThreadPoolExecutor(max_workers=min(_PAGE_FETCH_WORKERS, len(missing)))
+            futures = {
+                executor.submit(
+                    _fetch_category_page,
+                    auth[0],
+                    dict(params_base, p=page),
+                    auth[1],
+                    auth[2],
+                    request_timeout,
+                ): page
+                for page in missing
+            }
+
+        # Hand pages out in order; later pages that finish early wait in `pages`.
+        while next_page in pages:
+            yield pages[next_page]
+            next_page += 1
+
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                page_items, _ = future.result()
+            except Exception as exc:
+                xbmc.log(f"[Stalker] Pagination error at page {page}: {exc}", level=xbmc.LOGERROR)
+                page_items = []
+            pages[page] = page_items
+            if page_items:
+                _save_cached_page(server, type_param, category_id, page, total_pages, page_items)
+            while next_page in pages:
+                yield pages[next_page]
+                next_page += 1
+
+        while next_page <= total_pages:
+            yield pages.get(next_page, [])
+            next_page += 1
+    finally:
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    if all(pages.get(page) for page in range(1, total_pages + 1)):
+        _set_cached_value(
+            [item for page in range(1, total_pages + 1) for item in pages[page]],
+            *cache_parts,
+        )
+    else:
+        xbmc.log(
+            f"[Stalker] Partial fetch for {type_param} cat {category_id}: "
+            f"{sum(1 for items in pages.values() if items)}/{total_pages} pages kept for retry",
+            level=xbmc.LOGWARNING,
+        )
+
+
+def fetch_stalker_paginated(type_param, category_id, server="server1", timeouts=None):
+    """Fetch all pages for a VOD/series category."""
+    return [
+        item
+        for page_items in iter_stalker_pages(type_param, category_id, server, timeouts)
+        for item in page_items
+    ]
 
 
 def fetch_vod_items(category_id, server="server1", timeouts=None):
@@ -257,16 +367,19 @@ def fetch_series_items(category_id, server="server1", timeouts=None):
     return fetch_stalker_paginated("series", category_id, server, timeouts=timeouts)
 
 
-def list_vod_items(base_url, handle, category_id, server="server1", timeouts=None):
-    items = fetch_vod_items(category_id, server, timeouts=timeouts)
-    if not items:
-        xbmcgui.Dialog().notification(
-            "Informații", "Nu există filme în această categorie."
-        )
-        xbmcplugin.endOfDirectory(handle, succeeded=False)
-        return
+def _add_category_pages(handle, pages, build_entry):
+    """Add each page to the directory as soon as it arrives; returns the item count."""
+    added = 0
+    for page_items in pages:
+        entries = [build_entry(item) for item in page_items]
+        if entries:
+            xbmcplugin.addDirectoryItems(handle, entries, len(entries))
+            added += len(entries)
+    return added
+
 
-    for item in items:
+def list_vod_items(base_url, handle, category_id, server="server1", timeouts=None):
+    def _entry(item):
         name = item.get("name", "Unknown")
         movie_id = item.get("id")
         li = xbmcgui.ListItem(label=name)
@@ -276,21 +389,21 @@ def list_vod_items(base_url, handle, category_id, server="server1", timeouts=Non
         )
         li.setProperty("IsPlayable", "true")
         url = f"{base_url}?mode=play_vod&movie_id={movie_id}&server={server}"
-        xbmcplugin.addDirectoryItem(handle=handle, url=url, listitem=li, isFolder=False)
-
-    xbmcplugin.endOfDirectory(handle)
+        return url, li, False
 
-
-def list_series_items(base_url, handle, category_id, server="server1", timeouts=None):
-    items = fetch_series_items(category_id, server, timeouts=timeouts)
-    if not items:
+    pages = iter_stalker_pages("vod", category_id, server, timeouts=timeouts)
+    if not _add_category_pages(handle, pages, _entry):
         xbmcgui.Dialog().notification(
-            "Informații", "Nu există seriale în această categorie."
+            "Informații", "Nu există filme în această categorie."
         )
         xbmcplugin.endOfDirectory(handle, succeeded=False)
         return
 
-    for item in items:
+    xbmcplugin.endOfDirectory(handle)
+
+
+def list_series_items(base_url, handle, category_id, server="server1", timeouts=None):
+    def _entry(item):
         name = item.get("name", "Unknown")
         series_id = item.get("id")
         li = xbmcgui.ListItem(label=name)
@@ -300,7 +413,15 @@ def list_series_items(base_url, handle, category_id, server="server1", timeouts=
         )
         movie_id = str(series_id).split(":")[0]
         url = f"{base_url}?mode=list_seasons&movie_id={movie_id}&server={server}"
-        xbmcplugin.addDirectoryItem(handle=handle, url=url, listitem=li, isFolder=True)
+        return url, li, True
+
+    pages = iter_stalker_pages("series", category_id, server, timeouts=timeouts)
+    if not _add_category_pages(handle, pages, _entry):
+        xbmcgui.Dialog().notification(
+            "Informații", "Nu există seriale în această categorie."
+        )
+        xbmcplugin.endOfDirectory(handle, succeeded=False)
+        return
 
     xbmcplugin.endOfDirectory(handle)
 
@@ -314,12 +435,7 @@ def fetch_seasons(movie_id, server="server1", timeouts=None):
         # Re-build headers to ensure X-Random and other identity markers are fresh
         headers, cookies = _build_auth_headers_and_cookies(portal_url, cookies.get("mac", ""), token, random_val)
         
-        endpoints = [
-            f"{portal_url.rstrip('/')}/portal.php",
-            f"{portal_url.rstrip('/')}/server/load.php",
-        ]
-        
-        for url in endpoints:
+        for path, url in _ordered_endpoints(portal_url):
             try:
                 response = get_session().get(
                     url,
@@ -341,8 +457,10 @@ def fetch_seasons(movie_id, server="server1", timeouts=None):
                 if isinstance(js_data, dict):
                     page_items = js_data.get("data") or js_data.get("items") or []
                     if page_items:
+                        _remember_endpoint(portal_url, path)
                         return page_items
                 elif isinstance(js_data, list) and js_data:
+                    _remember_endpoint(portal_url, path)
                     return js_data
             except Exception as exc:
                 xbmc.log(f"[Series:Seasons] Failed to fetch from {url}: {exc}", level=xbmc.LOGDEBUG)
@@ -381,12 +499,7 @@ def fetch_episodes(movie_id, season_id, server="server1", timeouts=None):
         # Re-build headers to ensure X-Random and other identity markers are fresh
         headers, cookies = _build_auth_headers_and_cookies(portal_url, cookies.get("mac", ""), token, random_val)
         
-        endpoints = [
-            f"{portal_url.rstrip('/')}/portal.php",
-            f"{portal_url.rstrip('/')}/server/load.php",
-        ]
-        
-        for url in endpoints:
+        for path, url in _ordered_endpoints(portal_url):
             try:
                 response = get_session().get(
                     url,
@@ -409,8 +522,10 @@ def fetch_episodes(movie_id, season_id, server="server1", timeouts=None):
                 if isinstance(js_data, dict):
                     page_items = js_data.get("data") or js_data.get("items") or []
                     if page_items:
+                        _remember_endpoint(portal_url, path)
                         return page_items
                 elif isinstance(js_data, list) and js_data:
+                    _remember_endpoint(portal_url, path)
                     return js_data
             except Exception as exc:
                 xbmc.log(f"[Series:Episodes] Failed to fetch from {url}: {exc}", level=xbmc.LOGDEBUG)
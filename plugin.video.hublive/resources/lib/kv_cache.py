@@ -0,0 +1,161 @@
+import json
+import time
+
+import xbmc
+
+from hublive_db import get_connection, get_profile_path
+
+
+KV_CACHE_FILE = "kv_cache.db"
+_KV_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv_entries(
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY(namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_kv_entries_lru ON kv_entries(namespace, accessed);
+"""
+# Reads only refresh the LRU stamp when it is older than this, so hot hits stay read-only.
+_TOUCH_INTERVAL = 30
+
+
+class KVCache:
+    """
+    Size-bounded key/value cache stored in the profile's kv_cache.db.
+
+    Each module gets its own namespace with a default TTL and a byte budget;
+    a write touches one row and evicts least-recently-used entries only when
+    the namespace grows past its budget, instead of rewriting a whole file.
+    """
+
+    def __init__(self, namespace, ttl, max_bytes=4 * 1024 * 1024):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _store(self):
+        return get_connection(get_profile_path(KV_CACHE_FILE), _KV_CACHE_SCHEMA)
+
+    def _log_failure(self, action, exc):
+        xbmc.log(
+            f"[KVCache] Failed to {action} in {self.namespace}: {exc}",
+            level=xbmc.LOGWARNING,
+        )
+
+    def get(self, key):
+        """Cached value for key, or None when missing or expired."""
+        now = time.time()
+        try:
+            connection = self._store()
+            row = connection.execute(
+                """
+                SELECT value, expires, accessed FROM kv_entries
+                WHERE namespace = ? AND key = ?
+                """,
+                (self.namespace, key),
+            ).fetchone()
+            if not row:
+                return None
+            value, expires, accessed = row
+            if expires <= now:
+                with connection:
+                    connection.execute(
+                        "DELETE FROM kv_entries WHERE namespace = ? AND key = ?",
+                        (self.namespace, key),
+                    )
+                return None
+            if now - accessed >= _TOUCH_INTERVAL:
+                with connection:
+                    connection.execute(
+                        "UPDATE kv_entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key),
+                    )
+            return json.loads(value)
+        except Exception as exc:
+            self._log_failure(f"read {key}", exc)
+            return None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        try:
+            payload = json.dumps(value, ensure_ascii=True, separators=(",", ":"))
+        except (TypeError, ValueError) as exc:
+            self._log_failure(f"encode {key}", exc)
+            return value
+
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            connection = self._store()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO kv_entries VALUES(?,?,?,?,?,?)",
+                    (self.namespace, key, payload, len(payload), now + ttl, now),
+                )
+                self._evict(connection, now)
+        except Exception as exc:
+            self._log_failure(f"write {key}", exc)
+        return value
+
+    def _evict(self, connection, now):
+        connection.execute(
+            "DELETE FROM kv_entries WHERE namespace = ? AND expires <= ?",
+            (self.namespace, now),
+        )
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM kv_entries WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        # Oldest reads go first until the namespace fits its budget again.
+        evicted = 0
+        for key, size in connection.execute(
+            """
+            SELECT key, size FROM kv_entries
+            WHERE namespace = ? ORDER BY accessed
+            """,
+            (self.namespace,),
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            connection.execute(
+                "DELETE FROM kv_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            total -= size
+            evicted += 1
+        xbmc.log(
+            f"[KVCache] Evicted {evicted} entries from {self.namespace}",
+            level=xbmc.LOGDEBUG,
+        )
+
+    def delete_prefix(self, *prefixes):
+        """Drop every key starting with one of the prefixes."""
+        try:
+            connection = self._store()
+            with connection:
+                for prefix in prefixes:
+                    connection.execute(
+                        """
+                        DELETE FROM kv_entries
+                        WHERE namespace = ? AND substr(key, 1, ?) = ?
+                        """,
+                        (self.namespace, len(prefix), prefix),
+                    )
+        except Exception as exc:
+            self._log_failure("delete entries", exc)
+
+    def clear(self):
+        try:
+            connection = self._store()
+            with connection:
+                connection.execute(
+                    "DELETE FROM kv_entries WHERE namespace = ?", (self.namespace,)
+                )
+        except Exception as exc:
+            self._log_failure("clear", exc)
@@ -0,0 +1,50 @@
+import io
+import re
+
+
+_RE_ATTRIBUTE = re.compile(r'([\w-]+)=(?:"([^"]*)"|\'([^\']*)\'|([^\s,"\']+))')
+
+
+def iter_m3u_entries(lines):
+    """
+    Stream (extinf_line, url_line) pairs from any iterable of lines (an open
+    file, or str.splitlines()). Comment lines between #EXTINF and its URL are
+    skipped; nothing is buffered beyond the pending #EXTINF line.
+    """
+    pending = None
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line[:7].upper() == "#EXTINF":
+            pending = line
+            continue
+        if line.startswith("#") or pending is None:
+            continue
+        yield pending, line
+        pending = None
+
+
+def iter_m3u_bytes(content):
+    """Stream entries of a downloaded playlist without decoding it into one list of lines."""
+    return iter_m3u_entries(io.TextIOWrapper(io.BytesIO(content), encoding="utf-8", errors="ignore"))
+
+
+def iter_m3u_file(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as handle:
+        yield from iter_m3u_entries(handle)
+
+
+def extinf_name(extinf, default="Unknown Channel"):
+    _, comma, name = extinf.rpartition(",")
+    return name.strip() if comma else default
+
+
+def extinf_attributes(extinf):
+    """All key="value" attributes of an #EXTINF line in one pass, keys lowercased."""
+    header = extinf.rpartition(",")[0] or extinf
+    attributes = {}
+    for match in _RE_ATTRIBUTE.finditer(header):
+        value = next((group for group in match.groups()[1:] if group is not None), "")
+        attributes[match.group(1).lower()] = value.strip()
+    return attributes
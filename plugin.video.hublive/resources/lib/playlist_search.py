@@ -13,6 +13,7 @@ import xbmc
 import xbmcaddon
 import xbmcvfs
 
+from m3u_parser import extinf_name, iter_m3u_bytes, iter_m3u_file
 
 _INDEX_ARCHIVE = os.path.join(
     os.path.dirname(os.path.dirname(__file__)),
@@ -39,6 +40,11 @@ _SERVER_NAME_RE = re.compile(
     r"^Server\s+(\d+)(?:\s+.*)?$",
     re.IGNORECASE,
 )
+_FTS_TABLE = "channels_fts"
+_FTS_TOKENIZERS = (
+    ("trigram", "tokenize='trigram'"),
+    ("unicode61", "tokenize='unicode61 remove_diacritics 0', prefix='2 3 4'"),
+)
 _index_ready = False
 
 
@@ -185,6 +191,128 @@ def _extract_index_archive(archive_path, target_path, manifest=None):
         raise
 
 
+def _fts_tokenizer(connection):
+    row = connection.execute(
+        "SELECT value FROM build_metadata WHERE key = 'fts_tokenizer'"
+    ).fetchone()
+    if not row:
+        return None
+    exists = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (_FTS_TABLE,),
+    ).fetchone()
+    return row[0] if exists else None
+
+
+def _fts_signature(connection):
+    row = connection.execute(
+        "SELECT count(*), COALESCE(max(rowid), 0) FROM channels"
+    ).fetchone()
+    return f"{row[0]}:{row[1]}"
+
+
+def _store_fts_signature(connection):
+    connection.execute(
+        "INSERT OR REPLACE INTO build_metadata VALUES('fts_signature', ?)",
+        (_fts_signature(connection),),
+    )
+
+
+def _create_fts_table(connection):
+    connection.execute(f"DROP TRIGGER IF EXISTS {_FTS_TABLE}_ai")
+    connection.execute(f"DROP TRIGGER IF EXISTS {_FTS_TABLE}_ad")
+    connection.execute(f"DROP TABLE IF EXISTS {_FTS_TABLE}")
+    for tokenizer, options in _FTS_TOKENIZERS:
+        try:
+            connection.execute(
+                f"""
+                CREATE VIRTUAL TABLE {_FTS_TABLE} USING fts5(
+                    name_search,
+                    content='channels',
+                    content_rowid='rowid',
+                    {options}
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            continue
+        # Keep the external-content index in step with channel inserts/deletes.
+        connection.executescript(
+            f"""
+            CREATE TRIGGER {_FTS_TABLE}_ai AFTER INSERT ON channels BEGIN
+                INSERT INTO {_FTS_TABLE}(rowid, name_search)
+                VALUES (new.rowid, new.name_search);
+            END;
+            CREATE TRIGGER {_FTS_TABLE}_ad AFTER DELETE ON channels BEGIN
+                INSERT INTO {_FTS_TABLE}({_FTS_TABLE}, rowid, name_search)
+                VALUES ('delete', old.rowid, old.name_search);
+            END;
+            """
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO build_metadata VALUES('fts_tokenizer', ?)",
+            (tokenizer,),
+        )
+        return tokenizer
+    return None
+
+
+def _ensure_fts_index(index_file):
+    """Build the FTS5 channel index once per downloaded/rebuilt index file."""
+    try:
+        connection = sqlite3.connect(index_file)
+    except Exception:
+        return None
+    try:
+        tokenizer = _fts_tokenizer(connection)
+        stored = connection.execute(
+            "SELECT value FROM build_metadata WHERE key = 'fts_signature'"
+        ).fetchone()
+        if tokenizer and stored and stored[0] == _fts_signature(connection):
+            return tokenizer
+
+        started = time.time()
+        tokenizer = _create_fts_table(connection)
+        if not tokenizer:
+            connection.rollback()
+            xbmc.log(
+                "[PlaylistSearch] FTS5 is not available; using table scans",
+                level=xbmc.LOGINFO,
+            )
+            return None
+        connection.execute(
+            f"INSERT INTO {_FTS_TABLE}({_FTS_TABLE}) VALUES('rebuild')"
+        )
+        _store_fts_signature(connection)
+        connection.commit()
+        xbmc.log(
+            f"[PlaylistSearch] Built {tokenizer} FTS index in "
+            f"{time.time() - started:.1f}s",
+            level=xbmc.LOGINFO,
+        )
+        return tokenizer
+    except Exception as exc:
+        xbmc.log(
+            f"[PlaylistSearch] FTS index build failed: {exc}",
+            level=xbmc.LOGWARNING,
+        )
+        return None
+    finally:
+        connection.close()
+
+
+def _fts_match_expression(search_text, tokenizer):
+    if tokenizer == "trigram":
+        # Trigram phrases match any substring of at least three characters.
+        if len(search_text) < 3:
+            return None
+        return '"' + search_text.replace('"', '""') + '"'
+    tokens = re.findall(r"\w+", search_text)
+    if not tokens:
+        return None
+    return " AND ".join(f'"{token}"*' for token in tokens)
+
+
 def _install_bundled_index():
     target = _index_file()
     if _has_current_schema(target):
@@ -348,6 +476,9 @@ def update_playlist_index(
         if progress_callback:
             progress_callback(92, "Se validează indexul ratb...")
         _extract_index_archive(archive_path, target, manifest)
+        if progress_callback:
+            progress_callback(96, "Se construiește indexul de căutare...")
+        _ensure_fts_index(target)
         _save_json_file(_manifest_file(), manifest)
         state.update(
             {
@@ -393,6 +524,7 @@ def _ensure_index():
             )
 
     if _has_current_schema(target):
+        _ensure_fts_index(target)
         _index_ready = True
         return target
     xbmc.log(
@@ -706,32 +838,22 @@ def _parse_override_matches(playlist, query, server):
     playlist_file, _ = _override_paths(playlist)
     query_text = (query or "").casefold()
     results = []
-    pending = None
 
     try:
-        with open(playlist_file, "r", encoding="utf-8", errors="ignore") as handle:
-            for raw_line in handle:
-                line = raw_line.strip()
-                if line.startswith("#EXTINF"):
-                    pending = line
-                    continue
-                if not pending or not line or line.startswith("#"):
-                    continue
-
-                name = pending.rsplit(",", 1)[-1].strip()
-                stream_match = _STREAM_RE.search(line)
-                if stream_match and query_text in name.casefold():
-                    results.append(
-                        {
-                            "id": stream_match.group(1),
-                            "name": name,
-                            "_server_id": server.get("id"),
-                            "_server_name": server.get("name"),
-                        }
-                    )
-                    if len(results) >= _MAX_RESULTS:
-                        break
-                pending = None
+        for extinf, line in iter_m3u_file(playlist_file):
+            name = extinf_name(extinf, default=extinf)
+            stream_match = _STREAM_RE.search(line)
+            if stream_match and query_text in name.casefold():
+                results.append(
+                    {
+                        "id": stream_match.group(1),
+                        "name": name,
+                        "_server_id": server.get("id"),
+                        "_server_name": server.get("name"),
+                    }
+                )
+                if len(results) >= _MAX_RESULTS:
+                    break
     except Exception as exc:
         xbmc.log(
             f"[PlaylistSearch] Failed to scan override {playlist}: {exc}",
@@ -767,25 +889,19 @@ def _create_standard_schema(connection):
         );
         """
     )
+    # Channels inserted afterwards by _insert_playlist_content are indexed
+    # through the FTS triggers.
+    _create_fts_table(connection)
 
 
 def _insert_playlist_content(connection, playlist, content):
-    text = content.decode("utf-8", errors="ignore")
     rows = []
-    pending = None
     inserted = 0
 
-    for raw_line in text.splitlines():
-        line = raw_line.strip()
-        if line.startswith("#EXTINF"):
-            pending = line
-            continue
-        if not pending or not line or line.startswith("#"):
-            continue
-
+    for extinf, line in iter_m3u_bytes(content):
         stream_match = _STREAM_RE.search(line)
         if stream_match:
-            name = pending.rsplit(",", 1)[-1].strip()
+            name = extinf_name(extinf, default=extinf)
             rows.append(
                 (
                     name,
@@ -794,7 +910,6 @@ def _insert_playlist_content(connection, playlist, content):
                     stream_match.group(1),
                 )
             )
-        pending = None
 
         if len(rows) >= 10000:
             connection.executemany(
@@ -976,6 +1091,9 @@ def rebuild_playlist_index(
                 "INSERT OR REPLACE INTO build_metadata VALUES(?,?)",
                 (key, value),
             )
+        if _fts_tokenizer(connection):
+            # Triggers kept the FTS index in sync with the channel changes.
+            _store_fts_signature(connection)
         connection.commit()
 
         integrity = connection.execute("PRAGMA integrity_check").fetchone()
@@ -1002,6 +1120,53 @@ def rebuild_playlist_index(
     }
 
 
+def _query_channels(connection, search_text, playlists):
+    placeholders = ",".join("?" for _ in playlists)
+    tokenizer = _fts_tokenizer(connection)
+    match = _fts_match_expression(search_text, tokenizer) if tokenizer else None
+
+    if match:
+        try:
+            # Exact names first, then prefix hits, then bm25 rank.
+            return connection.execute(
+                f"""
+                SELECT c.name, c.playlist, c.stream_id
+                FROM {_FTS_TABLE} AS f
+                JOIN channels AS c ON c.rowid = f.rowid
+                WHERE {_FTS_TABLE} MATCH ?
+                  AND c.playlist IN ({placeholders})
+                ORDER BY c.name_search = ? DESC,
+                         substr(c.name_search, 1, ?) = ? DESC,
+                         f.rank
+                LIMIT ?
+                """,
+                [
+                    match,
+                    *playlists,
+                    search_text,
+                    len(search_text),
+                    search_text,
+                    _MAX_RESULTS,
+                ],
+            ).fetchall()
+        except sqlite3.OperationalError as exc:
+            xbmc.log(
+                f"[PlaylistSearch] FTS query failed, scanning instead: {exc}",
+                level=xbmc.LOGWARNING,
+            )
+
+    return connection.execute(
+        f"""
+        SELECT name, playlist, stream_id
+        FROM channels
+        WHERE instr(name_search, ?) > 0
+          AND playlist IN ({placeholders})
+        LIMIT ?
+        """,
+        [search_text, *playlists, _MAX_RESULTS],
+    ).fetchall()
+
+
 def search_playlist_index(query, servers):
     index_file = _ensure_index()
     search_text = _search_text(query)
@@ -1049,20 +1214,7 @@ def search_playlist_index(query, servers):
                 covered_server_keys.add(server_key)
 
         if valid_playlists:
-            placeholders = ",".join("?" for _ in valid_playlists)
-            params = [search_text]
-            params.extend(valid_playlists)
-            params.append(_MAX_RESULTS)
-            rows = connection.execute(
-                f"""
-                SELECT name, playlist, stream_id
-                FROM channels
-                WHERE instr(name_search, ?) > 0
-                  AND playlist IN ({placeholders})
-                LIMIT ?
-                """,
-                params,
-            ).fetchall()
+            rows = _query_channels(connection, search_text, list(valid_playlists))
             for name, playlist, stream_id in rows:
                 server = valid_playlists[playlist]
                 results.append(
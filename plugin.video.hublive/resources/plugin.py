@@ -33,7 +33,6 @@ from hublive_backend import (
     _normalize_mac,
     check_server_online,
     clear_token_cache,
-    clear_failed_mac,
     clean_category_title,
     clear_all_cache,
     clear_all_cache_for_all_servers,
@@ -41,11 +40,11 @@ from hublive_backend import (
     epg_contains_any,
     fetch_channels_by_category_from_server,
     fetch_server_categories,
-    get_epg_items,
     get_candidate_macs,
-    get_current_program,
     get_epg_manager,
+    get_epg_now_next,
     get_fetch_status,
+    get_play_attempt_stats,
     get_portal_url_for_server,
     get_random_mac_from_file,
     get_romanian_categories,
@@ -60,11 +59,15 @@ from hublive_backend import (
     json_loads,
     load_channels_cache,
     load_cached_category_channels,
+    load_listing_rows,
     load_servers_config,
     load_epg_cache,
     note_failed_mac,
+    note_mac_playback_success,
     reload_servers_config,
     save_epg_cache,
+    save_listing_rows,
+    refresh_server_auth,
     set_server_auth,
     set_epg_current_server,
     set_fetch_status,
@@ -104,6 +107,7 @@ from hublive_vod_series import (
     play_series as render_play_series,
     play_vod as render_play_vod,
 )
+from m3u_parser import extinf_attributes, extinf_name, iter_m3u_file
 from playback_state import clear_playback_state, load_playback_state, save_playback_state
 from playlist_search import (
     get_playlist_categories,
@@ -120,9 +124,6 @@ RE_STREAM_ID = re.compile(r"stream=(\d+)")
 RE_MACPH_TOKENPH = re.compile(r"MACPH|TOKENPH")
 RE_BOX_CHARS = re.compile(r"[\u2500-\u259F\u2500-\u257F]")
 RE_CATEGORY_PREFIX = re.compile(r"^[\|\-\s]+ro[\|\s\:\-\[\(]?", re.IGNORECASE)
-RE_EXTINF = re.compile(r"#EXTINF:", re.IGNORECASE)
-RE_GROUP_TITLE = re.compile(r'group-title="?([^",]*)"?', re.IGNORECASE)
-RE_TVG_LOGO = re.compile(r'tvg-logo=["\']([^"\']*)["\']', re.IGNORECASE)
 
 TIMEOUTS = {
     "handshake": 5,
@@ -241,6 +242,11 @@ def get_auth_max_attempts():
     return _get_int_setting("auth_max_attempts", 6, minimum=1, maximum=12)
 
 
+def get_live_page_size():
+    """Channels per page in live categories; 0 renders the whole category."""
+    return _get_int_setting("live_page_size", 100, minimum=0, maximum=1000)
+
+
 def should_mega_search_fetch_missing_lists():
     return _ADDON.getSetting("mega_search_fetch_missing_lists") != "false"
 
@@ -346,67 +352,31 @@ def parse_m3u_channels(m3u_file, server="server1"):
     channels = []
 
     try:
-        with open(m3u_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        for extinf, url_line in iter_m3u_file(m3u_file):
+            if RE_MACPH_TOKENPH.search(url_line):
+                stream_id = f"s2_{len(channels)}"
+            else:
+                stream_id_match = RE_STREAM_ID.search(url_line)
+                if not stream_id_match:
+                    continue
+                stream_id = stream_id_match.group(1)
+            attributes = extinf_attributes(extinf)
+            channels.append(
+                {
+                    "name": extinf_name(extinf),
+                    "group": map_category_name(attributes.get("group-title") or "Uncategorized"),
+                    "logo": attributes.get("tvg-logo", ""),
+                    "stream_id": stream_id,
+                    "url": url_line,
+                }
+            )
     except Exception as e:
         xbmc.log(f"[M3U] Failed to read {m3u_file}: {e}", level=xbmc.LOGERROR)
         return []
 
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        if line.startswith("#EXTINF:") or RE_EXTINF.search(line):
-            group_title_match = RE_GROUP_TITLE.search(line)
-            tvg_logo_match = RE_TVG_LOGO.search(line)
-
-            last_comma_pos = line.rfind(",")
-            if last_comma_pos != -1:
-                channel_name = line[last_comma_pos + 1 :].strip()
-            else:
-                channel_name = "Unknown Channel"
-
-            group_title = (
-                group_title_match.group(1).strip()
-                if group_title_match
-                else "Uncategorized"
-            )
-            tvg_logo = tvg_logo_match.group(1) if tvg_logo_match else ""
-            group_title = map_category_name(group_title)
-
-            if i + 1 < len(lines):
-                url_line = lines[i + 1].strip()
-                if url_line and not url_line.startswith("#"):
-                    if RE_MACPH_TOKENPH.search(url_line):
-                        stream_id = f"s2_{len(channels)}"
-                        channels.append(
-                            {
-                                "name": channel_name,
-                                "group": group_title,
-                                "logo": tvg_logo,
-                                "stream_id": stream_id,
-                                "url": url_line,
-                            }
-                        )
-                    else:
-                        stream_id_match = RE_STREAM_ID.search(url_line)
-                        if stream_id_match:
-                            stream_id = stream_id_match.group(1)
-                            channels.append(
-                                {
-                                    "name": channel_name,
-                                    "group": group_title,
-                                    "logo": tvg_logo,
-                                    "stream_id": stream_id,
-                                    "url": url_line,
-                                }
-                            )
-
-        i += 1
-
     xbmc.log(
-        f"[M3U] Parsed {len(channels)} channels from {os.path.basename(m3u_file)}",
-        level=xbmc.LOGINFO,
+        f"[M3U] Loaded {len(channels)} channels from {os.path.basename(m3u_file)}",
+        level=xbmc.LOGDEBUG,
     )
     return channels
 
@@ -948,7 +918,7 @@ def _record_live_playback_success(
     cache_token=None,
     random_val="0",
 ):
-    clear_failed_mac(server, random_mac)
+    note_mac_playback_success(server, random_mac, attempts)
     if cache_token:
         set_server_auth(server, cache_token, random_mac, random_value=random_val)
     set_fetch_status(
@@ -986,7 +956,7 @@ def _record_live_playback_success(
 
 
 def _handle_live_attempt_failure(server, random_mac, attempts, last_error, log_prefix):
-    note_failed_mac(server, random_mac)
+    note_failed_mac(server, random_mac, reason=last_error)
     invalidate_server_auth(server, mac=random_mac)
     xbmc.log(
         f"[{log_prefix}] Playback attempt {attempts} failed for MAC {random_mac}: {last_error}",
@@ -1182,6 +1152,7 @@ def list_channels(
     category_id=None,
     from_server=False,
     main_mode=None,
+    page=None,
 ):
     """List channel categories from server."""
     # Check if portal URL exists
@@ -1205,6 +1176,12 @@ def list_channels(
         from_server = params.get("from_server") == "true"
     if main_mode is None:
         main_mode = params.get("main_mode")
+    if page is None:
+        page = params.get("page")
+    try:
+        page = int(page or 1)
+    except (TypeError, ValueError):
+        page = 1
 
     xbmc.log(
         f"[List] Listing channels for server={server}, main_mode={main_mode}",
@@ -1220,6 +1197,7 @@ def list_channels(
             category_id=category_id,
             from_server=from_server,
             main_mode=main_mode,
+            page=page,
         )
     else:
         # List all available categories
@@ -1447,12 +1425,34 @@ def list_channels_in_category(
     category_id=None,
     from_server=False,
     main_mode=None,
+    page=1,
 ):
-    """List channels within a specific category."""
+    """
+    List channels within a specific category.
+
+    With a page size set, only one page is rendered: the category is converted
+    once into compact (stream_id, name, logo, url) rows, later pages are read
+    from that row cache, and EPG is requested for the visible rows only.
+    """
     favorite_stream_ids = load_favorite_stream_ids(server)
+    page_size = get_live_page_size()
+    page = max(1, page)
+    offset = (page - 1) * page_size
+    pageable = bool(page_size and from_server and category_id)
+
+    rows = None
+    total_rows = 0
+    if pageable:
+        rows, total_rows = load_listing_rows(server, category_id, offset, page_size)
+        if rows is not None:
+            xbmc.log(
+                f"[Categories] Page {page} of {server}/{category_id} from row cache "
+                f"({len(rows)}/{total_rows} channels)",
+                level=xbmc.LOGDEBUG,
+            )
 
     # Handle server categories
-    if from_server and category_id:
+    if rows is None and from_server and category_id:
         # Fetch channels from server by category
         xbmc.log(
             f"[Categories] Fetching channels for category ID: {category_id} (mode: {main_mode})",
@@ -1500,8 +1500,8 @@ def list_channels_in_category(
             )
 
         if server_channels:
-            # Convert server channels to our format
-            channels_in_category = []
+            # Convert server channels to compact display rows
+            rows = []
             for idx, ch in enumerate(server_channels):
                 name = clean_category_title(
                     ch.get("name") or ch.get("title") or "Unknown"
@@ -1524,27 +1524,28 @@ def list_channels_in_category(
                         any_digit_match = re.search(r"(\d+)", cmd)
                         stream_id = any_digit_match.group(1) if any_digit_match else f"unknown_{idx}"
 
-                channels_in_category.append(
-                    {
-                        "name": name,
-                        "group": selected_category,
-                        "logo": logo,
-                        "stream_id": stream_id,
-                        "url": cmd,
-                    }
-                )
+                rows.append((stream_id, name, logo, cmd))
             xbmc.log(
-                f"[Categories] Got {len(channels_in_category)} channels from server",
+                f"[Categories] Got {len(rows)} channels from server",
                 level=xbmc.LOGINFO,
             )
         else:
-            channels_in_category = []
-    else:
+            rows = []
+    elif rows is None:
         # Filter channels by the selected category from M3U
-        channels_in_category = [
-            ch for ch in all_channels if ch["group"] == selected_category
+        rows = [
+            (ch["stream_id"], ch["name"], ch.get("logo") or "", ch.get("url") or "")
+            for ch in all_channels
+            if ch["group"] == selected_category
         ]
 
+    if not total_rows:
+        total_rows = len(rows)
+        if pageable and total_rows > page_size:
+            save_listing_rows(server, category_id, rows)
+        if page_size:
+            rows = rows[offset : offset + page_size]
+
     # Add "Change MAC" button at the top
     change_mac_button = xbmcgui.ListItem(
         label="[COLOR orange]Schimbă adresa MAC[/COLOR]"
@@ -1557,7 +1558,7 @@ def list_channels_in_category(
         handle=_HANDLE, url=change_mac_url, listitem=change_mac_button, isFolder=False
     )
 
-    if not channels_in_category:
+    if not total_rows:
         if from_server and category_id:
             status = get_fetch_status("channels", server)
             xbmc.log(
@@ -1603,29 +1604,35 @@ def list_channels_in_category(
         if portal_url:
             manager.reconfigure(base_url=portal_url)
 
-        # Load EPG cache first
-        load_epg_cache()
+        # Load cached EPG for the visible rows only
+        load_epg_cache([row[0] for row in rows])
 
         xbmc.log(
-            f"[EPG] Category '{selected_category}' has {len(channels_in_category)} channels",
+            f"[EPG] Category '{selected_category}' page {page} has {len(rows)} channels",
             level=xbmc.LOGINFO,
         )
 
         # Count how many channels already have EPG from cache
         channels_with_cached_epg = sum(
-            1 for ch in channels_in_category if epg_contains(ch["stream_id"])
+            1 for row in rows if epg_contains(row[0])
         )
         xbmc.log(
-            f"[EPG] {channels_with_cached_epg}/{len(channels_in_category)} channels have cached EPG",
+            f"[EPG] {channels_with_cached_epg}/{len(rows)} channels have cached EPG",
             level=xbmc.LOGINFO,
         )
 
-        # Request EPG data for ALL channels in the category
-        for channel in channels_in_category:
-            manager.request(channel, size=10)
+        # Request EPG data for channels without fresh cached EPG
+        manager.request_many(
+            [
+                {"stream_id": stream_id, "name": name, "url": cmd}
+                for stream_id, name, _, cmd in rows
+                if not epg_contains(stream_id)
+            ],
+            size=10,
+        )
 
         # Calculate adaptive timeout based on number of channels and cache coverage
-        num_channels = len(channels_in_category)
+        num_channels = len(rows)
         cache_coverage = (
             channels_with_cached_epg / num_channels if num_channels > 0 else 0
         )
@@ -1665,7 +1672,7 @@ def list_channels_in_category(
             waited += wait_interval
 
             channels_with_epg = sum(
-                1 for ch in channels_in_category if epg_contains(ch["stream_id"])
+                1 for row in rows if epg_contains(row[0])
             )
 
             if channels_with_epg != last_count:
@@ -1695,7 +1702,7 @@ def list_channels_in_category(
 
         # Final count
         final_count = sum(
-            1 for ch in channels_in_category if epg_contains(ch["stream_id"])
+            1 for row in rows if epg_contains(row[0])
         )
         final_coverage = final_count / num_channels if num_channels > 0 else 0
         xbmc.log(
@@ -1706,57 +1713,78 @@ def list_channels_in_category(
         # Save updated EPG to cache
         save_epg_cache()
 
+    # Resolve now/next for the visible rows in one pass
+    epg_now_next = (
+        get_epg_now_next([row[0] for row in rows])
+        if is_epg_enabled()
+        else {}
+    )
+
     # Create list items with EPG data
-    for channel in channels_in_category:
+    items = []
+    for stream_id, name, logo, cmd in rows:
         # Build channel label with current program
-        channel_label = channel["name"]
+        channel_label = name
+        current_prog, epg_items = epg_now_next.get(stream_id, (None, None))
 
         # Add current program to label if EPG available and enabled
-        if is_epg_enabled() and epg_contains(channel["stream_id"]):
-            epg_items = get_epg_items(channel["stream_id"])
-            current_prog = get_current_program(epg_items)
-            if current_prog:
-                channel_label = f"{channel['name']} - {current_prog}"
+        if current_prog:
+            channel_label = f"{name} - {current_prog}"
 
         li = xbmcgui.ListItem(label=channel_label)
 
         # Set thumbnail from tvg-logo if available
-        if channel["logo"]:
-            li.setArt({"thumb": channel["logo"], "icon": channel["logo"]})
+        if logo:
+            li.setArt({"thumb": logo, "icon": logo})
 
         li.setProperty("IsPlayable", "true")
 
         # Set EPG data if available and enabled
-        if is_epg_enabled() and epg_contains(channel["stream_id"]):
-            epg_items = get_epg_items(channel["stream_id"])
+        if epg_items:
             plot = format_epg_tooltip(epg_items)
             li.setInfo("video", {"plot": plot})
 
         # Create URL to play this specific channel
-        url = f"{_BASE_URL}?mode=play&stream_id={channel['stream_id']}&name={quote_plus(channel['name'])}&server={server}"
-        if server == "server2" and channel.get("url"):
-            url += f"&url_template={quote_plus(channel['url'])}"
+        url = f"{_BASE_URL}?mode=play&stream_id={stream_id}&name={quote_plus(name)}&server={server}"
+        if server == "server2" and cmd:
+            url += f"&url_template={quote_plus(cmd)}"
 
         # Add context menu for favorites
         context_menu = []
-        if channel["stream_id"] in favorite_stream_ids:
+        if stream_id in favorite_stream_ids:
             context_menu.append(
                 (
                     "Elimină din favorite",
-                    f"RunPlugin({_BASE_URL}?mode=remove_from_favorites&stream_id={channel['stream_id']}&server={server})",
+                    f"RunPlugin({_BASE_URL}?mode=remove_from_favorites&stream_id={stream_id}&server={server})",
                 )
             )
         else:
-            add_fav_url = f"{_BASE_URL}?mode=add_to_favorites&stream_id={channel['stream_id']}&name={quote_plus(channel['name'])}&logo={quote_plus(channel['logo'])}&server={server}"
-            if server == "server2" and channel.get("url"):
-                add_fav_url += f"&url_template={quote_plus(channel['url'])}"
+            add_fav_url = f"{_BASE_URL}?mode=add_to_favorites&stream_id={stream_id}&name={quote_plus(name)}&logo={quote_plus(logo)}&server={server}"
+            if server == "server2" and cmd:
+                add_fav_url += f"&url_template={quote_plus(cmd)}"
             context_menu.append(("Adaugă la favorite", f"RunPlugin({add_fav_url})"))
         li.addContextMenuItems(context_menu)
 
-        xbmcplugin.addDirectoryItem(
-            handle=_HANDLE, url=url, listitem=li, isFolder=False
+        items.append((url, li, False))
+
+    # "Next page" keeps the category params; the row cache serves the next slice
+    if page_size and offset + page_size < total_rows:
+        total_pages = (total_rows + page_size - 1) // page_size
+        next_page_item = xbmcgui.ListItem(
+            label=f"[COLOR yellow]Pagina următoare ({page + 1}/{total_pages})[/COLOR]"
+        )
+        next_page_item.setArt(
+            {"icon": "DefaultFolder.png", "thumb": "DefaultFolder.png"}
         )
+        next_page_url = (
+            f"{_BASE_URL}?category={quote_plus(selected_category)}&server={server}"
+            f"&cat_id={quote_plus(str(category_id or ''))}"
+            f"&from_server={'true' if from_server else 'false'}"
+            f"&main_mode={main_mode if main_mode else ''}&page={page + 1}"
+        )
+        items.append((next_page_url, next_page_item, True))
 
+    xbmcplugin.addDirectoryItems(_HANDLE, items, len(items))
     xbmcplugin.endOfDirectory(_HANDLE)
 
 
@@ -1813,7 +1841,10 @@ def get_full_epg():
     xbmc.log(f"[EPG] Get Full EPG: Found {total_channels} channels", level=xbmc.LOGINFO)
 
     # Count how many already cached
-    load_epg_cache()
+    load_epg_cache(
+        [str(ch.get("id")) for ch in all_channels]
+        + [str(ch.get("tv_genre_id")) for ch in all_channels]
+    )
     channels_with_cached_epg = sum(
         1
         for ch in all_channels
@@ -1831,22 +1862,8 @@ def get_full_epg():
         f"Se solicită EPG pentru {total_channels} canale...",
     )
 
-    # Request EPG for all channels
-    for idx, channel in enumerate(all_channels):
-        if progress.iscanceled():
-            xbmc.log("[EPG] User cancelled full EPG fetch", level=xbmc.LOGDEBUG)
-            progress.close()
-            return
-
-        manager.request(channel, size=10)
-
-        # Update progress every 10 channels
-        if (idx + 1) % 10 == 0:
-            percent = int(((idx + 1) / total_channels) * 30)
-            progress.update(
-                percent,
-                f"S-a solicitat EPG pentru {idx + 1}/{total_channels} canale...",
-            )
+    # Request EPG for all channels: one bulk feed, per-channel only for the gaps
+    manager.request_many(all_channels, size=10)
 
     progress.update(30, "Se așteaptă datele EPG de la server...")
 
@@ -2011,27 +2028,15 @@ def play_stream(
             )
 
             try:
-                with open(m3u_file, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-
                 channel_index = int(stream_id.split("_")[1])
                 channel_count = 0
 
-                for i, line in enumerate(lines):
-                    line = line.strip()
-                    if line.startswith("#EXTINF:") or "#EXTINF:" in line.upper():
-                        if i + 1 < len(lines):
-                            pot_url = lines[i + 1].strip()
-                            if (
-                                pot_url
-                                and not pot_url.startswith("#")
-                                and "MACPH" in pot_url
-                                and "TOKENPH" in pot_url
-                            ):
-                                if channel_count == channel_index:
-                                    url_line = pot_url
-                                    break
-                                channel_count += 1
+                for _, pot_url in iter_m3u_file(m3u_file):
+                    if "MACPH" in pot_url and "TOKENPH" in pot_url:
+                        if channel_count == channel_index:
+                            url_line = pot_url
+                            break
+                        channel_count += 1
             except Exception as e:
                 clear_playback_state(session_id)
                 xbmcgui.Dialog().notification(
@@ -2369,6 +2374,7 @@ def _list_servers_page(available_servers, server_statuses=None):
                            When None, no ON/OFF badge is shown (fast path).
     Always appends an on-demand 'Verificare servere' button at the bottom.
     """
+    play_stats = get_play_attempt_stats()
     for srv in available_servers:
         srv_name = srv.get("name", srv.get("id", "Unknown"))
         srv_id = srv.get("id", "server1")
@@ -2388,6 +2394,12 @@ def _list_servers_page(available_servers, server_statuses=None):
 
         li = xbmcgui.ListItem(label=label)
         li.setArt({"icon": "DefaultNetwork.png", "thumb": "DefaultNetwork.png"})
+        if srv_id in play_stats:
+            plays, avg_attempts = play_stats[srv_id]
+            li.setInfo(
+                "video",
+                {"plot": f"Încercări MAC medii per redare: {avg_attempts:.2f} ({plays} redări)"},
+            )
         xbmcplugin.addDirectoryItem(
             handle=_HANDLE,
             url=f"{_BASE_URL}?mode=open_server&server={srv_id}",
@@ -2473,6 +2485,11 @@ def router(params):
         servers_config = load_servers_config()
         available_servers = servers_config.get("servers", [])
 
+        # Background token renewal launched by the service
+        if mode == "refresh_auth":
+            refresh_server_auth(server or "server1")
+            return
+
         # Handle clear_all_cache mode early (doesn't require server)
         if mode == "clear_all_cache":
             xbmc.log("[Router] Processing clear_all_cache mode", level=xbmc.LOGINFO)
@@ -2777,6 +2794,7 @@ def router(params):
                 category_id=params.get("cat_id"),
                 from_server=params.get("from_server") == "true",
                 main_mode=params.get("main_mode"),
+                page=params.get("page"),
             )
         elif mode == "get_full_epg":
             get_full_epg()
@@ -2897,9 +2915,7 @@ def show_search_results(query, server="server1", main_mode=None):
         _CHANNELS_CACHE_TTL,
         load_favorite_stream_ids,
         is_epg_enabled,
-        epg_contains,
-        get_epg_items,
-        get_current_program,
+        get_epg_now_next,
         format_epg_tooltip,
         RE_STREAM_ID,
     )
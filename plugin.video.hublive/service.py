@@ -13,12 +13,14 @@ _lib_path = os.path.join(_addon_path, 'resources', 'lib')
 if _lib_path not in sys.path:
     sys.path.insert(0, _lib_path)
 
+from auth_store import servers_due_for_refresh
 from playback_state import clear_playback_state, load_playback_state, save_playback_state
 
 ADDON_ID = "plugin.video.hublive"
 ADDON = xbmcaddon.Addon(ADDON_ID)
 NOTIFICATION_TITLE = "HubLive"
 _RECONNECT_LAUNCH_GRACE_SECONDS = 5
+_AUTH_REFRESH_CHECK_SECONDS = 60
 
 
 def _log(message, level=xbmc.LOGINFO):
@@ -87,6 +89,7 @@ class LiveReconnectService:
         self.monitor = xbmc.Monitor()
         self.player = HubLivePlayer(self)
         self.last_notice_at = 0
+        self.last_auth_check_at = 0
 
     def run(self):
         _log("Live auto-reconnect service started")
@@ -94,6 +97,7 @@ class LiveReconnectService:
             try:
                 self._check_startup_timeout()
                 self._process_pending_reconnect()
+                self._refresh_expiring_auth()
             except Exception as exc:
                 _log(f"Service loop error: {exc}", level=xbmc.LOGWARNING)
 
@@ -101,6 +105,18 @@ class LiveReconnectService:
                 break
         _log("Live auto-reconnect service stopped")
 
+    def _refresh_expiring_auth(self):
+        now = time.time()
+        if now - self.last_auth_check_at < _AUTH_REFRESH_CHECK_SECONDS:
+            return
+        self.last_auth_check_at = now
+
+        # The handshake runs in a plugin invocation so the service never loads the backend.
+        for server in servers_due_for_refresh():
+            _log(f"Refreshing auth token for {server} before it expires")
+            query = urlencode({"mode": "refresh_auth", "server": server})
+            xbmc.executebuiltin(f"RunPlugin(plugin://{ADDON_ID}/?{query})")
+
     def _is_enabled(self):
         return _setting_bool("live_auto_reconnect", default=True)
 
@@ -126,111 +126,9 @@ def get_jlom_list(list_type, list_id):
         return None
 
 
-# Cache for movie lookups - avoid repeated file I/O
-_MOVIE_CACHE = None
-_MOVIE_INDEX = None
-
-def _build_movie_index():
-    """Build index for fast movie lookups using profile caches"""
-    global _MOVIE_INDEX
-    
-    # Path to profile directory (virtual)
-    profile_path = xbmcaddon.Addon().getAddonInfo('profile')
-    
-    if not xbmcvfs.exists(profile_path):
-        _MOVIE_INDEX = {}
-        return
-
-    _MOVIE_INDEX = {}
-    count = 0
-    
-    try:
-        # listdir works with special:// paths
-        dirs, files = xbmcvfs.listdir(profile_path)
-        for filename in files:
-            if filename.startswith('cache_') and filename.endswith('.json'):
-                # Construct virtual path first (e.g. special://profile/addon_data/.../file.json)
-                virtual_path = os.path.join(profile_path, filename)
-                # Translate to real OS path for open()
-                real_path = xbmcvfs.translatePath(virtual_path)
-                
-                try:
-                    with open(real_path, 'r', encoding='utf-8') as f:
-                        media_data = json.load(f)
-                        
-                    # Extract profile_id from filename (cache_{id}.json)
-                    # filename is like cache_123456.json
-                    try:
-                        profile_id = filename.replace('cache_', '').replace('.json', '')
-                    except:
-                        profile_id = ''
-                        
-                    # cache structure: {'movies': {path: metadata}, 'tv_shows': {...}}
-                    movies_dict = media_data.get('movies', {})
-                    
-                    for tmdb_id_key, metadata in movies_dict.items():
-                        if not metadata: continue
-                        
-                        # Extract file path from sources list
-                        sources = metadata.get('sources', [])
-                        if not sources: continue
-                        
-                        # Take the first available source path
-                        file_path = sources[0].get('path')
-                        if not file_path: continue
-                        
-                        info = metadata.get('info', {})
-                        
-                        # Try to get title and year
-                        original_title = info.get('originaltitle', info.get('title', ''))
-                        year_val = info.get('year', '')
-                        if not year_val:
-                            year_val = info.get('date', '')[:4] if info.get('date') else ''
-                            
-                        # Fallback to legacy metadata structure
-                        if not original_title:
-                            original_title = metadata.get('original_title', '')
-                        if not year_val:
-                            release_date = metadata.get('release_date', '')
-                            year_val = release_date[:4] if release_date else ''
-                            
-                        original_title = original_title.lower()
-                        
-                        if year_val and original_title:
-                            try:
-                                year = int(year_val)
-                                
-                                # Create movie data object
-                                movie_data = {
-                                    'metadata': metadata,
-                                    'path': file_path,
-                                    'profile_id': profile_id
-                                }
-                                
-                                # Index by title and year (±2 tolerance)
-                                for y in range(year - 2, year + 3):
-                                    key = (original_title, y)
-                                    if key not in _MOVIE_INDEX:
-                                        _MOVIE_INDEX[key] = []
-                                    _MOVIE_INDEX[key].append(movie_data)
-                                count += 1
-                            except (ValueError, TypeError):
-                                continue
-                except Exception as e:
-                    xbmc.log(f"[JLOM] Error reading cache file {filename}: {e}", xbmc.LOGERROR)
-                    continue
-                    
-    except Exception as e:
-        xbmc.log(f"[JLOM] Error listing profile directory: {e}", xbmc.LOGERROR)
-        _MOVIE_INDEX = {}
-        return
-    
-    xbmc.log(f"[JLOM] Built movie index with {len(_MOVIE_INDEX)} entries from {count} movies across all profiles", xbmc.LOGINFO)
-
-
 def find_movie_in_cache(original_title, year):
     """
-    Search for movie in indexer's metadata cache (optimized with indexing)
+    Search for movie in the indexer's library (indexed by original title and year)
     
     Args:
         original_title: Original title of the movie
@@ -239,33 +137,23 @@ def find_movie_in_cache(original_title, year):
     Returns:
         Tuple of (tmdb_id, file_path, metadata, profile_id) or None if not found
     """
-    global _MOVIE_INDEX
-    
-    # Build index on first use
-    if _MOVIE_INDEX is None:
-        _build_movie_index()
-    
-    if not _MOVIE_INDEX:
-        return None
-    
+    import library_db
+
     try:
         year_int = int(year)
     except (ValueError, TypeError):
         xbmc.log(f"[JLOM] Invalid year: {year}", xbmc.LOGWARNING)
         return None
-    
-    # Fast O(1) lookup using index
-    key = (original_title.lower(), year_int)
-    matches = _MOVIE_INDEX.get(key, [])
-    
-    if matches:
-        # Return first match
-        movie_data = matches[0]
-        metadata = movie_data.get('metadata', {})
-        tmdb_id = metadata.get('id')
-        file_path = movie_data.get('path', '')
-        profile_id = movie_data.get('profile_id', '')
-        
+
+    try:
+        match = library_db.find_movie(original_title, year_int)
+    except Exception as e:
+        xbmc.log(f"[JLOM] Error reading library: {e}", xbmc.LOGERROR)
+        return None
+
+    if match:
+        metadata, file_path, profile_id = match
+        tmdb_id = metadata.get('info', {}).get('tmdb_id')
         xbmc.log(f"[JLOM] Found match: {original_title} ({year}) -> {file_path}", xbmc.LOGDEBUG)
         return (tmdb_id, file_path, metadata, profile_id)
     
@@ -273,14 +161,6 @@ def find_movie_in_cache(original_title, year):
     return None
 
 
-def clear_movie_cache():
-    """Clear the movie cache and index (call when cache is updated)"""
-    global _MOVIE_CACHE, _MOVIE_INDEX
-    _MOVIE_CACHE = None
-    _MOVIE_INDEX = None
-    xbmc.log("[JLOM] Movie cache cleared", xbmc.LOGDEBUG)
-
-
 def clear_cache():
     """Clear all JLOM cache files"""
     if not xbmcvfs.exists(CACHE_DIR):
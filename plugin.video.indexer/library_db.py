@@ -0,0 +1,488 @@
+"""
+Library Store for scanned media
+Keeps titles, sources (files), seasons/episodes and genres of every profile
+in one indexed SQLite database, so browse views page with LIMIT/OFFSET
+instead of loading and sorting every profile's cache file
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import xbmc
+import xbmcaddon
+import xbmcvfs
+
+ADDON = xbmcaddon.Addon()
+ADDON_PROFILE_DIR = xbmcvfs.translatePath(ADDON.getAddonInfo('profile'))
+LIBRARY_DB = os.path.join(ADDON_PROFILE_DIR, 'library.db')
+
+MEDIA_TYPES = ('movies', 'tv_shows')
+# Scan results are committed in batches so a long scan is not one huge transaction
+COMMIT_EVERY = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles(
+    media_type TEXT NOT NULL,
+    tmdb_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    letter TEXT NOT NULL,
+    original_key TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    popularity REAL NOT NULL,
+    info TEXT NOT NULL,
+    art TEXT NOT NULL,
+    PRIMARY KEY(media_type, tmdb_id)
+);
+CREATE INDEX IF NOT EXISTS idx_titles_title ON titles(media_type, title);
+CREATE INDEX IF NOT EXISTS idx_titles_letter ON titles(media_type, letter, title);
+CREATE INDEX IF NOT EXISTS idx_titles_year ON titles(media_type, year, title);
+CREATE INDEX IF NOT EXISTS idx_titles_popularity ON titles(media_type, popularity DESC, title);
+CREATE INDEX IF NOT EXISTS idx_titles_original ON titles(media_type, original_key, year);
+CREATE TABLE IF NOT EXISTS genres(
+    media_type TEXT NOT NULL,
+    genre TEXT NOT NULL COLLATE NOCASE,
+    title TEXT NOT NULL,
+    tmdb_id TEXT NOT NULL,
+    PRIMARY KEY(media_type, genre, title, tmdb_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_genres_title ON genres(media_type, tmdb_id);
+CREATE TABLE IF NOT EXISTS sources(
+    profile_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    media_type TEXT NOT NULL,
+    tmdb_id TEXT NOT NULL,
+    season TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    scan_id INTEGER NOT NULL,
+    PRIMARY KEY(profile_id, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sources_title ON sources(media_type, tmdb_id, season, path);
+CREATE INDEX IF NOT EXISTS idx_sources_profile ON sources(profile_id, media_type, tmdb_id);
+CREATE TABLE IF NOT EXISTS crawl_listings(
+    profile_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    validator TEXT NOT NULL,
+    filters TEXT NOT NULL,
+    files TEXT NOT NULL,
+    subdirs TEXT NOT NULL,
+    PRIMARY KEY(profile_id, location)
+) WITHOUT ROWID;
+"""
+
+_thread_state = threading.local()
+_migration_lock = threading.Lock()
+_migrated = False
+
+
+def _conn():
+    """Get this thread's library connection, creating tables if needed"""
+    connection = getattr(_thread_state, 'connection', None)
+    if connection is not None:
+        return connection
+
+    if not xbmcvfs.exists(ADDON_PROFILE_DIR):
+        xbmcvfs.mkdirs(ADDON_PROFILE_DIR)
+    connection = sqlite3.connect(LIBRARY_DB, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    _thread_state.connection = connection
+    _import_legacy_caches(connection)
+    return connection
+
+
+def _popularity_score(info):
+    """
+    Popularity used by the 'Popular' view:
+    1. TMDB popularity score if available
+    2. If not, weighted rating (rating * log(votes)) to favor items with more votes
+    3. Fallback to raw rating
+    """
+    try:
+        pop = float(info.get('popularity', 0) or 0)
+        if pop > 0.1:
+            return pop * 1000  # Boost popularity score to be primary
+        rating = float(info.get('rating', 0) or 0)
+        votes = int(info.get('votes', 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    if votes > 0:
+        return rating * math.log(votes + 1)
+    return rating
+
+
+def _title_letter(title):
+    first = (title or ' ')[0]
+    return first.upper() if first.isalpha() else '#'
+
+
+def _store_title(connection, media_type, tmdb_id, info, art):
+    info = info or {}
+    title = info.get('title') or ''
+    original = (info.get('originaltitle') or title).lower()
+    try:
+        year = int(info.get('year') or 0)
+    except (TypeError, ValueError):
+        year = 0
+
+    connection.execute(
+        "INSERT OR REPLACE INTO titles VALUES(?,?,?,?,?,?,?,?,?)",
+        (media_type, tmdb_id, title, _title_letter(title), original, year,
+         _popularity_score(info), json.dumps(info), json.dumps(art or {})))
+    connection.execute(
+        "DELETE FROM genres WHERE media_type = ? AND tmdb_id = ?", (media_type, tmdb_id))
+    genres = {g.strip() for g in (info.get('genre') or '').split(' / ') if g.strip()}
+    connection.executemany(
+        "INSERT OR IGNORE INTO genres VALUES(?,?,?,?)",
+        [(media_type, genre, title, tmdb_id) for genre in genres])
+
+
+def _store_source(connection, profile_id, media_type, tmdb_id, path, season, scan_id):
+    """Insert a file, or re-stamp it when already known. Returns True if it is new"""
+    cursor = connection.execute(
+        "INSERT OR IGNORE INTO sources VALUES(?,?,?,?,?,?,?)",
+        (str(profile_id), path, media_type, tmdb_id, season or '', os.path.basename(path), scan_id))
+    if cursor.rowcount:
+        return True
+    connection.execute(
+        """
+        UPDATE sources SET media_type = ?, tmdb_id = ?, season = ?, scan_id = ?
+        WHERE profile_id = ? AND path = ?
+        """,
+        (media_type, tmdb_id, season or '', scan_id, str(profile_id), path))
+    return False
+
+
+def _prune_titles(connection):
+    """Drop titles (and their genres) that no profile has files for anymore"""
+    connection.execute(
+        """
+        DELETE FROM titles WHERE NOT EXISTS (
+            SELECT 1 FROM sources s
+            WHERE s.media_type = titles.media_type AND s.tmdb_id = titles.tmdb_id)
+        """)
+    connection.execute(
+        """
+        DELETE FROM genres WHERE NOT EXISTS (
+            SELECT 1 FROM titles t
+            WHERE t.media_type = genres.media_type AND t.tmdb_id = genres.tmdb_id)
+        """)
+
+
+def _import_legacy_caches(connection):
+    """One-time import of the old per-profile cache_<id>.json files"""
+    global _migrated
+    with _migration_lock:
+        if _migrated:
+            return
+        _migrated = True
+        try:
+            legacy_files = [f for f in os.listdir(ADDON_PROFILE_DIR)
+                            if f.startswith('cache_') and f.endswith('.json')]
+        except OSError:
+            return
+
+        for filename in legacy_files:
+            cache_file = os.path.join(ADDON_PROFILE_DIR, filename)
+            profile_id = filename[len('cache_'):-len('.json')]
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    media = json.load(f)
+                with connection:
+                    for tmdb_id, movie in (media.get('movies') or {}).items():
+                        _store_title(connection, 'movies', str(tmdb_id), movie.get('info'), movie.get('art'))
+                        for source in movie.get('sources', []):
+                            _store_source(connection, profile_id, 'movies', str(tmdb_id), source['path'], '', 0)
+                    for tmdb_id, show in (media.get('tv_shows') or {}).items():
+                        _store_title(connection, 'tv_shows', str(tmdb_id), show.get('info'), show.get('art'))
+                        for season_name, paths in (show.get('seasons') or {}).items():
+                            for path in paths:
+                                _store_source(connection, profile_id, 'tv_shows', str(tmdb_id), path, season_name, 0)
+                os.remove(cache_file)
+                xbmc.log(f"[Library] Imported {filename} into library.db", xbmc.LOGINFO)
+            except Exception as e:
+                xbmc.log(f"[Library] Could not import {filename}: {e}", xbmc.LOGERROR)
+
+
+class LibraryScan:
+    """
+    Writes the results of one profile scan into the library as they arrive
+
+    A full scan stamps every file it sees; when it completes, files of the
+    profile that were not seen again are removed. A cancelled scan keeps
+    whatever it already wrote.
+    """
+
+    def __init__(self, profile_id, full=False):
+        self.profile_id = str(profile_id)
+        self.full = full
+        self.scan_id = int(time.time() * 1000)
+        self.connection = _conn()
+        self.pending = 0
+
+    def add(self, media_type, metadata, path, season=''):
+        """
+        Store a scanned file and its title
+
+        Args:
+            media_type: 'movies' or 'tv_shows'
+            metadata: TMDb metadata with 'tmdb_id', 'info' and 'art'
+            path: File path on the server
+            season: Season folder name for TV episodes
+
+        Returns:
+            True if the file was not in the library yet
+        """
+        tmdb_id = str(metadata['tmdb_id'])
+        _store_title(self.connection, media_type, tmdb_id, metadata.get('info'), metadata.get('art'))
+        is_new = _store_source(self.connection, self.profile_id, media_type, tmdb_id, path, season, self.scan_id)
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.connection.commit()
+            self.pending = 0
+        return is_new
+
+    def finish(self, completed=True):
+        if completed and self.full:
+            self.connection.execute(
+                "DELETE FROM sources WHERE profile_id = ? AND scan_id < ?",
+                (self.profile_id, self.scan_id))
+            _prune_titles(self.connection)
+        self.connection.commit()
+        self.pending = 0
+
+
+class CrawlManifest:
+    """
+    Directory listings of a profile from its last completed crawl
+
+    Each listing is stored with a validator (the FTP 'modify' fact, or the
+    HTTP ETag / Last-Modified / body hash) and the scan filters in use, so a
+    rescan can reuse the video files and subfolders of a directory that did
+    not change instead of listing and parsing it again.
+    """
+
+    def __init__(self, profile_id, filters):
+        self.profile_id = str(profile_id)
+        self.filters = filters
+        self.lock = threading.Lock()
+        self.visited = {}
+        self.listings = {}
+        try:
+            for location, validator, files, subdirs in _conn().execute(
+                    "SELECT location, validator, files, subdirs FROM crawl_listings WHERE profile_id = ? AND filters = ?",
+                    (self.profile_id, filters)):
+                self.listings[location] = (validator, files, subdirs)
+        except Exception as e:
+            xbmc.log(f"[Library] Could not load crawl manifest for {profile_id}: {e}", xbmc.LOGWARNING)
+
+    def validator(self, location):
+        """Stored validator of a directory, or None if it was never listed"""
+        entry = self.listings.get(location)
+        return entry[0] if entry else None
+
+    def lookup(self, location, validator):
+        """
+        Cached listing of a directory if its validator still matches
+
+        Returns:
+            Tuple of (files, subdirs) or None
+        """
+        entry = self.listings.get(location)
+        if not validator or not entry or entry[0] != validator:
+            return None
+        return json.loads(entry[1]), json.loads(entry[2])
+
+    def record(self, location, validator, files, subdirs):
+        if not validator:
+            return
+        with self.lock:
+            self.visited[location] = (validator, json.dumps(list(files)), json.dumps(list(subdirs)))
+
+    def save(self):
+        """Replace the manifest with the directories seen by a completed crawl"""
+        connection = _conn()
+        with connection:
+            connection.execute("DELETE FROM crawl_listings WHERE profile_id = ?", (self.profile_id,))
+            connection.executemany(
+                "INSERT INTO crawl_listings VALUES(?,?,?,?,?,?)",
+                [(self.profile_id, location, validator, self.filters, files, subdirs)
+                 for location, (validator, files, subdirs) in self.visited.items()])
+        xbmc.log(f"[Library] Saved crawl manifest for {self.profile_id}: {len(self.visited)} folders", xbmc.LOGINFO)
+
+
+# --- Browse queries ---
+
+def _profile_filter(profile_id, alias='t'):
+    if not profile_id:
+        return '', []
+    return (f" AND EXISTS (SELECT 1 FROM sources s WHERE s.profile_id = ?"
+            f" AND s.media_type = {alias}.media_type AND s.tmdb_id = {alias}.tmdb_id)",
+            [str(profile_id)])
+
+
+def _rows_to_items(rows):
+    return [{'info': json.loads(info), 'art': json.loads(art)} for info, art in rows]
+
+
+def list_titles(media_type, filter_by='all', filter_value=None, offset=0, limit=50, profile_id=None):
+    """
+    One page of titles for a browse view
+
+    Args:
+        media_type: 'movies' or 'tv_shows'
+        filter_by: 'all', 'popular', 'year', 'genre', 'letter'/'alpha'
+        filter_value: Year, genre or letter for the filtered views
+        offset: Number of titles to skip
+        limit: Page size
+        profile_id: Optional - only titles with files on this server
+
+    Returns:
+        List of {'info': ..., 'art': ...} dicts
+    """
+    profile_sql, profile_params = _profile_filter(profile_id)
+    where = "t.media_type = ?"
+    params = [media_type]
+    order = "t.title"
+
+    if filter_by == 'genre' and filter_value:
+        rows = _conn().execute(
+            f"""
+            SELECT t.info, t.art FROM genres g
+            JOIN titles t ON t.media_type = g.media_type AND t.tmdb_id = g.tmdb_id
+            WHERE g.media_type = ? AND g.genre = ?{profile_sql}
+            ORDER BY g.title LIMIT ? OFFSET ?
+            """,
+            [media_type, filter_value] + profile_params + [int(limit), int(offset)]).fetchall()
+        return _rows_to_items(rows)
+
+    if filter_by == 'year' and filter_value:
+        try:
+            where += " AND t.year = ?"
+            params.append(int(filter_value))
+        except ValueError:
+            pass  # Invalid year filter, show all
+    elif filter_by in ('alpha', 'letter') and filter_value:
+        where += " AND t.letter = ?"
+        params.append(filter_value.upper())
+    elif filter_by == 'popular':
+        order = "t.popularity DESC, t.title"
+
+    rows = _conn().execute(
+        f"SELECT t.info, t.art FROM titles t WHERE {where}{profile_sql} ORDER BY {order} LIMIT ? OFFSET ?",
+        params + profile_params + [int(limit), int(offset)]).fetchall()
+    return _rows_to_items(rows)
+
+
+def list_years(media_type, profile_id=None):
+    profile_sql, profile_params = _profile_filter(profile_id)
+    rows = _conn().execute(
+        f"SELECT DISTINCT t.year FROM titles t WHERE t.media_type = ? AND t.year > 0{profile_sql} ORDER BY t.year DESC",
+        [media_type] + profile_params).fetchall()
+    return [year for (year,) in rows]
+
+
+def list_genres(media_type, profile_id=None):
+    profile_sql, profile_params = _profile_filter(profile_id, alias='g')
+    rows = _conn().execute(
+        f"SELECT DISTINCT g.genre FROM genres g WHERE g.media_type = ?{profile_sql} ORDER BY g.genre",
+        [media_type] + profile_params).fetchall()
+    return [genre for (genre,) in rows]
+
+
+def search_titles(query):
+    """Titles of both media types whose title contains query (case insensitive)"""
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    rows = _conn().execute(
+        "SELECT info, art FROM titles WHERE title LIKE ? ESCAPE '\\' ORDER BY title",
+        (pattern,)).fetchall()
+    return _rows_to_items(rows)
+
+
+def get_title(media_type, tmdb_id):
+    row = _conn().execute(
+        "SELECT info, art FROM titles WHERE media_type = ? AND tmdb_id = ?",
+        (media_type, str(tmdb_id))).fetchone()
+    return _rows_to_items([row])[0] if row else None
+
+
+def get_sources(media_type, tmdb_id, profile_id=None):
+    """Files of a movie as [{'profile_id', 'path', 'filename'}]"""
+    sql = "SELECT profile_id, path, filename FROM sources WHERE media_type = ? AND tmdb_id = ?"
+    params = [media_type, str(tmdb_id)]
+    if profile_id:
+        sql += " AND profile_id = ?"
+        params.append(str(profile_id))
+    rows = _conn().execute(sql + " ORDER BY profile_id, path", params).fetchall()
+    return [{'profile_id': pid, 'path': path, 'filename': filename} for pid, path, filename in rows]
+
+
+def list_seasons(tmdb_id, profile_id=None):
+    sql = "SELECT DISTINCT season FROM sources WHERE media_type = 'tv_shows' AND tmdb_id = ? AND season != ''"
+    params = [str(tmdb_id)]
+    if profile_id:
+        sql += " AND profile_id = ?"
+        params.append(str(profile_id))
+    return [season for (season,) in _conn().execute(sql + " ORDER BY season", params).fetchall()]
+
+
+def list_episodes(tmdb_id, season, offset=0, limit=50, profile_id=None):
+    """One page of a season's files as [(profile_id, path)], ordered by path"""
+    sql = "SELECT profile_id, path FROM sources WHERE media_type = 'tv_shows' AND tmdb_id = ? AND season = ?"
+    params = [str(tmdb_id), season]
+    if profile_id:
+        sql += " AND profile_id = ?"
+        params.append(str(profile_id))
+    return _conn().execute(
+        sql + " ORDER BY path LIMIT ? OFFSET ?", params + [int(limit), int(offset)]).fetchall()
+
+
+def count_titles(profile_id):
+    """{'movies': n, 'tv_shows': n} for one profile"""
+    counts = dict.fromkeys(MEDIA_TYPES, 0)
+    for media_type, count in _conn().execute(
+            "SELECT media_type, COUNT(DISTINCT tmdb_id) FROM sources WHERE profile_id = ? GROUP BY media_type",
+            (str(profile_id),)):
+        counts[media_type] = count
+    return counts
+
+
+def get_existing_paths(profile_id):
+    return {path for (path,) in _conn().execute(
+        "SELECT path FROM sources WHERE profile_id = ?", (str(profile_id),))}
+
+
+def delete_profile(profile_id):
+    """Remove a profile's files, and the titles only it had"""
+    connection = _conn()
+    with connection:
+        connection.execute("DELETE FROM sources WHERE profile_id = ?", (str(profile_id),))
+        connection.execute("DELETE FROM crawl_listings WHERE profile_id = ?", (str(profile_id),))
+        _prune_titles(connection)
+
+
+def find_movie(original_title, year, tolerance=2):
+    """
+    Find a library movie by original title and release year (± tolerance)
+
+    Returns:
+        Tuple of (metadata, file_path, profile_id) or None if not found
+    """
+    connection = _conn()
+    row = connection.execute(
+        """
+        SELECT tmdb_id, info, art FROM titles
+        WHERE media_type = 'movies' AND original_key = ? AND year BETWEEN ? AND ?
+        ORDER BY ABS(year - ?) LIMIT 1
+        """,
+        (original_title.lower(), year - tolerance, year + tolerance, year)).fetchone()
+    if not row:
+        return None
+    sources = get_sources('movies', row[0])
+    if not sources:
+        return None
+    metadata = {'info': json.loads(row[1]), 'art': json.loads(row[2]), 'sources': sources}
+    return metadata, sources[0]['path'], sources[0]['profile_id']
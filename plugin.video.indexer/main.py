@@ -14,6 +14,8 @@ from threading import Lock
 import threading
 from contextlib import closing
 
+import library_db
+
 # Heavy imports moved to function level for lazy loading:
 # - requests (only for HTTP scanning)
 # - BeautifulSoup (only for HTML parsing)
@@ -301,18 +303,16 @@ def mark_profile_offline(profile_id, is_offline):
 
 def cleanup_offline_profile_cache(profile_id):
     """
-    Remove cache file for offline profile
+    Remove library entries of an offline profile
     
     Args:
         profile_id: ID of the offline profile
     """
-    cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile_id}.json")
-    if xbmcvfs.exists(cache_file):
-        try:
-            xbmcvfs.delete(cache_file)
-            xbmc.log(f"[Host Verifier] Cleaned up cache for offline profile {profile_id}", xbmc.LOGINFO)
-        except Exception as e:
-            xbmc.log(f"[Host Verifier] Error cleaning cache for profile {profile_id}: {e}", xbmc.LOGERROR)
+    try:
+        library_db.delete_profile(profile_id)
+        xbmc.log(f"[Host Verifier] Cleaned up library for offline profile {profile_id}", xbmc.LOGINFO)
+    except Exception as e:
+        xbmc.log(f"[Host Verifier] Error cleaning library for profile {profile_id}: {e}", xbmc.LOGERROR)
 
 def verify_hosts_on_startup():
     """
@@ -521,193 +521,117 @@ def fetch_metadata(title, year, media_type):
     """
     Fetch metadata from TMDb with caching support
     Optimized to use cache and reduce API calls from 3 to 1
-    Includes request deduplication to prevent concurrent API calls for the same item
+    Concurrent lookups of the same item share one request through the TMDb client
     """
     # Lazy imports
     from metadata_cache import get_cache
-    import requests
+    import tmdb_client
     
     api_key = get_tmdb_api_key()
     if not api_key: 
         return None
     
+    # Retry logic for API calls
+    # 0 retries = 1 attempt (Fastest) to 5 retries = 6 attempts (Robust)
+    try:
+        max_retries_setting = int(ADDON.getSetting('max_api_retries'))
+    except:
+        max_retries_setting = 0
+    client = tmdb_client.get_client(api_key, max_retries_setting)
+    
     # Check if caching is enabled
     cache_enabled = ADDON.getSetting('enable_cache') == 'true'
     
-    # Try cache first if enabled
-    if cache_enabled:
-        cache = get_cache()
-        cached_metadata = cache.get(media_type, title, year)
-        if cached_metadata:
-            return cached_metadata
-
-    # Deduplication Logic: Prevent concurrent API calls for the same item
-    cache_key = f"{media_type}_{title}_{year}"
-    
-    must_wait = False
-    fetch_event = None
-    
-    with _FETCH_LOCK:
-        if cache_key in _FETCH_EVENTS:
-            must_wait = True
-            fetch_event = _FETCH_EVENTS[cache_key]
-        else:
-            # We are the first! specific event for this item
-            fetch_event = threading.Event()
-            _FETCH_EVENTS[cache_key] = fetch_event
-            
-    if must_wait:
-        # Wait for the other thread to finish fetching
-        fetch_event.wait(timeout=20) # Wait max 20s
-        
-        # After waiting, check cache again
+    def fetch():
+        # Try cache first if enabled (including titles TMDb recently had no match for)
         if cache_enabled:
-            return cache.get(media_type, title, year)
-        return None
+            cache = get_cache()
+            cached_metadata = cache.get(media_type, title, year)
+            if cached_metadata:
+                return cached_metadata
+            if cache.is_not_found(media_type, title, year):
+                client.mark_not_found(media_type, title, year)
+                return None
+        return _fetch_metadata_internal(client, title, year, media_type, cache_enabled)
+    
+    # Callers may add keys (e.g. file_path) to the result, so each one gets its own copy
+    metadata = client.lookup(media_type, title, year, fetch)
+    return dict(metadata) if metadata else None
 
-    # We are the active fetcher. 
-    try:
-        return _fetch_metadata_internal(api_key, title, year, media_type, cache_enabled)
-    finally:
-        # Always clear the event so others can proceed (even if we failed)
-        with _FETCH_LOCK:
-            if cache_key in _FETCH_EVENTS:
-                del _FETCH_EVENTS[cache_key]
-        if fetch_event:
-            fetch_event.set()
-
-# Initialize locks at module level
-_FETCH_LOCK = threading.Lock()
-_FETCH_EVENTS = {}
-
-def _fetch_metadata_internal(api_key, title, year, media_type, cache_enabled):
+def _fetch_metadata_internal(client, title, year, media_type, cache_enabled):
     import requests
     from metadata_cache import get_cache
     search_type = 'tv' if media_type == 'tv_show' else 'movie'
     
-    # Retry logic for API calls
-    # 0 retries = 1 attempt (Fastest) to 5 retries = 6 attempts (Robust)
     try:
-        max_retries_setting = int(ADDON.getSetting('max_api_retries'))
-    except:
-        max_retries_setting = 0
+        # Step 1: Search for the media
+        results = client.search(search_type, title, year)
         
-    total_attempts = max_retries_setting + 1
-    import time
-    
-    for attempt in range(total_attempts):
-        try:
-            # Step 1: Search for the media
-            search_params = {
-                'api_key': api_key, 
-                'query': title, 
-                'language': 'en-US'
-            }
-            if year: 
-                search_params['year'] = year
-
-            response = requests.get(
-                f"{TMDB_BASE_URL}/search/{search_type}", 
-                params=search_params, 
-                timeout=15
-            )
-            
-            if response.status_code == 429:
-                wait_time = (attempt + 1) * 2
-                xbmc.log(f"[TMDb] Rate limited during search for '{title}'. Retrying in {wait_time}s...", xbmc.LOGWARNING)
-                time.sleep(wait_time)
-                continue
-                
-            response.raise_for_status()
-            results = response.json().get('results', [])
-            
-            if not results: 
-                xbmc.log(f"[TMDb] No results found for '{title}' (year: {year})", xbmc.LOGINFO)
-                return None
-            
-            tmdb_id = results[0]['id']
-            
-            # Step 2: Get details with videos in ONE API call using append_to_response
-            details_params = {
-                'api_key': api_key, 
-                'language': 'en-US',
-                'append_to_response': 'videos'  # Get videos in same request
-            }
-            
-            details_response = requests.get(
-                f"{TMDB_BASE_URL}/{search_type}/{tmdb_id}", 
-                params=details_params, 
-                timeout=15
-            )
-            
-            if details_response.status_code == 429:
-                wait_time = (attempt + 1) * 2
-                xbmc.log(f"[TMDb] Rate limited during details fetch for '{title}'. Retrying in {wait_time}s...", xbmc.LOGWARNING)
-                time.sleep(wait_time)
-                continue
-
-            details_response.raise_for_status()
-            details = details_response.json()
-
-            # Extract video/trailer info from appended response
-            youtube_id = ''
-            videos = details.get('videos', {}).get('results', [])
-            for video in videos:
-                if video.get('site') == 'YouTube' and video.get('type') == 'Trailer':
-                    youtube_id = video.get('key', '')
-                    break
+        if not results: 
+            xbmc.log(f"[TMDb] No results found for '{title}' (year: {year})", xbmc.LOGINFO)
+            client.mark_not_found(media_type, title, year)
+            if cache_enabled:
+                get_cache().mark_not_found(media_type, title, year)
+            return None
+        
+        tmdb_id = results[0]['id']
+        
+        # Step 2: Get details with videos in ONE API call using append_to_response
+        details = client.details(search_type, tmdb_id)
+    except requests.RequestException as e:
+        xbmc.log(f"[TMDb] Failed to fetch metadata for '{title}': {e}", xbmc.LOGERROR)
+        return None
 
-            # Build trailer URL (Only YouTube)
-            trailer_url = ''
-            if youtube_id:
-                trailer_url = f"plugin://plugin.video.youtube/play/?video_id={youtube_id}"
+    # Extract video/trailer info from appended response
+    youtube_id = ''
+    videos = details.get('videos', {}).get('results', [])
+    for video in videos:
+        if video.get('site') == 'YouTube' and video.get('type') == 'Trailer':
+            youtube_id = video.get('key', '')
+            break
 
-            # Extract release year
-            date_str = details.get('release_date') or details.get('first_air_date') or ''
+    # Build trailer URL (Only YouTube)
+    trailer_url = ''
+    if youtube_id:
+        trailer_url = f"plugin://plugin.video.youtube/play/?video_id={youtube_id}"
+
+    # Extract release year
+    date_str = details.get('release_date') or details.get('first_air_date') or ''
+    release_year = 0
+    if date_str and '-' in date_str:
+        try: 
+            release_year = int(date_str.split('-')[0])
+        except (ValueError, IndexError): 
             release_year = 0
-            if date_str and '-' in date_str:
-                try: 
-                    release_year = int(date_str.split('-')[0])
-                except (ValueError, IndexError): 
-                    release_year = 0
-
-            # Build metadata structure
-            info = {
-                'title': details.get('title') or details.get('name'),
-                'originaltitle': details.get('original_title') or details.get('original_name'),
-                'year': release_year,
-                'plot': details.get('overview'),
-                'rating': details.get('vote_average'),
-                'popularity': details.get('popularity'),
-                'votes': details.get('vote_count'),
-                'genre': ' / '.join([g['name'] for g in details.get('genres', [])]),
-                'mediatype': search_type,
-                'tmdb_id': tmdb_id,
-                'trailer': trailer_url
-            }
-            
-            art = {
-                'poster': f"{TMDB_IMG_URL}{details.get('poster_path')}" if details.get('poster_path') else '',
-                'fanart': f"https://image.tmdb.org/t/p/original{details.get('backdrop_path')}" if details.get('backdrop_path') else ''
-            }
-            
-            metadata = {'info': info, 'art': art, 'tmdb_id': tmdb_id}
-            
-            # Cache the result if caching is enabled
-            if cache_enabled:
-                cache = get_cache()
-                cache.set(media_type, title, metadata, year)
-            
-            return metadata
 
-        except requests.RequestException as e:
-            if attempt < total_attempts - 1:
-                wait_time = (attempt + 1) * 2
-                xbmc.log(f"[TMDb] Network error fetching '{title}': {e}. Retrying in {wait_time}s...", xbmc.LOGWARNING)
-                time.sleep(wait_time)
-            else:
-                xbmc.log(f"[TMDb] Failed to fetch metadata for '{title}' after {total_attempts} attempts: {e}", xbmc.LOGERROR)
-                return None
+    # Build metadata structure
+    info = {
+        'title': details.get('title') or details.get('name'),
+        'originaltitle': details.get('original_title') or details.get('original_name'),
+        'year': release_year,
+        'plot': details.get('overview'),
+        'rating': details.get('vote_average'),
+        'popularity': details.get('popularity'),
+        'votes': details.get('vote_count'),
+        'genre': ' / '.join([g['name'] for g in details.get('genres', [])]),
+        'mediatype': search_type,
+        'tmdb_id': tmdb_id,
+        'trailer': trailer_url
+    }
+    
+    art = {
+        'poster': f"{TMDB_IMG_URL}{details.get('poster_path')}" if details.get('poster_path') else '',
+        'fanart': f"https://image.tmdb.org/t/p/original{details.get('backdrop_path')}" if details.get('backdrop_path') else ''
+    }
+    
+    metadata = {'info': info, 'art': art, 'tmdb_id': tmdb_id}
+    
+    # Cache the result if caching is enabled
+    if cache_enabled:
+        cache = get_cache()
+        cache.set(media_type, title, metadata, year)
+    
+    return metadata
 
 # --- Core Logic ---
 def build_url(query):
@@ -843,51 +767,6 @@ def enforce_dahmer_rate_limit():
 
         DAHMER_RATE_LIMITER['last_request'] = time.time()
 
-def get_all_media(media_type, profile_id=None):
-    """
-    Get all media of specified type
-    
-    Args:
-        media_type: 'movies' or 'tv_shows'
-        profile_id: Optional - if provided, only return media from this server
-    """
-    aggregated_media = {}
-    profiles = read_profiles()
-    
-    # Filter profiles if profile_id is specified (handle potential string/int mismatch)
-    if profile_id:
-        profiles = [p for p in profiles if str(p.get('id')) == str(profile_id)]
-    
-    for profile in profiles:
-        cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile['id']}.json")
-        if xbmcvfs.exists(cache_file):
-            with closing(xbmcvfs.File(cache_file, 'r')) as f:
-                media = json.loads(f.read())
-            
-            if media_type == 'movies' and isinstance(media.get('movies'), dict):
-                for tmdb_id, movie_data in media.get('movies', {}).items():
-                    if tmdb_id not in aggregated_media:
-                        aggregated_media[tmdb_id] = {
-                            'info': movie_data.get('info'),
-                            'art': movie_data.get('art'),
-                            'sources': []
-                        }
-                    for source in movie_data.get('sources', []):
-                        source_copy = source.copy()
-                        source_copy['profile_id'] = profile['id']
-                        aggregated_media[tmdb_id]['sources'].append(source_copy)
-            elif media_type == 'tv_shows' and isinstance(media.get('tv_shows'), dict):
-                 for tmdb_id, show_data in media.get('tv_shows', {}).items():
-                    if tmdb_id not in aggregated_media:
-                        aggregated_media[tmdb_id] = show_data
-                        # Store profile_id only on the first occurrence (maintains 1:1 mapping if filtering)
-                        aggregated_media[tmdb_id]['profile_id'] = profile['id']
-                    else:
-                        # Logic for merging could go here, but for now just don't overwrite the original profile_id
-                        pass
-
-    return list(aggregated_media.values())
-
 # --- Scanning Logic ---
 def scan_library(profile_id, scan_mode='full'):
     """Scan a profile and update its library"""
@@ -961,18 +840,15 @@ def scan_library(profile_id, scan_mode='full'):
         return
 
     dialog.update(50, 'Fetching metadata for new items...')
-    cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile['id']}.json")
-    media = {'movies': {}, 'tv_shows': {}}
-    if scan_mode == 'incremental' and xbmcvfs.exists(cache_file):
-        with closing(xbmcvfs.File(cache_file, 'r')) as f:
-            media = json.loads(f.read())
+    library_scan = library_db.LibraryScan(profile['id'], full=(scan_mode != 'incremental'))
 
     new_files_count = 0
     processed_files = 0
     total_files = len(all_video_paths_on_server)
     max_workers = int(ADDON.getSetting('parallel_connections'))
+    scan_completed = True
 
-    def metadata_worker(path):
+    def metadata_worker(path, fetch=fetch_metadata):
         # Check if this is a Dahmer Movies path that we should handle specially
         if is_dahmer_movies_path(path):
             # Handle Dahmer Movies specific path structure
@@ -990,7 +866,7 @@ def scan_library(profile_id, scan_mode='full'):
                 season_num = season_episode_match.group(2)  # S01 -> 01
                 episode_num = season_episode_match.group(3)  # E01 -> 01
 
-                metadata = fetch_metadata(show_name, year, 'tv_show')
+                metadata = fetch(show_name, year, 'tv_show')
                 if metadata:
                     # Handle the case where lstrip results in empty string (e.g., "00" becomes "")
                     # Convert to integers, handling the case where lstrip results in empty string
@@ -1006,7 +882,7 @@ def scan_library(profile_id, scan_mode='full'):
             else:
                 title, year = clean_and_get_year(filename)
                 if title:
-                    metadata = fetch_metadata(title, year, 'movie')
+                    metadata = fetch(title, year, 'movie')
                     return path, metadata, 'movie', None
         else:
             # 1. Check for season folder structure
@@ -1014,7 +890,7 @@ def scan_library(profile_id, scan_mode='full'):
             if match:
                 show_folder_path = path[:match.start(0)]
                 show_name, year = clean_and_get_year(os.path.basename(urllib.parse.unquote(show_folder_path)))
-                metadata = fetch_metadata(show_name, year, 'tv_show')
+                metadata = fetch(show_name, year, 'tv_show')
                 # Pass the match object through
                 if metadata:
                     return path, metadata, 'tv_show', {'folder_match': match}
@@ -1036,7 +912,7 @@ def scan_library(profile_id, scan_mode='full'):
                 else:
                     # Parent is the show folder directly
                     show_name, year = clean_and_get_year(parent_dir_name)
-                metadata = fetch_metadata(show_name, year, 'tv_show')
+                metadata = fetch(show_name, year, 'tv_show')
 
                 season_num = tv_match.group(1) or tv_match.group(3)
                 episode_num = tv_match.group(2) or tv_match.group(4)
@@ -1058,7 +934,7 @@ def scan_library(profile_id, scan_mode='full'):
             # 3. Fallback to movie
             title, year = clean_and_get_year(filename)
             if title:
-                metadata = fetch_metadata(title, year, 'movie')
+                metadata = fetch(title, year, 'movie')
                 if metadata:
                     # Update cache with file path for JLOM integration
                     metadata['file_path'] = path
@@ -1069,11 +945,33 @@ def scan_library(profile_id, scan_mode='full'):
 
         return path, None, None, None
 
+    # Load every cached title the workers may ask for with a few queries instead of one lookup per file:
+    # a dry run of the path parsing with a fetch that finds nothing records all candidate lookups
+    primed_metadata = {}
+    if ADDON.getSetting('enable_cache') == 'true' and all_video_paths_on_server:
+        from metadata_cache import get_cache
+        lookups = set()
+
+        def record_lookup(title, year, media_type):
+            lookups.add((media_type, title, year))
+            return None
+
+        for path in all_video_paths_on_server:
+            metadata_worker(path, record_lookup)
+        primed_metadata = get_cache().get_many(lookups)
+
+    def primed_fetch(title, year, media_type):
+        metadata = primed_metadata.get((media_type, title, year))
+        if metadata:
+            return dict(metadata)
+        return fetch_metadata(title, year, media_type)
+
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         from concurrent.futures import as_completed
-        future_to_path = {executor.submit(metadata_worker, path): path for path in all_video_paths_on_server}
+        future_to_path = {executor.submit(metadata_worker, path, primed_fetch): path for path in all_video_paths_on_server}
         for future in as_completed(future_to_path):
             if cancel_event.is_set() or dialog.iscanceled():
+                scan_completed = False
                 for f in future_to_path:
                     f.cancel()
                 break
@@ -1086,81 +984,61 @@ def scan_library(profile_id, scan_mode='full'):
             if not metadata or not metadata.get('tmdb_id'):
                 continue
 
-            if not metadata or not metadata.get('tmdb_id'):
-                continue
+            if media_type == 'tv_show':
+                season_name = None
+                if context and 'folder_match' in context:
+                    match = context['folder_match']
+                    season_group = match.group(1)
+                    season_number = match.group(2)
+                    if season_group.upper() in ['S', 'SO']:
+                        season_name = f"Season {season_number.zfill(2)}"
+                    else:
+                        season_name = f"{season_group.capitalize()} {season_number.zfill(2)}"
 
-            tmdb_id = str(metadata['tmdb_id'])
-
-            # CRITICAL: Synchronize access to shared 'media' dictionary to prevent race conditions
-            # Without this, concurrent threads overwrote season lists, causing missing episodes
-            with media_lock:
-                if media_type == 'tv_show':
-                    if tmdb_id not in media['tv_shows']:
-                        media['tv_shows'][tmdb_id] = {'seasons': {}, 'info': metadata['info'], 'art': metadata['art']}
-
-                    season_name = None
-                    if context and 'folder_match' in context:
-                        match = context['folder_match']
-                        season_group = match.group(1)
-                        season_number = match.group(2)
-                        if season_group.upper() in ['S', 'SO']:
-                            season_name = f"Season {season_number.zfill(2)}"
-                        else:
-                            season_name = f"{season_group.capitalize()} {season_number.zfill(2)}"
-                    
-                    elif context and 'season' in context:
-                        season_number = context['season']
-                        season_name = f"Season {str(season_number).zfill(2)}"
+                elif context and 'season' in context:
+                    season_number = context['season']
+                    season_name = f"Season {str(season_number).zfill(2)}"
 
-                    if season_name:
-                        if season_name not in media['tv_shows'][tmdb_id]['seasons']:
-                            media['tv_shows'][tmdb_id]['seasons'][season_name] = []
-                        
-                        if path not in media['tv_shows'][tmdb_id]['seasons'][season_name]:
-                            media['tv_shows'][tmdb_id]['seasons'][season_name].append(path)
-                            new_files_count += 1
-                
-                elif media_type == 'movie':
-                    source_entry = {'path': path, 'filename': os.path.basename(path)}
-                    if tmdb_id not in media['movies']:
-                        media['movies'][tmdb_id] = {'info': metadata['info'], 'art': metadata['art'], 'sources': [source_entry]}
-                        new_files_count += 1
-                    else:
-                        if not any(s['path'] == path for s in media['movies'][tmdb_id]['sources']):
-                            media['movies'][tmdb_id]['sources'].append(source_entry)
-                            new_files_count += 1
+                if season_name and library_scan.add('tv_shows', metadata, path, season_name):
+                    new_files_count += 1
+
+            elif media_type == 'movie':
+                if library_scan.add('movies', metadata, path):
+                    new_files_count += 1
 
     dialog.close()
 
+    # Results are already in the library; a cancelled full scan keeps files it did not reach
+    library_scan.finish(completed=scan_completed)
+
     if not cancel_event.is_set():
-        with closing(xbmcvfs.File(cache_file, 'w')) as f:
-            f.write(json.dumps(media, indent=4))
-        
         msg = f"Added/Updated {new_files_count} files." if scan_mode == 'incremental' else f"Library built successfully."
         xbmcgui.Dialog().ok('Scan Complete', msg)
         xbmc.executebuiltin('Container.Refresh')
 
-def get_existing_paths_from_cache(cache_file):
-    existing_paths = set()
-    if xbmcvfs.exists(cache_file):
-        with closing(xbmcvfs.File(cache_file, 'r')) as f:
-            media = json.loads(f.read())
-        for movie_data in media.get('movies', {}).values():
-            for source in movie_data.get('sources',[]): existing_paths.add(source['path'])
-        for show_data in media.get('tv_shows', {}).values():
-            for season in show_data.get('seasons', {}).values(): existing_paths.update(season)
-    return existing_paths
+def get_scan_filters_fingerprint():
+    """Scan filter settings as one string; crawl manifests are only reused under the same filters"""
+    return json.dumps([
+        get_video_extensions(), get_exclude_folders(), get_exclude_patterns(),
+        ADDON.getSetting('exclude_samples'), ADDON.getSetting('min_file_size'),
+        ADDON.getSetting('max_folder_depth'), ADDON.getSetting('http_use_head'),
+    ])
 
 def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_queue):
     # Lazy imports - only load when FTP scanning
     from ftplib import FTP
-    from queue import Queue
+    from queue import Queue, Empty
     from concurrent.futures import ThreadPoolExecutor
     
     results = []
     results_lock = threading.Lock()
+    # Listings of unchanged folders are reused from the last crawl in incremental mode
+    manifest = library_db.CrawlManifest(profile['id'], get_scan_filters_fingerprint())
+    use_manifest = scan_mode == 'incremental'
+    reused_folders = 0
     q = Queue()
-    q.put(profile['path'])
+    # Queue items are (path, modify fact reported by the parent listing)
+    q.put((profile['path'], None))
     scanned_paths = {profile['path']}
     scanned_paths_lock = threading.Lock()
     
@@ -1168,7 +1046,7 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
     connection_errors_lock = threading.Lock()
 
     def worker():
-        nonlocal connection_errors
+        nonlocal connection_errors, reused_folders
         ftp = None
         try:
             user = 'anonymous' if profile['anonymous'] else profile['user']
@@ -1189,7 +1067,7 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
 
         while not cancel_event.is_set():
             try:
-                current_path = q.get(timeout=1)
+                current_path, current_modify = q.get(timeout=1)
             except Empty:
                 break
 
@@ -1199,9 +1077,18 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
                     depth = get_folder_depth(current_path, base_path)
                     if depth >= max_depth:
                         xbmc.log(f"Skipping {current_path} - max depth {max_depth} reached", level=xbmc.LOGDEBUG)
-                        q.task_done()
                         continue
 
+                # A folder's modify fact only changes when its own entries change, so an
+                # unchanged folder without subfolders (a movie or season folder) is not listed again
+                cached = manifest.lookup(current_path, current_modify) if use_manifest else None
+                if cached is not None and not cached[1]:
+                    with results_lock:
+                        results.extend(cached[0])
+                        reused_folders += 1
+                    manifest.record(current_path, current_modify, cached[0], cached[1])
+                    continue
+
                 with scanned_paths_lock:
                     total_discovered = len(scanned_paths)
                     scanned_count = total_discovered - q.qsize()
@@ -1216,6 +1103,8 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
                 items_processed = False
                 if use_mlsd:
                     try:
+                        folder_files = []
+                        folder_dirs = []
                         for name, facts in ftp.mlsd(current_path):
                             if cancel_event.is_set():
                                 break
@@ -1232,10 +1121,11 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
                                     xbmc.log(f"Skipping excluded folder: {name}", level=xbmc.LOGDEBUG)
                                     continue
                                 
+                                folder_dirs.append(full_path)
                                 with scanned_paths_lock:
                                     if full_path not in scanned_paths:
                                         scanned_paths.add(full_path)
-                                        q.put(full_path)
+                                        q.put((full_path, facts.get('modify')))
                             
                             elif item_type == 'file':
                                 # Get file size from MLSD
@@ -1246,12 +1136,15 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
                                 
                                 # Check if file should be processed
                                 if should_process_file(name, file_size):
+                                    folder_files.append(full_path)
                                     with results_lock:
                                         results.append(full_path)
                                 else:
                                     xbmc.log(f"Skipping file: {name} (filtered)", level=xbmc.LOGDEBUG)
                         
                         items_processed = True
+                        if not cancel_event.is_set():
+                            manifest.record(current_path, current_modify, folder_files, folder_dirs)
                     except Exception as e:
                         xbmc.log(f"MLSD failed, falling back to NLST: {e}", level=xbmc.LOGDEBUG)
                         items_processed = False
@@ -1285,7 +1178,7 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
                             with scanned_paths_lock:
                                 if full_path not in scanned_paths:
                                     scanned_paths.add(full_path)
-                                    q.put(full_path)
+                                    q.put((full_path, None))
             
             except Exception as e:
                 xbmc.log(f"FTP scan error in path {current_path}: {e}", level=xbmc.LOGWARNING)
@@ -1319,9 +1212,12 @@ def scan_ftp_parallel(profile, scan_mode, max_workers, cancel_event, progress_qu
 
     if cancel_event.is_set(): return None
 
+    manifest.save()
+    if use_manifest:
+        xbmc.log(f"[FTP Scan] Reused {reused_folders} unchanged folders from the crawl manifest", xbmc.LOGINFO)
+
     if scan_mode == 'incremental':
-        cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile['id']}.json")
-        existing_paths = get_existing_paths_from_cache(cache_file)
+        existing_paths = library_db.get_existing_paths(profile['id'])
         results = [p for p in results if p not in existing_paths]
 
     return results
@@ -1398,13 +1294,19 @@ def parse_dahmer_movies_links(html_content):
 
 def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_queue):
     # Lazy imports - only load when HTTP scanning
+    import hashlib
     import requests
     from bs4 import BeautifulSoup
-    from queue import Queue
+    from queue import Queue, Empty
     from concurrent.futures import ThreadPoolExecutor
     
     results = []
+    results_seen = set()
     results_lock = threading.Lock()
+    # Unchanged listings (304, or same body) are reused from the last crawl in incremental mode
+    manifest = library_db.CrawlManifest(profile['id'], get_scan_filters_fingerprint())
+    use_manifest = scan_mode == 'incremental'
+    reused_folders = 0
     q = Queue()
     base_url = profile['host']
     start_path = profile['path']
@@ -1439,6 +1341,31 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
             xbmc.log(f"[Domain Check] Error parsing URL {url}: {e}", level=xbmc.LOGWARNING)
             return False
 
+    def add_file(path, page_files):
+        page_files.append(path)
+        with results_lock:
+            if path not in results_seen:
+                results_seen.add(path)
+                results.append(path)
+
+    def add_dir(full_url, page_dirs):
+        page_dirs.append(full_url)
+        with scanned_urls_lock:
+            if full_url not in scanned_urls:
+                scanned_urls.add(full_url)
+                q.put(full_url)
+
+    def reuse_listing(url, validator, cached):
+        nonlocal reused_folders
+        files, dirs = cached
+        for path in files:
+            add_file(path, [])
+        for dir_url in dirs:
+            add_dir(dir_url, [])
+        manifest.record(url, validator, files, dirs)
+        with results_lock:
+            reused_folders += 1
+
     def worker():
         nonlocal connection_errors
         auth = None
@@ -1572,7 +1499,6 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                         depth = get_folder_depth(current_path, base_path)
                         if depth >= max_depth:
                             xbmc.log(f"Skipping {current_url} - max depth {max_depth} reached", level=xbmc.LOGDEBUG)
-                            q.task_done()
                             continue
                     with scanned_urls_lock:
                         total_discovered = len(scanned_urls)
@@ -1589,17 +1515,48 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                     if is_dahmer_movies:
                         enforce_dahmer_rate_limit()  # Use the global rate limiter
 
-                    response = session.get(current_url, timeout=30)
+                    # Conditional GET against the listing stored by the last crawl
+                    stored_validator = manifest.validator(current_url) if use_manifest else None
+                    conditional_headers = {}
+                    if stored_validator:
+                        etag, last_modified, _ = stored_validator.rsplit('|', 2)
+                        if etag:
+                            conditional_headers['If-None-Match'] = etag
+                        if last_modified:
+                            conditional_headers['If-Modified-Since'] = last_modified
+
+                    response = session.get(current_url, timeout=30, headers=conditional_headers)
                     if response.status_code == 429:  # Too Many Requests
                         xbmc.log(f"Rate limited by server: {current_url}. Waiting before retry...", level=xbmc.LOGWARNING)
                         import time
                         time.sleep(10)  # Wait 10 seconds before retry
-                        response = session.get(current_url, timeout=30)  # Retry once
+                        response = session.get(current_url, timeout=30, headers=conditional_headers)  # Retry once
+                    if response.status_code == 304:
+                        cached = manifest.lookup(current_url, stored_validator)
+                        if cached is not None:
+                            reuse_listing(current_url, stored_validator, cached)
+                            continue
+                        response = session.get(current_url, timeout=30)
                     response.raise_for_status()
                     if response.status_code == 429:  # If still rate limited after retry
                         xbmc.log(f"Still rate limited after retry: {current_url}. Skipping...", level=xbmc.LOGWARNING)
                         continue  # Skip this URL and continue with the next
 
+                    # Servers without ETag/Last-Modified still send the same body for an unchanged folder
+                    validator = '|'.join([
+                        response.headers.get('ETag', ''),
+                        response.headers.get('Last-Modified', ''),
+                        hashlib.sha1(response.content).hexdigest(),
+                    ])
+                    if stored_validator and stored_validator.rsplit('|', 1)[-1] == validator.rsplit('|', 1)[-1]:
+                        cached = manifest.lookup(current_url, stored_validator)
+                        if cached is not None:
+                            reuse_listing(current_url, validator, cached)
+                            continue
+
+                    page_files = []
+                    page_dirs = []
+
                     # Check if this is a Dahmer Movies site by looking for specific patterns
                     is_dahmer_movies = 'a.111477.xyz' in current_url or 'dahmer' in current_url.lower()
 
@@ -1645,9 +1602,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                 # Check if file should be processed
                                 if should_process_file(filename, file_size):
                                     path = urllib.parse.urlparse(full_url).path
-                                    with results_lock:
-                                        if path not in results:
-                                            results.append(path)
+                                    add_file(path, page_files)
                                 else:
                                     xbmc.log(f"Skipping file: {filename} (filtered)", level=xbmc.LOGDEBUG)
                             elif href.endswith('/'):
@@ -1662,10 +1617,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                     xbmc.log(f"Skipping disallowed link: {full_url}", level=xbmc.LOGDEBUG)
                                     continue
                                 
-                                with scanned_urls_lock:
-                                    if full_url not in scanned_urls:
-                                        scanned_urls.add(full_url)
-                                        q.put(full_url)
+                                add_dir(full_url, page_dirs)
                     else:
                         # Use original parsing logic for non-Dahmer Movies sites
                         soup = BeautifulSoup(response.text, 'html.parser')
@@ -1690,9 +1642,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                 if any(full_url.lower().endswith(ext) for ext in get_video_extensions()):
                                     path = urllib.parse.urlparse(full_url).path
                                     found_on_page = True
-                                    with results_lock:
-                                        if path not in results:
-                                            results.append(path)
+                                    add_file(path, page_files)
                                 elif href.endswith('/'):
                                     # It's a directory
                                     full_url = urllib.parse.urljoin(current_url, href)
@@ -1702,10 +1652,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                         xbmc.log(f"Skipping external domain link: {full_url}", level=xbmc.LOGDEBUG)
                                         continue
                                     
-                                    with scanned_urls_lock:
-                                        if full_url not in scanned_urls:
-                                            scanned_urls.add(full_url)
-                                            q.put(full_url)
+                                    add_dir(full_url, page_dirs)
                         else:
                             # Try alternative parsing methods for Dahmer Movies site
                             # Look for table rows with data-sort attributes
@@ -1731,9 +1678,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                     if any(full_url.lower().endswith(ext) for ext in get_video_extensions()):
                                         path = urllib.parse.urlparse(full_url).path
                                         found_on_page = True
-                                        with results_lock:
-                                            if path not in results:
-                                                results.append(path)
+                                        add_file(path, page_files)
                                     elif href.endswith('/'):
                                         # Check if URL is same domain
                                         if not is_same_domain(full_url):
@@ -1741,10 +1686,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                             continue
                                         
                                         found_on_page = True
-                                        with scanned_urls_lock:
-                                            if full_url not in scanned_urls:
-                                                scanned_urls.add(full_url)
-                                                q.put(full_url)
+                                        add_dir(full_url, page_dirs)
                             
                             for tr in table_rows:
                                 a_tags = tr.find_all('a')
@@ -1768,9 +1710,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                     if any(full_url.lower().endswith(ext) for ext in get_video_extensions()):
                                         path = urllib.parse.urlparse(full_url).path
                                         found_on_page = True
-                                        with results_lock:
-                                            if path not in results:
-                                                results.append(path)
+                                        add_file(path, page_files)
                                     elif href.endswith('/'):
                                         # Check if URL is allowed
                                         if not is_same_domain(full_url):
@@ -1778,10 +1718,7 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
                                             continue
                                         
                                         found_on_page = True
-                                        with scanned_urls_lock:
-                                            if full_url not in scanned_urls:
-                                                scanned_urls.add(full_url)
-                                                q.put(full_url)
+                                        add_dir(full_url, page_dirs)
 
                             # If still no results, try the fallback method of parsing all links
                             if not found_on_page:
@@ -1799,19 +1736,16 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
 
                                     if any(full_url.lower().endswith(ext) for ext in get_video_extensions()):
                                         path = urllib.parse.urlparse(full_url).path
-                                        with results_lock:
-                                            if path not in results:
-                                                results.append(path)
+                                        add_file(path, page_files)
                                     elif href.endswith('/'):
                                         # CRITICAL: Check if URL is allowed
                                         if not is_same_domain(full_url):
                                             xbmc.log(f"Skipping disallowed link: {full_url}", level=xbmc.LOGDEBUG)
                                             continue
                                         
-                                        with scanned_urls_lock:
-                                            if full_url not in scanned_urls:
-                                                scanned_urls.add(full_url)
-                                                q.put(full_url)
+                                        add_dir(full_url, page_dirs)
+                    if not cancel_event.is_set():
+                        manifest.record(current_url, validator, page_files, page_dirs)
                 except requests.RequestException as e:
                     xbmc.log(f"HTTP scan error in url {current_url}: {e}", level=xbmc.LOGWARNING)
                 finally:
@@ -1838,9 +1772,12 @@ def scan_http_parallel(profile, scan_mode, max_workers, cancel_event, progress_q
 
     if cancel_event.is_set(): return None
 
+    manifest.save()
+    if use_manifest:
+        xbmc.log(f"[HTTP Scan] Reused {reused_folders} unchanged folders from the crawl manifest", xbmc.LOGINFO)
+
     if scan_mode == 'incremental':
-        cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile['id']}.json")
-        existing_paths = get_existing_paths_from_cache(cache_file)
+        existing_paths = library_db.get_existing_paths(profile['id'])
         results = [p for p in results if p not in existing_paths]
 
     return results
@@ -2124,19 +2061,13 @@ def list_servers():
         is_offline = profile.get('offline', False)
         
         # Check if server has any media
-        cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile_id}.json")
-        if not xbmcvfs.exists(cache_file):
-            continue  # Skip servers without cache
-        
-        # Read cache to check if it has content
         try:
-            with closing(xbmcvfs.File(cache_file, 'r')) as f:
-                media = json.loads(f.read())
-        except:
-            continue  # Skip if cache is corrupted
+            counts = library_db.count_titles(profile_id)
+        except Exception:
+            continue  # Skip if library is unreadable
         
-        movies_count = len(media.get('movies', {}))
-        tv_shows_count = len(media.get('tv_shows', {}))
+        movies_count = counts['movies']
+        tv_shows_count = counts['tv_shows']
         
         has_movies = bool(movies_count)
         has_tv_shows = bool(tv_shows_count)
@@ -2206,35 +2137,31 @@ def list_server_menu(profile_id):
     List media types available on a specific server
     Only shows Movies/TV Shows if they exist on this server
     """
-    cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile_id}.json")
-    
-    if not xbmcvfs.exists(cache_file):
-        xbmcgui.Dialog().notification('Server', 'Cache-ul serverului nu există', xbmcgui.NOTIFICATION_WARNING, 3000)
+    try:
+        counts = library_db.count_titles(profile_id)
+    except Exception:
+        xbmcgui.Dialog().notification('Server', 'Eroare la citirea bibliotecii', xbmcgui.NOTIFICATION_ERROR, 3000)
         xbmcplugin.endOfDirectory(_HANDLE)
         return
     
-    # Read cache
-    try:
-        with closing(xbmcvfs.File(cache_file, 'r')) as f:
-            media = json.loads(f.read())
-    except:
-        xbmcgui.Dialog().notification('Server', 'Eroare la citirea cache-ului', xbmcgui.NOTIFICATION_ERROR, 3000)
+    if not counts['movies'] and not counts['tv_shows']:
+        xbmcgui.Dialog().notification('Server', 'Serverul nu are conținut în bibliotecă', xbmcgui.NOTIFICATION_WARNING, 3000)
         xbmcplugin.endOfDirectory(_HANDLE)
         return
     
-    has_movies = bool(media.get('movies'))
-    has_tv_shows = bool(media.get('tv_shows'))
+    has_movies = bool(counts['movies'])
+    has_tv_shows = bool(counts['tv_shows'])
     
     # Add Movies if available
     if has_movies:
-        movies_count = len(media.get('movies', {}))
+        movies_count = counts['movies']
         list_item = xbmcgui.ListItem(label=f'Movies ({movies_count})')
         url = build_url({'action': 'list_media_type_menu', 'type': 'movies', 'profile_id': profile_id})
         xbmcplugin.addDirectoryItem(handle=_HANDLE, url=url, listitem=list_item, isFolder=True)
     
     # Add TV Shows if available
     if has_tv_shows:
-        shows_count = len(media.get('tv_shows', {}))
+        shows_count = counts['tv_shows']
         list_item = xbmcgui.ListItem(label=f'TV Shows ({shows_count})')
         url = build_url({'action': 'list_media_type_menu', 'type': 'tv_shows', 'profile_id': profile_id})
         xbmcplugin.addDirectoryItem(handle=_HANDLE, url=url, listitem=list_item, isFolder=True)
@@ -2298,10 +2225,7 @@ def list_by_alphabet(media_type, profile_id=None):
     xbmcplugin.endOfDirectory(_HANDLE)
 
 def list_years(media_type, profile_id=None):
-    all_media = get_all_media(media_type, profile_id)
-    years = sorted(list(set(item['info'].get('year', 0) for item in all_media if item.get('info'))), reverse=True)
-    for year in years:
-        if year == 0: continue
+    for year in library_db.list_years(media_type, profile_id):
         list_item = xbmcgui.ListItem(label=str(year))
         params = {'action': 'list_filtered_media', 'type': media_type, 'filter_by': 'year', 'filter_value': str(year), 'page': '1'}
         if profile_id:
@@ -2312,14 +2236,7 @@ def list_years(media_type, profile_id=None):
     xbmcplugin.endOfDirectory(_HANDLE)
 
 def list_genres(media_type, profile_id=None):
-    all_media = get_all_media(media_type, profile_id)
-    all_genres = set()
-    for item in all_media:
-        if item.get('info', {}).get('genre'):
-            for genre in item['info']['genre'].split(' / '):
-                all_genres.add(genre.strip())
-    
-    for genre in sorted(list(all_genres)):
+    for genre in library_db.list_genres(media_type, profile_id):
         li = xbmcgui.ListItem(label=genre)
         params = {'action': 'list_filtered_media', 'type': media_type, 'filter_by': 'genre', 'filter_value': genre, 'page': '1'}
         if profile_id:
@@ -2330,50 +2247,11 @@ def list_genres(media_type, profile_id=None):
     xbmcplugin.endOfDirectory(_HANDLE)
 
 def list_filtered_media(media_type, filter_by, page, filter_value=None, profile_id=None):
-    all_items = get_all_media(media_type, profile_id)
-    
-    if filter_by == 'year' and filter_value:
-        try:
-            target_year = int(filter_value)
-            all_items = [i for i in all_items if i.get('info', {}).get('year') == target_year]
-        except ValueError:
-            pass # Invalid year filter, show all
-    elif filter_by == 'genre' and filter_value:
-        # Case insensitive genre check
-        all_items = [i for i in all_items if filter_value.lower() in i.get('info', {}).get('genre', '').lower()]
-    elif (filter_by == 'alpha' or filter_by == 'letter') and filter_value:
-        if filter_value == '#':
-            all_items = [i for i in all_items if not i.get('info',{}).get('title',' ')[0].isalpha()]
-        else:
-            all_items = [i for i in all_items if i.get('info',{}).get('title','').upper().startswith(filter_value.upper())]
-
-    if filter_by == 'popular':
-        # Enhanced popularity sorting:
-        # 1. Use TMDB popularity score if available
-        # 2. If not, use weighted rating (rating * log(votes)) to favor items with more votes
-        # 3. Fallback to raw rating
-        import math
-        def popularity_score(item):
-            info = item.get('info', {})
-            pop = float(info.get('popularity', 0) or 0)
-            if pop > 0.1: return pop * 1000 # Boost popularity score to be primary
-            
-            rating = float(info.get('rating', 0) or 0)
-            votes = int(info.get('votes', 0) or 0)
-            if votes > 0:
-                return rating * math.log(votes + 1)
-            return rating
-
-        all_items.sort(key=popularity_score, reverse=True)
-    elif media_type == 'movies':
-        all_items.sort(key=lambda x: x.get('info', {}).get('title', ''))
-    elif media_type == 'tv_shows':
-        all_items.sort(key=lambda x: x.get('info', {}).get('title', ''))
-
-    total_items = len(all_items)
+    # One extra row tells whether there is a next page without counting the whole view
     start_index = (page - 1) * PAGE_SIZE
-    end_index = start_index + PAGE_SIZE
-    items_to_display = all_items[start_index:end_index]
+    items_to_display = library_db.list_titles(media_type, filter_by, filter_value, start_index, PAGE_SIZE + 1, profile_id)
+    has_next_page = len(items_to_display) > PAGE_SIZE
+    items_to_display = items_to_display[:PAGE_SIZE]
 
     for item in items_to_display:
         info = item.get('info', {})
@@ -2407,9 +2285,14 @@ def list_filtered_media(media_type, filter_by, page, filter_value=None, profile_
             
             xbmcplugin.addDirectoryItem(handle=_HANDLE, url=url, listitem=li, isFolder=True)
 
-    if end_index < total_items:
+    if has_next_page:
         next_page_li = xbmcgui.ListItem(label='[COLOR yellow]Next Page >>[/COLOR]')
-        url = build_url({'action': 'list_filtered_media', 'type': media_type, 'filter_by': filter_by, 'filter_value': filter_value, 'page': str(page + 1)})
+        params = {'action': 'list_filtered_media', 'type': media_type, 'filter_by': filter_by, 'page': str(page + 1)}
+        if filter_value:
+            params['filter_value'] = filter_value
+        if profile_id:
+            params['profile_id'] = profile_id
+        url = build_url(params)
         xbmcplugin.addDirectoryItem(handle=_HANDLE, url=url, listitem=next_page_li, isFolder=True)
     
     content_type = 'tvshows' if media_type == 'tv_shows' else 'movies'
@@ -2419,18 +2302,13 @@ def list_filtered_media(media_type, filter_by, page, filter_value=None, profile_
 
 
 def play_movie(tmdb_id):
-    all_movies = get_all_media('movies')
-    movie_to_play = None
-    for movie in all_movies:
-        if str(movie.get('info', {}).get('tmdb_id')) == tmdb_id:
-            movie_to_play = movie
-            break
+    movie_to_play = library_db.get_title('movies', tmdb_id)
+    sources = library_db.get_sources('movies', tmdb_id) if movie_to_play else []
 
-    if not movie_to_play or not movie_to_play.get('sources'):
+    if not sources:
         xbmcgui.Dialog().ok("No Sources", "Could not find any playable sources for this movie.")
         return
 
-    sources = movie_to_play['sources']
     if len(sources) == 1:
         play_video(sources[0]['profile_id'], sources[0]['path'])
         return
@@ -2466,16 +2344,7 @@ def get_search_query():
         xbmc.executebuiltin(f'Container.Update({url})')
 
 def show_search_results(query):
-    query = query.lower()
-    all_media = get_all_media('movies') + get_all_media('tv_shows')
-    
-    search_results = []
-    for item in all_media:
-        title = item.get('info', {}).get('title', '').lower()
-        if query in title:
-            search_results.append(item)
-    
-    for item in sorted(search_results, key=lambda x: x.get('info', {}).get('title')):
+    for item in library_db.search_titles(query):
         info = item.get('info', {})
         art = item.get('art', {})
         tmdb_id = info.get('tmdb_id')
@@ -2504,14 +2373,11 @@ def manage_profiles():
         is_offline = profile.get('offline', False)
         movie_count = 0
         show_count = 0
-        cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile['id']}.json")
-        if xbmcvfs.exists(cache_file):
-            try:
-                with closing(xbmcvfs.File(cache_file, 'r')) as f:
-                    media = json.loads(f.read())
-                movie_count = len(media.get('movies', {}))
-                show_count = len(media.get('tv_shows', {}))
-            except Exception: pass
+        try:
+            counts = library_db.count_titles(profile['id'])
+            movie_count = counts['movies']
+            show_count = counts['tv_shows']
+        except Exception: pass
 
         # Add offline indicator to label
         if is_offline:
@@ -2615,9 +2481,7 @@ def delete_profile(profile_id):
     if xbmcgui.Dialog().yesno("Confirm Delete", "Are you sure you want to delete this profile and its library?"):
         profiles = [p for p in read_profiles() if p['id'] != profile_id]
         write_profiles(profiles)
-        cache_file = os.path.join(ADDON_PROFILE_DIR, f"cache_{profile_id}.json")
-        if xbmcvfs.exists(cache_file):
-            xbmcvfs.delete(cache_file)
+        library_db.delete_profile(profile_id)
         xbmc.executebuiltin('Container.Refresh')
 
 def play_video(profile_id, path):
@@ -2797,11 +2661,9 @@ def play_video(profile_id, path):
 
 # --- Router and other UI functions ---
 def list_seasons(tmdb_id, page, profile_id=None):
-    all_shows = get_all_media('tv_shows', profile_id)
-    show = next((s for s in all_shows if str(s.get('info',{}).get('tmdb_id')) == tmdb_id), None)
-    if not show: return
+    all_seasons = library_db.list_seasons(tmdb_id, profile_id)
+    if not all_seasons: return
 
-    all_seasons = sorted(show['seasons'].keys())
     total_items = len(all_seasons)
     start_index = (page - 1) * PAGE_SIZE
     end_index = start_index + PAGE_SIZE
@@ -2825,24 +2687,15 @@ def list_seasons(tmdb_id, page, profile_id=None):
     xbmcplugin.endOfDirectory(_HANDLE)
 
 def list_episodes(tmdb_id, season_name, page, profile_id=None):
-    all_shows = get_all_media('tv_shows', profile_id)
-    show = next((s for s in all_shows if str(s.get('info',{}).get('tmdb_id')) == tmdb_id), None)
-    if not show: return
-
-    all_episodes = sorted(show['seasons'][season_name])
-    total_items = len(all_episodes)
     start_index = (page - 1) * PAGE_SIZE
-    end_index = start_index + PAGE_SIZE
-    episodes_to_display = all_episodes[start_index:end_index]
-    for episode_path in episodes_to_display:
-        source_profile_id = show.get('profile_id')
-        if not source_profile_id: continue
-
+    episodes_to_display = library_db.list_episodes(tmdb_id, season_name, start_index, PAGE_SIZE + 1, profile_id)
+    has_next_page = len(episodes_to_display) > PAGE_SIZE
+    for source_profile_id, episode_path in episodes_to_display[:PAGE_SIZE]:
         li = xbmcgui.ListItem(label=os.path.basename(episode_path))
         li.setProperty("IsPlayable", "true")
         url = build_url({'action': 'play', 'profile_id': source_profile_id, 'path': episode_path})
         xbmcplugin.addDirectoryItem(handle=_HANDLE, url=url, listitem=li, isFolder=False)
-    if end_index < total_items:
+    if has_next_page:
         next_page_li = xbmcgui.ListItem(label='[COLOR yellow]Next Page >>[/COLOR]')
         params = {'action': 'list_episodes', 'tmdb_id': tmdb_id, 'season': season_name, 'page': str(page + 1)}
         if profile_id:
@@ -1,13 +1,16 @@
 """
 Metadata Cache System for TMDb API responses
 Reduces API calls by caching metadata with configurable TTL
+Entries live in one SQLite file with the expiry in an indexed column
 Compatible with both Kodi and standalone environments
 """
 import json
 import time
 import os
 import hashlib
-from contextlib import closing
+import shutil
+import sqlite3
+import threading
 
 # Detect if running in Kodi or standalone
 try:
@@ -15,122 +18,154 @@ try:
     import xbmcaddon
     KODI_MODE = True
     ADDON = xbmcaddon.Addon()
-    ADDON_PROFILE_DIR = ADDON.getAddonInfo('profile')
-    CACHE_DIR = os.path.join(ADDON_PROFILE_DIR, 'metadata_cache')
+    ADDON_PROFILE_DIR = xbmcvfs.translatePath(ADDON.getAddonInfo('profile'))
 except ImportError:
     KODI_MODE = False
     # Standalone mode - use current directory
-    CACHE_DIR = os.path.join(os.path.dirname(__file__), 'metadata_cache')
+    ADDON_PROFILE_DIR = os.path.dirname(__file__)
 
-# Ensure cache directory exists
-if KODI_MODE:
-    if not xbmcvfs.exists(CACHE_DIR):
-        xbmcvfs.mkdirs(CACHE_DIR)
-else:
-    os.makedirs(CACHE_DIR, exist_ok=True)
+CACHE_DB = os.path.join(ADDON_PROFILE_DIR, 'metadata_cache.db')
+# Folder of the old one-file-per-title cache, imported once into CACHE_DB
+LEGACY_CACHE_DIR = os.path.join(ADDON_PROFILE_DIR, 'metadata_cache')
+
+# Ensure profile directory exists
+os.makedirs(ADDON_PROFILE_DIR, exist_ok=True)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata(
+    key TEXT PRIMARY KEY,
+    media_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    year TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    cached_at REAL NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metadata_expires ON metadata(expires);
+CREATE INDEX IF NOT EXISTS idx_metadata_type ON metadata(media_type);
+CREATE TABLE IF NOT EXISTS not_found(
+    key TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+"""
+# Titles TMDb had no match for are not searched again for this long
+NOT_FOUND_TTL = 7 * 24 * 3600
+# SQLite limits the number of bound parameters per statement
+_MAX_KEYS_PER_QUERY = 500
 
 
 class MetadataCache:
     """
     Persistent cache for TMDb metadata with TTL support
     """
-    
+
     def __init__(self, default_ttl=30*24*3600):  # 30 days default
         """
         Initialize metadata cache
-        
+
         Args:
             default_ttl: Time to live in seconds (default: 30 days)
         """
         self.default_ttl = default_ttl
-        self.cache_dir = CACHE_DIR
-    
+        self.db_path = CACHE_DB
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._import_legacy_cache()
+
+    def _conn(self):
+        """Get this thread's database connection, creating tables if needed"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
     def _get_cache_key(self, media_type, title, year=None):
         """
         Generate cache key from media info
-        
+
         Args:
             media_type: 'movie' or 'tv_show'
             title: Media title
             year: Optional year
-            
+
         Returns:
             Hash-based cache key
         """
         # Normalize inputs
         title_normalized = title.lower().strip()
         year_str = str(year) if year else ""
-        
+
         # Create unique key
         key_string = f"{media_type}:{title_normalized}:{year_str}"
-        
-        # Use hash to avoid filesystem issues with special characters
+
+        # Same hash as the old file names, so imported entries keep their keys
         key_hash = hashlib.md5(key_string.encode('utf-8')).hexdigest()
-        
+
         return key_hash
-    
-    def _get_cache_path(self, cache_key):
-        """Get full path to cache file"""
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
-    
+
     def get(self, media_type, title, year=None):
         """
         Retrieve metadata from cache
-        
+
         Args:
             media_type: 'movie' or 'tv_show'
             title: Media title
             year: Optional year
-            
+
         Returns:
             Cached metadata dict or None if not found/expired
         """
         cache_key = self._get_cache_key(media_type, title, year)
-        cache_path = self._get_cache_path(cache_key)
-        
-        # Check if file exists (mode-aware)
-        if KODI_MODE:
-            if not xbmcvfs.exists(cache_path):
-                return None
-        else:
-            if not os.path.exists(cache_path):
-                return None
-        
         try:
-            # Read file (mode-aware)
-            if KODI_MODE:
-                with closing(xbmcvfs.File(cache_path, 'r')) as f:
-                    cache_data = json.loads(f.read())
-            else:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-            
-            # Check if expired
-            if self._is_expired(cache_data):
-                # Clean up expired cache (mode-aware)
-                if KODI_MODE:
-                    xbmcvfs.delete(cache_path)
-                else:
-                    os.remove(cache_path)
-                return None
-            
-            return cache_data.get('metadata')
-            
-        except (json.JSONDecodeError, KeyError, IOError):
-            # Corrupted cache, delete it (mode-aware)
-            try:
-                if KODI_MODE:
-                    xbmcvfs.delete(cache_path)
-                else:
-                    os.remove(cache_path)
-            except:
-                pass
+            row = self._conn().execute(
+                "SELECT metadata FROM metadata WHERE key = ? AND expires > ?",
+                (cache_key, time.time())).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError):
             return None
-    
+
+    def get_many(self, items):
+        """
+        Retrieve metadata for many titles with a few queries
+
+        Args:
+            items: Iterable of (media_type, title, year) tuples
+
+        Returns:
+            Dict mapping each cached (media_type, title, year) tuple to its metadata
+        """
+        items_by_key = {}
+        for item in items:
+            if not item[1]:
+                continue
+            items_by_key.setdefault(self._get_cache_key(*item), []).append(item)
+
+        found = {}
+        keys = list(items_by_key)
+        now = time.time()
+        try:
+            connection = self._conn()
+            for start in range(0, len(keys), _MAX_KEYS_PER_QUERY):
+                chunk = keys[start:start + _MAX_KEYS_PER_QUERY]
+                rows = connection.execute(
+                    "SELECT key, metadata FROM metadata WHERE expires > ? AND key IN (%s)" % ','.join('?' * len(chunk)),
+                    [now] + chunk).fetchall()
+                for key, payload in rows:
+                    metadata = json.loads(payload)
+                    for item in items_by_key[key]:
+                        found[item] = metadata
+        except (sqlite3.Error, ValueError):
+            pass
+        return found
+
     def set(self, media_type, title, metadata, year=None, ttl=None):
         """
         Store metadata in cache
-        
+
         Args:
             media_type: 'movie' or 'tv_show'
             title: Media title
@@ -140,115 +175,70 @@ class MetadataCache:
         """
         if not metadata:
             return
-        
+
         cache_key = self._get_cache_key(media_type, title, year)
-        cache_path = self._get_cache_path(cache_key)
-        
         ttl = ttl if ttl is not None else self.default_ttl
-        
-        cache_data = {
-            'metadata': metadata,
-            'cached_at': time.time(),
-            'ttl': ttl,
-            'media_type': media_type,
-            'title': title,
-            'year': year
-        }
-        
+        now = time.time()
+
         try:
-            # Write file (mode-aware)
-            if KODI_MODE:
-                with closing(xbmcvfs.File(cache_path, 'w')) as f:
-                    f.write(json.dumps(cache_data, indent=2))
-            else:
-                with open(cache_path, 'w', encoding='utf-8') as f:
-                    json.dump(cache_data, f, indent=2)
-        except IOError:
+            with self._write_lock:
+                connection = self._conn()
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO metadata VALUES(?,?,?,?,?,?,?)",
+                        (cache_key, media_type, title, str(year or ''),
+                         json.dumps(metadata, separators=(',', ':')), now, now + ttl))
+        except (sqlite3.Error, TypeError, ValueError):
             # Failed to write cache, not critical
             pass
-    
-    def _is_expired(self, cache_data):
-        """
-        Check if cache entry is expired
-        
-        Args:
-            cache_data: Cache data dict
-            
-        Returns:
-            True if expired, False otherwise
-        """
-        cached_at = cache_data.get('cached_at', 0)
-        ttl = cache_data.get('ttl', self.default_ttl)
-        
-        return (time.time() - cached_at) > ttl
-    
+
+    def is_not_found(self, media_type, title, year=None):
+        """True if TMDb recently had no match for this title"""
+        cache_key = self._get_cache_key(media_type, title, year)
+        try:
+            row = self._conn().execute(
+                "SELECT 1 FROM not_found WHERE key = ? AND expires > ?",
+                (cache_key, time.time())).fetchone()
+            return row is not None
+        except sqlite3.Error:
+            return False
+
+    def mark_not_found(self, media_type, title, year=None, ttl=NOT_FOUND_TTL):
+        """Remember that TMDb had no match for this title"""
+        cache_key = self._get_cache_key(media_type, title, year)
+        try:
+            with self._write_lock:
+                connection = self._conn()
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO not_found VALUES(?,?)", (cache_key, time.time() + ttl))
+        except sqlite3.Error:
+            pass
+
     def clear(self):
         """Clear all cache entries"""
         try:
-            # Get all cache files (mode-aware)
-            if KODI_MODE:
-                dirs, files = xbmcvfs.listdir(self.cache_dir)
-            else:
-                files = os.listdir(self.cache_dir)
-            
-            for filename in files:
-                if filename.endswith('.json'):
-                    file_path = os.path.join(self.cache_dir, filename)
-                    if KODI_MODE:
-                        xbmcvfs.delete(file_path)
-                    else:
-                        os.remove(file_path)
-                    
-        except Exception:
+            connection = self._conn()
+            with connection:
+                connection.execute("DELETE FROM metadata")
+                connection.execute("DELETE FROM not_found")
+        except sqlite3.Error:
             pass
-    
+
     def clear_expired(self):
         """Remove expired cache entries"""
         try:
-            # Get files (mode-aware)
-            if KODI_MODE:
-                dirs, files = xbmcvfs.listdir(self.cache_dir)
-            else:
-                files = os.listdir(self.cache_dir)
-            
-            for filename in files:
-                if not filename.endswith('.json'):
-                    continue
-                
-                file_path = os.path.join(self.cache_dir, filename)
-                
-                try:
-                    # Read file (mode-aware)
-                    if KODI_MODE:
-                        with closing(xbmcvfs.File(file_path, 'r')) as f:
-                            cache_data = json.loads(f.read())
-                    else:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            cache_data = json.load(f)
-                    
-                    if self._is_expired(cache_data):
-                        if KODI_MODE:
-                            xbmcvfs.delete(file_path)
-                        else:
-                            os.remove(file_path)
-                        
-                except:
-                    # Corrupted file, delete it
-                    try:
-                        if KODI_MODE:
-                            xbmcvfs.delete(file_path)
-                        else:
-                            os.remove(file_path)
-                    except:
-                        pass
-                        
-        except Exception:
+            connection = self._conn()
+            with connection:
+                connection.execute("DELETE FROM metadata WHERE expires <= ?", (time.time(),))
+                connection.execute("DELETE FROM not_found WHERE expires <= ?", (time.time(),))
+        except sqlite3.Error:
             pass
-    
+
     def get_stats(self):
         """
         Get cache statistics
-        
+
         Returns:
             Dict with cache stats (total_entries, total_size_mb, expired_count)
         """
@@ -257,120 +247,111 @@ class MetadataCache:
             'total_size_bytes': 0,
             'expired_count': 0
         }
-        
+
         try:
-            # Get files (mode-aware)
-            if KODI_MODE:
-                dirs, files = xbmcvfs.listdir(self.cache_dir)
-            else:
-                files = os.listdir(self.cache_dir)
-            
-            for filename in files:
-                if not filename.endswith('.json'):
-                    continue
-                
-                stats['total_entries'] += 1
-                file_path = os.path.join(self.cache_dir, filename)
-                
-                try:
-                    # Get file size (mode-aware)
-                    if KODI_MODE:
-                        with closing(xbmcvfs.File(file_path, 'r')) as f:
-                            content = f.read()
-                            stats['total_size_bytes'] += len(content)
-                            cache_data = json.loads(content)
-                    else:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            stats['total_size_bytes'] += len(content.encode('utf-8'))
-                            cache_data = json.loads(content)
-                    
-                    # Check if expired
-                    if self._is_expired(cache_data):
-                        stats['expired_count'] += 1
-                except:
-                    pass
-            
-            stats['total_size_mb'] = round(stats['total_size_bytes'] / (1024 * 1024), 2)
-            
-        except Exception:
+            total, size, expired = self._conn().execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(LENGTH(metadata)), 0),
+                       COALESCE(SUM(expires <= ?), 0)
+                FROM metadata
+                """,
+                (time.time(),)).fetchone()
+            stats['total_entries'] = total
+            stats['total_size_bytes'] = size
+            stats['expired_count'] = expired
+            stats['total_size_mb'] = round(size / (1024 * 1024), 2)
+        except sqlite3.Error:
             pass
-        
+
         return stats
 
+    def _import_legacy_cache(self):
+        """Move entries of the old per-title JSON files into the database, then drop the folder"""
+        if not os.path.isdir(LEGACY_CACHE_DIR):
+            return
+
+        rows = []
+        for filename in os.listdir(LEGACY_CACHE_DIR):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(LEGACY_CACHE_DIR, filename), 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                cached_at = cache_data.get('cached_at', 0)
+                ttl = cache_data.get('ttl', self.default_ttl)
+                rows.append((
+                    filename[:-len('.json')],
+                    cache_data.get('media_type') or '',
+                    cache_data.get('title') or '',
+                    str(cache_data.get('year') or ''),
+                    json.dumps(cache_data.get('metadata'), separators=(',', ':')),
+                    cached_at,
+                    cached_at + ttl,
+                ))
+            except (IOError, ValueError, TypeError, AttributeError):
+                # Corrupted file, skipped
+                continue
+
+        try:
+            connection = self._conn()
+            with connection:
+                connection.executemany("INSERT OR IGNORE INTO metadata VALUES(?,?,?,?,?,?,?)", rows)
+                connection.execute("DELETE FROM metadata WHERE expires <= ?", (time.time(),))
+            shutil.rmtree(LEGACY_CACHE_DIR, ignore_errors=True)
+        except sqlite3.Error:
+            pass
+
 
 # Global cache instance
 _cache_instance = None
+_cache_instance_lock = threading.Lock()
 
 def get_cache():
     """Get or create global cache instance"""
     global _cache_instance
-    
-    if _cache_instance is None:
-        # Get TTL from settings (in days, convert to seconds)
-        try:
-            if KODI_MODE:
-                ttl_days = int(ADDON.getSetting('cache_ttl'))
-            else:
-                ttl_days = 30  # Default 30 days in standalone mode
-        except:
-            ttl_days = 30  # Default 30 days
-        
-        ttl_seconds = ttl_days * 24 * 3600
-        _cache_instance = MetadataCache(default_ttl=ttl_seconds)
-    
+
+    with _cache_instance_lock:
+        if _cache_instance is None:
+            # Get TTL from settings (in days, convert to seconds)
+            try:
+                if KODI_MODE:
+                    ttl_days = int(ADDON.getSetting('cache_ttl'))
+                else:
+                    ttl_days = 30  # Default 30 days in standalone mode
+            except:
+                ttl_days = 30  # Default 30 days
+
+            ttl_seconds = ttl_days * 24 * 3600
+            _cache_instance = MetadataCache(default_ttl=ttl_seconds)
+
     return _cache_instance
 
 
 def get_all_cached_movies():
     """
     Get all cached movie metadata (for JLOM matching)
-    
+
     Returns:
         List of dicts with 'metadata' and 'path' keys
     """
     cached_movies = []
-    
+
     try:
-        # Get all cache files (mode-aware)
-        if KODI_MODE:
-            dirs, files = xbmcvfs.listdir(CACHE_DIR)
-        else:
-            files = os.listdir(CACHE_DIR)
-        
-        for filename in files:
-            if not filename.endswith('.json'):
-                continue
-            
-            file_path = os.path.join(CACHE_DIR, filename)
-            
-            try:
-                # Read file (mode-aware)
-                if KODI_MODE:
-                    with closing(xbmcvfs.File(file_path, 'r')) as f:
-                        cache_data = json.loads(f.read())
-                else:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                
-                # Only include movies (not TV shows)
-                if cache_data.get('media_type') == 'movie':
-                    metadata = cache_data.get('metadata', {})
-                    
-                    # Extract path from metadata if available
-                    # Note: This might need adjustment based on actual cache structure
-                    path = metadata.get('file_path', '')
-                    
-                    cached_movies.append({
-                        'metadata': metadata,
-                        'path': path
-                    })
-                    
-            except:
-                # Skip corrupted files
-                continue
-                
-    except Exception:
-        pass
-    
+        cache = get_cache()
+        rows = cache._conn().execute(
+            "SELECT metadata FROM metadata WHERE media_type = 'movie' AND expires > ?",
+            (time.time(),)).fetchall()
+    except sqlite3.Error:
+        return cached_movies
+
+    for (payload,) in rows:
+        try:
+            metadata = json.loads(payload) or {}
+        except ValueError:
+            continue
+        cached_movies.append({
+            'metadata': metadata,
+            'path': metadata.get('file_path', '')
+        })
+
     return cached_movies
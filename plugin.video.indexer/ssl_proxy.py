@@ -6,10 +6,15 @@ Optimized for VERY slow connections / servers:
 - Proper Range support (206 Partial Content) for Kodi seeking/buffering
 - Robust retries with exponential backoff
 - Adaptive chunking + periodic flush
+- Parallel ranged fetches ahead of the playback position, kept in a
+  bounded in-memory segment cache so seeks into fetched regions are local
 """
+import re
 import threading
 import socket
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 from http.server import BaseHTTPRequestHandler
 from socketserver import ThreadingMixIn
 from http.server import HTTPServer
@@ -86,31 +91,443 @@ def _extract_remote_url(headers, path):
     return original_host.rstrip("/") + p
 
 
+# Upstream ranged requests are made in segments of this size
+SEGMENT_SIZE = 1024 * 1024
+# Attempts per segment (the session only retries failed connects/statuses, not short bodies)
+SEGMENT_ATTEMPTS = 2
+# Remote files whose size / range support is remembered
+MAX_KNOWN_FILES = 16
+# Window for the "recent" aggregate throughput
+THROUGHPUT_WINDOW_S = 10
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _addon_int(key, default):
+    try:
+        addon = xbmcaddon.Addon()
+        v = addon.getSetting(key)
+        return int(v) if v not in (None, "", "0") else default
+    except Exception:
+        return default
+
+
+def _addon_bool(key, default):
+    try:
+        addon = xbmcaddon.Addon()
+        v = addon.getSetting(key)
+        if v in ("true", "True", "1", "yes", "Yes", "on", "On"):
+            return True
+        if v in ("false", "False", "0", "no", "No", "off", "Off"):
+            return False
+        return default
+    except Exception:
+        return default
+
+
+class SegmentCache:
+    """
+    Bounded LRU of fetched segments, keyed by (remote_url, segment_index)
+
+    Shared by all client connections, so Kodi's probe request, the playback
+    request and later seeks reuse whatever was already downloaded.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes: Memory budget for segment data
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.segments = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.segments.get(key)
+            if data is not None:
+                self.segments.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self.lock:
+            old = self.segments.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.segments[key] = data
+            self.size += len(data)
+            # Always keep the newest segment, even if it alone exceeds the budget
+            while self.size > self.max_bytes and len(self.segments) > 1:
+                _, evicted = self.segments.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.segments.clear()
+            self.size = 0
+
+
+class ProxyStats:
+    """Upstream throughput and cache efficiency counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.upstream_bytes = 0
+        self.upstream_seconds = 0.0
+        self.segments_fetched = 0
+        self.segment_errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.served_bytes = 0
+        self.relayed_bytes = 0
+        self.recent = deque()
+
+    def record_fetch(self, nbytes, seconds):
+        now = time.monotonic()
+        with self.lock:
+            self.upstream_bytes += nbytes
+            self.upstream_seconds += seconds
+            self.segments_fetched += 1
+            self.recent.append((now, nbytes))
+            while self.recent and self.recent[0][0] < now - THROUGHPUT_WINDOW_S:
+                self.recent.popleft()
+
+    def record_error(self):
+        with self.lock:
+            self.segment_errors += 1
+
+    def record_served(self, nbytes, hit):
+        with self.lock:
+            self.served_bytes += nbytes
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def record_relayed(self, nbytes):
+        with self.lock:
+            self.relayed_bytes += nbytes
+
+    def snapshot(self):
+        """
+        Returns:
+            Dict of counters plus derived rates (KB/s) and the cache hit ratio
+        """
+        now = time.monotonic()
+        with self.lock:
+            recent_bytes = sum(n for t, n in self.recent if t >= now - THROUGHPUT_WINDOW_S)
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'upstream_bytes': self.upstream_bytes,
+                'segments_fetched': self.segments_fetched,
+                'segment_errors': self.segment_errors,
+                'served_bytes': self.served_bytes,
+                'relayed_bytes': self.relayed_bytes,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'cache_hit_ratio': round(self.cache_hits / lookups, 3) if lookups else 0.0,
+                # Average speed of a single upstream connection
+                'connection_kbps': round(self.upstream_bytes / 1024 / self.upstream_seconds, 1)
+                if self.upstream_seconds else 0.0,
+                # All parallel connections together, over the last few seconds
+                'recent_kbps': round(recent_bytes / 1024 / THROUGHPUT_WINDOW_S, 1),
+            }
+
+
+class RemoteFile:
+    """
+    Segmented view of one remote file that supports byte ranges
+
+    Segments are fetched by the shared worker pool with ranged GETs; each
+    segment has at most one request in flight, whichever connection asked first.
+    """
+
+    def __init__(self, fetcher, url, headers, size, response_headers, timeout):
+        """
+        Args:
+            fetcher: Owning SegmentedFetcher (pool, cache, stats)
+            url: Remote URL
+            headers: Upstream request headers (without Range)
+            size: Total file size in bytes
+            response_headers: Content-Type / Last-Modified / ETag to send to clients
+            timeout: (connect, read) timeout for segment requests
+        """
+        self.fetcher = fetcher
+        self.url = url
+        self.headers = headers
+        self.size = size
+        self.response_headers = response_headers
+        self.timeout = timeout
+        self.inflight = {}
+        # Segment index -> tokens of the connections waiting for / reading ahead to it
+        self.wanted = {}
+        self.lock = threading.Lock()
+
+    @property
+    def last_index(self):
+        return (self.size - 1) // SEGMENT_SIZE
+
+    def segment_bounds(self, index):
+        start = index * SEGMENT_SIZE
+        return start, min(self.size, start + SEGMENT_SIZE) - 1
+
+    def _download(self, index):
+        start, end = self.segment_bounds(index)
+        session = _SESSION if _SESSION else requests
+        headers = dict(self.headers, Range=f"bytes={start}-{end}")
+        for attempt in range(1, SEGMENT_ATTEMPTS + 1):
+            began = time.monotonic()
+            try:
+                resp = session.get(self.url, headers=headers, verify=False,
+                                   timeout=self.timeout, allow_redirects=True)
+                data = resp.content
+                if resp.status_code != 206 or len(data) != end - start + 1:
+                    raise IOError(f"HTTP {resp.status_code}, {len(data)} of {end - start + 1} bytes")
+            except (IOError, requests.RequestException) as e:
+                self.fetcher.stats.record_error()
+                if attempt == SEGMENT_ATTEMPTS:
+                    xbmc.log(f"[SSL Proxy] Segment {index} of {self.url} failed: {e}", xbmc.LOGWARNING)
+                    raise
+                continue
+            self.fetcher.stats.record_fetch(len(data), time.monotonic() - began)
+            self.fetcher.cache.put((self.url, index), data)
+            return data
+
+    def _forget(self, index, future):
+        with self.lock:
+            if self.inflight.get(index) is future:
+                del self.inflight[index]
+                self.wanted.pop(index, None)
+
+    def schedule(self, index, owner):
+        """
+        Queue a segment fetch unless it is cached or already queued
+
+        Args:
+            index: Segment index
+            owner: Token of the client connection that wants the segment
+
+        Returns:
+            The segment's future, or None if it is already cached
+        """
+        with self.lock:
+            future = self.inflight.get(index)
+            if future is not None:
+                self.wanted[index].add(owner)
+                return future
+            if self.fetcher.cache.get((self.url, index)) is not None:
+                return None
+            future = self.fetcher.executor.submit(self._download, index)
+            self.inflight[index] = future
+            self.wanted[index] = {owner}
+        future.add_done_callback(lambda f, i=index: self._forget(i, f))
+        return future
+
+    def _release(self, owner, keep=lambda index: False):
+        """Drop owner's claim on queued segments outside keep(); cancel those nobody else wants"""
+        with self.lock:
+            orphaned = []
+            for index, owners in self.wanted.items():
+                if owner in owners and not keep(index):
+                    owners.discard(owner)
+                    if not owners:
+                        orphaned.append(self.inflight[index])
+        for future in orphaned:
+            future.cancel()
+
+    def prefetch(self, index, last_index, owner):
+        """
+        Queue the segments from index on, up to the read-ahead window
+
+        Queued fetches this connection left behind by a seek are cancelled
+        so the new position does not wait for them, unless another
+        connection (Kodi often reads the index near the end of the file
+        while playing) still wants them. Running fetches still complete
+        into the cache.
+        """
+        window_end = min(last_index, index + self.fetcher.read_ahead)
+        self._release(owner, keep=lambda i: index <= i <= window_end)
+        for i in range(index, window_end + 1):
+            self.schedule(i, owner)
+
+    def read_segment(self, index, owner):
+        """
+        Segment data, from the cache or by waiting for its fetch
+
+        Returns:
+            (data, hit) where hit is True if the segment was already cached
+
+        Raises:
+            IOError / requests.RequestException if the segment cannot be fetched
+        """
+        hit = True
+        while True:
+            data = self.fetcher.cache.get((self.url, index))
+            if data is not None:
+                return data, hit
+            hit = False
+            future = self.schedule(index, owner)
+            if future is None:
+                continue
+            try:
+                data = future.result()
+            except CancelledError:
+                # Cancelled just before this connection claimed it; queue it again
+                continue
+            return data, hit
+
+    def cancel_pending(self, owner=None):
+        """Cancel owner's queued read-ahead, or every queued fetch if owner is None"""
+        if owner is not None:
+            self._release(owner)
+            return
+        with self.lock:
+            pending = list(self.inflight.values())
+        for future in pending:
+            future.cancel()
+
+
+class SegmentedFetcher:
+    """
+    Worker pool, segment cache and stats shared by the proxy's connections
+
+    Remote files are probed with a ranged request for the first segment a
+    client needs; hosts that answer without 206 / Content-Range are
+    remembered and relayed as a plain stream instead.
+    """
+
+    def __init__(self, connections, cache_mb):
+        """
+        Args:
+            connections: Parallel upstream requests
+            cache_mb: Segment cache budget in MB
+        """
+        cache_bytes = max(cache_mb, 8) * 1024 * 1024
+        self.connections = max(1, connections)
+        # Read ahead two segments per connection, but never more than half the cache
+        self.read_ahead = max(1, min(self.connections * 2, cache_bytes // SEGMENT_SIZE // 2))
+        self.cache = SegmentCache(cache_bytes)
+        self.stats = ProxyStats()
+        self.executor = ThreadPoolExecutor(max_workers=self.connections)
+        self.files = OrderedDict()
+        self.lock = threading.Lock()
+
+    def open(self, url, headers, offset, timeout):
+        """
+        Get the RemoteFile for url, probing it on first use
+
+        Args:
+            url: Remote URL
+            headers: Upstream request headers (without Range)
+            offset: First byte the client wants; its segment is used as the probe
+            timeout: (connect, read) timeout for upstream requests
+
+        Returns:
+            RemoteFile, or None if the host does not serve byte ranges
+        """
+        with self.lock:
+            remote = self.files.get(url)
+            if remote is not None:
+                self.files.move_to_end(url)
+        if remote is False:
+            return None
+        if remote is not None:
+            remote.headers = headers
+            remote.timeout = timeout
+            return remote
+
+        remote = self._probe(url, headers, offset, timeout)
+        if remote is not None:
+            remote = self._remember(url, remote)
+        return remote
+
+    def _remember(self, url, remote):
+        """Register remote for url; a file another connection probed meanwhile wins, so both share its fetches"""
+        with self.lock:
+            known = self.files.get(url)
+            if known:
+                return known
+            self.files[url] = remote
+            while len(self.files) > MAX_KNOWN_FILES:
+                self.files.popitem(last=False)
+            return remote
+
+    def _probe(self, url, headers, offset, timeout):
+        session = _SESSION if _SESSION else requests
+        index = offset // SEGMENT_SIZE
+        start = index * SEGMENT_SIZE
+        began = time.monotonic()
+        resp = session.get(url, headers=dict(headers, Range=f"bytes={start}-{start + SEGMENT_SIZE - 1}"),
+                           verify=False, stream=True, timeout=timeout, allow_redirects=True)
+        try:
+            match = _CONTENT_RANGE_RE.match(resp.headers.get("Content-Range", ""))
+            if resp.status_code != 206 or not match or int(match.group(1)) != start:
+                # 416 (offset past the end) and server errors say nothing about range support
+                if resp.status_code < 300:
+                    xbmc.log(f"[SSL Proxy] No range support ({resp.status_code}), relaying {url}", xbmc.LOGINFO)
+                    self._remember(url, False)
+                return None
+            data = resp.content
+        finally:
+            resp.close()
+
+        size = int(match.group(3))
+        response_headers = {k: resp.headers[k] for k in ("Content-Type", "Last-Modified", "ETag")
+                            if k in resp.headers}
+        remote = RemoteFile(self, url, headers, size, response_headers, timeout)
+        if len(data) == remote.segment_bounds(index)[1] - start + 1:
+            self.stats.record_fetch(len(data), time.monotonic() - began)
+            self.cache.put((url, index), data)
+        xbmc.log(f"[SSL Proxy] Segmented {url}: {size} bytes, {self.connections} connections", xbmc.LOGINFO)
+        return remote
+
+    def shutdown(self):
+        with self.lock:
+            files = [f for f in self.files.values() if f]
+            self.files.clear()
+        for remote in files:
+            remote.cancel_pending()
+        self.executor.shutdown(wait=False)
+        self.cache.clear()
+
+
+def _parse_range(header, size):
+    """
+    Parse a single-range Range header against the file size
+
+    Returns:
+        (start, end) inclusive, 'unsatisfiable', or None for no/unsupported Range
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
 class ProxyRequestHandler(BaseHTTPRequestHandler):
     # Reduce noise; log to Kodi
     def log_message(self, fmt, *args):
         xbmc.log(f"[SSL Proxy] {fmt % args}", xbmc.LOGDEBUG)
 
-    def _addon_int(self, key, default):
-        try:
-            addon = xbmcaddon.Addon()
-            v = addon.getSetting(key)
-            return int(v) if v not in (None, "", "0") else default
-        except Exception:
-            return default
-
-    def _addon_bool(self, key, default):
-        try:
-            addon = xbmcaddon.Addon()
-            v = addon.getSetting(key)
-            if v in ("true", "True", "1", "yes", "Yes", "on", "On"):
-                return True
-            if v in ("false", "False", "0", "no", "No", "off", "Off"):
-                return False
-            return default
-        except Exception:
-            return default
-
     def _proxy(self, method):
         if not requests:
             self.send_error(500, "requests module not available")
@@ -129,11 +546,11 @@ class ProxyRequestHandler(BaseHTTPRequestHandler):
         # Also keep User-Agent/Accept/Accept-Encoding etc.
 
         # Tunables for slow servers
-        connect_timeout = self._addon_int("ssl_proxy_connect_timeout_s", 20)
-        read_timeout = self._addon_int("ssl_proxy_read_timeout_s", 180)  # slow drip
-        initial_buffer_kb = self._addon_int("ssl_proxy_buffer_kb", 256)  # smaller default for slow
-        flush_every_kb = self._addon_int("ssl_proxy_flush_every_kb", 256)
-        adaptive_chunks = self._addon_bool("ssl_proxy_adaptive_chunks", True)
+        connect_timeout = _addon_int("ssl_proxy_connect_timeout_s", 20)
+        read_timeout = _addon_int("ssl_proxy_read_timeout_s", 180)  # slow drip
+        initial_buffer_kb = _addon_int("ssl_proxy_buffer_kb", 256)  # smaller default for slow
+        flush_every_kb = _addon_int("ssl_proxy_flush_every_kb", 256)
+        adaptive_chunks = _addon_bool("ssl_proxy_adaptive_chunks", True)
 
         timeout = (connect_timeout, read_timeout)
         session = _SESSION if _SESSION else requests
@@ -154,6 +571,11 @@ class ProxyRequestHandler(BaseHTTPRequestHandler):
                 self.end_headers()
                 return
 
+            fetcher = getattr(self.server, "fetcher", None)
+            if fetcher and _addon_bool("ssl_proxy_segmented", True):
+                if self._serve_segmented(fetcher, remote_url, out_headers, timeout):
+                    return
+
             # GET (streaming)
             resp = session.get(
                 remote_url,
@@ -181,14 +603,18 @@ class ProxyRequestHandler(BaseHTTPRequestHandler):
 
             buffered = bytearray()
             sent_since_flush = 0
+            relayed = 0
             last_progress = time.time()
 
-            for data in resp.iter_content(chunk_size=chunk):
+            # Read the raw stream directly: iter_content would keep the first chunk size
+            while True:
+                data = self._read_chunk(resp, chunk)
                 if not data:
-                    continue
+                    break
 
                 # Update “progress” timestamp
                 last_progress = time.time()
+                relayed += len(data)
 
                 if min_buffer > 0:
                     buffered.extend(data)
@@ -223,6 +649,8 @@ class ProxyRequestHandler(BaseHTTPRequestHandler):
             except Exception:
                 pass
 
+            if fetcher:
+                fetcher.stats.record_relayed(relayed)
             xbmc.log(f"[SSL Proxy] OK {remote_url}", xbmc.LOGDEBUG)
 
         except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
@@ -241,6 +669,99 @@ class ProxyRequestHandler(BaseHTTPRequestHandler):
             except Exception:
                 pass
 
+    def _serve_segmented(self, fetcher, remote_url, headers, timeout):
+        """
+        Serve a GET from the segment cache, fetching missing segments in parallel
+
+        Args:
+            fetcher: Server's SegmentedFetcher
+            remote_url: Remote URL
+            headers: Upstream request headers
+            timeout: (connect, read) timeout
+
+        Returns:
+            False, with nothing sent, if the request or host can't be served in segments
+        """
+        client_range = (self.headers.get("Range") or "").strip()
+        range_match = _RANGE_RE.match(client_range)
+        if client_range and not range_match:
+            # Multiple ranges etc. are left to the upstream server
+            return False
+
+        headers = {k: v for k, v in headers.items() if k.lower() not in ("range", "if-range")}
+        # Segments are byte ranges of the file itself, not of a compressed body
+        headers["Accept-Encoding"] = "identity"
+        offset = int(range_match.group(1)) if range_match and range_match.group(1) else 0
+        try:
+            remote = fetcher.open(remote_url, headers, offset, timeout)
+        except requests.RequestException as e:
+            xbmc.log(f"[SSL Proxy] Range probe failed, relaying instead: {e}", xbmc.LOGWARNING)
+            return False
+        if remote is None:
+            return False
+
+        byte_range = _parse_range(client_range, remote.size)
+        if byte_range == 'unsatisfiable':
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{remote.size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        if byte_range is None:
+            start, end = 0, remote.size - 1
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{remote.size}")
+        for k, v in remote.response_headers.items():
+            self.send_header(k, v)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        last_index = end // SEGMENT_SIZE
+        owner = object()
+        began = time.monotonic()
+        pos = start
+        try:
+            while pos <= end:
+                index = pos // SEGMENT_SIZE
+                remote.prefetch(index, last_index, owner)
+                data, hit = remote.read_segment(index, owner)
+                segment_start = index * SEGMENT_SIZE
+                piece = memoryview(data)[pos - segment_start:end - segment_start + 1]
+                self._safe_write(piece)
+                fetcher.stats.record_served(len(piece), hit)
+                self.wfile.flush()
+                pos += len(piece)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            xbmc.log("[SSL Proxy] Client disconnected", xbmc.LOGDEBUG)
+        except (IOError, requests.RequestException) as e:
+            # Headers are already sent; closing short makes Kodi retry from pos
+            xbmc.log(f"[SSL Proxy] Segment fetch failed at byte {pos}: {e}", xbmc.LOGERROR)
+        finally:
+            # Seek, stop or error: this connection's read-ahead is no longer needed
+            remote.cancel_pending(owner)
+            stats = fetcher.stats.snapshot()
+            xbmc.log(
+                f"[SSL Proxy] Served {(pos - start) / 1048576:.1f} MB of {remote_url} in "
+                f"{time.monotonic() - began:.1f}s (cache hit ratio {stats['cache_hit_ratio']:.0%}, "
+                f"upstream {stats['recent_kbps']} KB/s over {fetcher.connections} connections, "
+                f"{stats['connection_kbps']} KB/s per connection)",
+                xbmc.LOGINFO,
+            )
+        return True
+
+    @staticmethod
+    def _read_chunk(resp, size):
+        """Read up to size decoded bytes from a streamed response"""
+        try:
+            return resp.raw.read(size, decode_content=True)
+        except urllib3.exceptions.HTTPError as e:
+            # Same exception iter_content would have raised
+            raise requests.exceptions.ConnectionError(e)
+
     def _forward_headers(self, headers):
         # Don’t forward hop-by-hop headers
         skip = {
@@ -272,6 +793,7 @@ class SSLProxyServer:
     def __init__(self, port=8765):
         self.port = port
         self.server = None
+        self.fetcher = None
         self.thread = None
         self.running = False
         self._lock = threading.Lock()
@@ -303,6 +825,11 @@ class SSLProxyServer:
                     self.port = available
 
                 self.server = ThreadingHTTPServer(("localhost", self.port), ProxyRequestHandler)
+                self.fetcher = SegmentedFetcher(
+                    _addon_int("ssl_proxy_connections", 4),
+                    _addon_int("ssl_proxy_cache_mb", 64),
+                )
+                self.server.fetcher = self.fetcher
 
                 # Socket tuning (helpful on slow links)
                 self.server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 512 * 1024)
@@ -335,6 +862,10 @@ class SSLProxyServer:
                     self.server.server_close()
                 if self.thread and self.thread.is_alive():
                     self.thread.join(timeout=2.0)
+                if self.fetcher:
+                    xbmc.log(f"[SSL Proxy] Stats: {self.fetcher.stats.snapshot()}", xbmc.LOGINFO)
+                    self.fetcher.shutdown()
+                    self.fetcher = None
             finally:
                 self.running = False
                 xbmc.log("[SSL Proxy] Stopped", xbmc.LOGINFO)
@@ -342,6 +873,10 @@ class SSLProxyServer:
     def is_running(self):
         return self.running
 
+    def get_stats(self):
+        """Throughput and segment cache counters (see ProxyStats.snapshot), or None if stopped"""
+        return self.fetcher.stats.snapshot() if self.fetcher else None
+
     def get_proxy_url(self, original_url):
         if not self.running:
             return original_url
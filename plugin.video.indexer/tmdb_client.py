@@ -0,0 +1,206 @@
+"""
+TMDb Client Module
+Shared keep-alive session, token-bucket rate limiting and request
+coalescing for the TMDb lookups made by scan workers
+"""
+import threading
+import time
+
+import requests
+import xbmc
+
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+# TMDb allows roughly 50 requests per second per IP; stay comfortably below it
+REQUESTS_PER_SECOND = 30
+BURST = 10
+# 429 responses are retried (after Retry-After) at most this many times per request
+MAX_RATE_LIMIT_RETRIES = 3
+REQUEST_TIMEOUT = 15
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all workers
+
+    A 429 pauses the whole bucket, so every worker backs off together
+    instead of each one hitting the limit again.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+
+class _InflightLookup:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class TMDbClient:
+    """
+    TMDb API client shared by the scan workers
+
+    Concurrent lookups of the same (media_type, title, year) wait for one
+    in-flight request, and results (including 'not found') are remembered
+    for the life of the client, so every episode of a show costs one lookup.
+    """
+
+    def __init__(self, api_key, max_retries=0):
+        """
+        Args:
+            api_key: TMDb API key
+            max_retries: Extra attempts after a network error
+        """
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(REQUESTS_PER_SECOND, BURST)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=20)
+        self.session.mount('https://', adapter)
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.results = {}
+        self.not_found = set()
+
+    @staticmethod
+    def _lookup_key(media_type, title, year):
+        return media_type, (title or '').lower().strip(), str(year or '')
+
+    def _get(self, path, params):
+        """GET an API path, honouring the rate limit. Raises requests.RequestException"""
+        params = dict(params, api_key=self.api_key)
+        network_attempts = 0
+        rate_limit_retries = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = self.session.get(f"{TMDB_BASE_URL}{path}", params=params, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                network_attempts += 1
+                if network_attempts > self.max_retries:
+                    raise
+                wait_time = 2 ** network_attempts
+                xbmc.log(f"[TMDb] Network error on {path}: {e}. Retrying in {wait_time}s...", xbmc.LOGWARNING)
+                time.sleep(wait_time)
+                continue
+
+            if response.status_code == 429:
+                rate_limit_retries += 1
+                if rate_limit_retries > MAX_RATE_LIMIT_RETRIES:
+                    response.raise_for_status()
+                try:
+                    wait_time = float(response.headers.get('Retry-After', ''))
+                except ValueError:
+                    wait_time = 2 ** rate_limit_retries
+                xbmc.log(f"[TMDb] Rate limited on {path}. Pausing all requests for {wait_time}s...", xbmc.LOGWARNING)
+                self.bucket.pause(wait_time)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    def search(self, search_type, title, year=None):
+        """Search results for a title ('movie' or 'tv')"""
+        params = {'query': title, 'language': 'en-US'}
+        if year:
+            params['year'] = year
+        return self._get(f"/search/{search_type}", params).get('results', [])
+
+    def details(self, search_type, tmdb_id):
+        """Details of a title, with its videos appended in the same request"""
+        return self._get(f"/{search_type}/{tmdb_id}", {'language': 'en-US', 'append_to_response': 'videos'})
+
+    def is_not_found(self, media_type, title, year):
+        return self._lookup_key(media_type, title, year) in self.not_found
+
+    def mark_not_found(self, media_type, title, year):
+        with self.lock:
+            self.not_found.add(self._lookup_key(media_type, title, year))
+
+    def lookup(self, media_type, title, year, fetch):
+        """
+        Run fetch() once per (media_type, title, year)
+
+        Callers asking for a title that is already being fetched wait for
+        that request; later callers get the remembered result. A None result
+        is only remembered when the title was marked as not found, so
+        network failures are retried by the next caller.
+
+        Args:
+            media_type: 'movie' or 'tv_show'
+            title: Title as parsed from the file name
+            year: Optional year
+            fetch: Callable returning the metadata dict or None
+        """
+        key = self._lookup_key(media_type, title, year)
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+            if key in self.not_found:
+                return None
+            call = self.inflight.get(key)
+            is_owner = call is None
+            if is_owner:
+                call = _InflightLookup()
+                self.inflight[key] = call
+
+        if not is_owner:
+            call.event.wait()
+            return call.result
+
+        try:
+            call.result = fetch()
+            if call.result is not None:
+                with self.lock:
+                    self.results[key] = call.result
+            return call.result
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            call.event.set()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(api_key, max_retries=0):
+    """Get the shared client, recreating it when the API key changes"""
+    global _client
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            _client = TMDbClient(api_key, max_retries)
+        _client.max_retries = max_retries
+        return _client
@@ -388,7 +388,9 @@ def _get_stream_from_tmdbmovies(tmdb_id, media_type, season=None, episode=None):
         # Fallback: use local copies (ext_scraper.py, ext_player.py, ext_config.py)
         try:
             from resources.lib.ext_scraper import get_stream_data, get_external_ids
-            from resources.lib.ext_player import sort_streams_for_autoplay, check_url_validity
+            from resources.lib.ext_player import (
+                AutoplayStreamPicker, sort_streams_for_autoplay, check_url_validity
+            )
             log("[RESOLVERS] Using LOCAL copy of resolvers")
             
             # Get IMDB ID
@@ -408,14 +410,21 @@ def _get_stream_from_tmdbmovies(tmdb_id, media_type, season=None, episode=None):
             content_type = "tv" if media_type == "tv" else "movie"
             log(f"[RESOLVERS] Starting local scrape: imdb={imdb_id} type={content_type}")
 
+            # Autoplay needs one good stream: stop scraping at the first preferred one that answers
+            picker = AutoplayStreamPicker(profile_idx=0)
             streams, failed, canceled = get_stream_data(
                 imdb_id, content_type,
                 season=int(season) if season else None,
                 episode=int(episode) if episode else None,
                 progress_callback=None,
-                target_providers=None
+                target_providers=None,
+                stream_callback=picker
             )
 
+            if picker.chosen:
+                provider = picker.chosen.get("name", "") or picker.chosen.get("provider_id", "")
+                return picker.chosen.get("url", ""), f"local_{provider}"
+
             if not streams:
                 log("[RESOLVERS] No streams found (local)")
                 return None, None
@@ -427,7 +436,7 @@ def _get_stream_from_tmdbmovies(tmdb_id, media_type, season=None, episode=None):
             for i in range(max_attempts):
                 stream = sorted_streams[i]
                 url = stream.get("url", "")
-                if not url:
+                if not url or url in picker.checked:
                     continue
                 provider = stream.get("name", "") or stream.get("provider_id", "")
                 quality = stream.get("quality", "SD")
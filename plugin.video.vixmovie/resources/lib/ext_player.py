@@ -144,3 +144,54 @@ def sort_streams_for_autoplay(streams, profile_idx=0):
 
     # Default fallback
     return sort_streams_by_quality(streams)
+
+
+def is_preferred_autoplay_stream(stream, profile_idx=0):
+    """
+    True when a stream would land in the first group of sort_streams_for_autoplay
+    for this profile: VAPlayer/MeowTV/VixSrc on Windows, 1080p+ on Android
+    (4K only on the 4K profile).
+    """
+    if not sort_streams_for_autoplay([stream], profile_idx):
+        return False
+
+    if profile_idx == 0:
+        provider_id = stream.get('provider_id', '').lower()
+        raw_name = stream.get('name', '').lower()
+        return any(key in provider_id or key in raw_name for key in ('vaplayer', 'meow', 'vix'))
+
+    quality = stream.get('quality', '').lower()
+    if profile_idx == 1 and ('4k' in quality or '2160' in quality):
+        return True
+    return '1080' in quality
+
+
+class AutoplayStreamPicker:
+    """
+    stream_callback for get_stream_data: checks preferred streams as they
+    arrive and stops the scan at the first one that answers. URLs already
+    checked are remembered so the caller's fallback loop can skip them.
+    """
+
+    def __init__(self, profile_idx=0, max_checks=5, max_timeout=8):
+        self.profile_idx = profile_idx
+        self.max_checks = max_checks
+        self.max_timeout = max_timeout
+        self.chosen = None
+        self.checked = set()
+
+    def __call__(self, new_streams, all_streams):
+        for stream in sort_streams_for_autoplay(new_streams, self.profile_idx):
+            if len(self.checked) >= self.max_checks:
+                break
+            url = stream.get('url', '')
+            if not url or url in self.checked:
+                continue
+            if not is_preferred_autoplay_stream(stream, self.profile_idx):
+                continue
+            self.checked.add(url)
+            if check_url_validity(url, max_timeout=self.max_timeout):
+                log(f"[AUTOPLAY] Early pick: [{stream.get('quality', 'SD')}] {stream.get('name', '')}")
+                self.chosen = stream
+                return False
+        return True
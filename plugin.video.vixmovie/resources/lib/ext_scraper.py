@@ -11,6 +11,7 @@ import concurrent.futures
 from urllib.parse import urlencode, quote, urlparse
 from resources.lib.ext_config import BASE_URL, API_KEY, ADDON, get_headers, get_random_ua
 from resources.lib.ext_utils import get_json, clean_text
+from resources.lib import sources_cache
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -5753,9 +5754,36 @@ def scrape_vaplayer(imdb_id, content_type, season=None, episode=None, title_quer
 # =============================================================================
 # MAIN ORCHESTRATION FUNCTION (PARALLEL / MULTITHREADING)
 # =============================================================================
-def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_callback=None, target_providers=None):
+def _refresh_providers_in_background(cache_key, providers, run_provider, normalize_result):
+    """
+    Stale-while-revalidate: sursele expirate au fost deja afișate din cache,
+    aici doar rescanăm acei provideri și actualizăm cache-ul.
+    """
+    def worker():
+        refreshed = {}
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(providers), MAX_WORKERS)) as pool:
+                for pid, pname, result, success, error in pool.map(run_provider, providers):
+                    if error:
+                        # Păstrăm sursele vechi din cache; o eroare trecătoare nu înseamnă "nimic găsit"
+                        log(f"[SCRAPER] Reîmprospătare eșuată pentru {pname}, păstrăm cache-ul")
+                        continue
+                    refreshed[pid] = normalize_result(pid, pname, result) if success else []
+        except Exception as e:
+            log(f"[SCRAPER] Background refresh error: {e}")
+        sources_cache.save_provider_results(cache_key, refreshed)
+        log(f"[SCRAPER] Cache reîmprospătat în fundal pentru {len(refreshed)} provideri")
+
+    threading.Thread(target=worker, name="vixmovie-sources-refresh", daemon=True).start()
+
+
+def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_callback=None, target_providers=None, stream_callback=None):
     """
     Orchestrează scanarea PARALELĂ (Multithreading).
+
+    stream_callback(new_streams, all_streams) primește sursele pe măsură ce
+    apar (întâi cele din cache, apoi fiecare provider terminat); dacă întoarce
+    False, scanarea se oprește și se returnează ce s-a găsit până atunci.
     """
     all_streams = []
     seen_urls = set()
@@ -5775,7 +5803,11 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
         for scraper in title_based_scrapers
     )
     
-    if needs_title:
+    cached_title = sources_cache.get_title(imdb_id, content_type) if needs_title else None
+    if cached_title:
+        extra_title, extra_year = cached_title
+        log(f"[SCRAPER] Title from cache: '{extra_title}' ({extra_year})")
+    elif needs_title:
         try:
             imdb_str = str(imdb_id)
             if imdb_str.startswith('tt'):
@@ -5798,6 +5830,7 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
                     extra_year = dt[:4] if dt else ""
                     
             log(f"[SCRAPER] Title resolved safely: '{extra_title}' ({extra_year})")
+            sources_cache.save_title(imdb_id, content_type, extra_title, extra_year)
         except Exception as e:
             log(f"[SCRAPER] Could not resolve title from TMDB: {e}")
 
@@ -5856,17 +5889,94 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
             if pid in debrid_providers or (http_master_enabled and ADDON.getSetting(setting_id) == 'true'):
                 to_run.append((pid, pname, pfunc))
     
-    total_providers = len(to_run)
-    if total_providers == 0:
+    if not to_run:
         return [], [], False
 
+    def normalize_result(pid, pname, result):
+        """Lista de surse valide a unui provider, cu câmpurile standard completate."""
+        items_to_add = []
+        if isinstance(result, dict):
+            items_to_add = [result]
+        elif isinstance(result, list):
+            items_to_add = result
+
+        normalized = []
+        for item in items_to_add:
+            if not isinstance(item, dict): continue
+            url = item.get('url', '')
+            if not url or not isinstance(url, str): continue
+
+            item.setdefault('name', pname)
+            item.setdefault('quality', 'SD')
+            item.setdefault('title', '')
+
+            orig_info = item.get('info')
+            if not isinstance(orig_info, dict):
+                item['info'] = {'original_info_str': str(orig_info) if orig_info else ''}
+
+            item['provider_id'] = pid
+            normalized.append(item)
+        return normalized
+
+    def merge_streams(items):
+        added_count = 0
+        for item in items:
+            clean_url = item['url'].split('|')[0]
+            if filter_duplicates:
+                if clean_url in seen_urls: continue
+                seen_urls.add(clean_url)
+            all_streams.append(item)
+            added_count += 1
+        return added_count
+
+    # --- CACHE: sursele salvate apar imediat, doar providerii lipsă se scanează ---
+    # target_providers = rescanare cerută explicit, deci ocolim cache-ul.
+    cache_key = sources_cache.content_key(imdb_id, content_type, season, episode)
+    cached_results = {}
+    if target_providers is None:
+        cached_results = sources_cache.load_provider_results(cache_key, [p[0] for p in to_run])
+
+    to_refresh = []
+    to_fetch = []
+    for provider in to_run:
+        pid, pname = provider[0], provider[1]
+        if pid not in cached_results:
+            to_fetch.append(provider)
+            continue
+        streams, is_fresh = cached_results[pid]
+        if not is_fresh:
+            to_refresh.append(provider)
+        if merge_streams(normalize_result(pid, pname, streams)) == 0:
+            failed_providers.append(pid)
+
+    if cached_results:
+        log(f"[SCRAPER] Cache: {len(cached_results)} provideri ({len(to_refresh)} expirați), "
+            f"{len(all_streams)} surse, {len(to_fetch)} de scanat")
+
+    def emit_streams(new_streams):
+        """True dacă stream_callback a cerut oprirea scanării."""
+        if not stream_callback or not new_streams:
+            return False
+        try:
+            return stream_callback(list(new_streams), all_streams) is False
+        except Exception as e:
+            log(f"[SCRAPER] stream_callback error: {e}")
+            return False
+
+    stopped_early = emit_streams(all_streams)
+
     # 4. FUNCȚIA WRAPPER PENTRU THREAD
+    started_at = {}
+    durations = {}
+
     def run_provider(provider_info):
         """
         Execută un provider și returnează rezultatele.
-        Returnează: (pid, pname, result, success)
+        Returnează: (pid, pname, result, success, error)
+        error=True când providerul a aruncat o excepție (nu e un rezultat gol)
         """
         pid, pname, pfunc = provider_info
+        started_at[pid] = time.time()
         
         try:
             # Executăm funcția providerului
@@ -5875,25 +5985,38 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
             # Verificăm dacă avem rezultate valide
             if result:
                 # Poate fi listă, dict, sau alt format
-                return (pid, pname, result, True)  # success=True
+                return (pid, pname, result, True, False)  # success=True
             else:
                 # Provider-ul nu a găsit nimic
-                return (pid, pname, None, False)  # success=False
+                return (pid, pname, None, False, False)  # success=False
             
         except Exception as e:
             log(f"[THREAD] Error in {pname}: {e}")
-            return (pid, pname, None, False)  # success=False (eroare)
+            return (pid, pname, None, False, True)  # success=False (eroare)
+        finally:
+            durations[pid] = time.time() - started_at[pid]
 
     # 5. EXECUȚIE PARALELĂ - OPTIMIZATĂ CU STATUS ÎN TIMP REAL
     try: MAX_TIMEOUT = int(ADDON.getSetting('scraper_timeout'))
     except: MAX_TIMEOUT = 25
     
     MAX_WORKERS = 15  # Crescut pentru mai multă paralelizare
-    
-    import time
+
+    if to_refresh:
+        _refresh_providers_in_background(cache_key, to_refresh, run_provider, normalize_result)
+
+    total_providers = len(to_fetch)
+    if total_providers == 0 or stopped_early:
+        log(f"[SCRAPER] Finalizat din cache: {len(all_streams)} surse")
+        return all_streams, failed_providers, was_canceled
+
+    # Timeout per provider din istoricul latențelor (p90 x 1.5), plafonat de scraper_timeout
+    timeouts = sources_cache.provider_timeouts([p[0] for p in to_fetch], MAX_TIMEOUT)
+    fetched_results = {}
+    timed_out = {}
     executor = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
     try:
-        future_to_provider = {executor.submit(run_provider, p): p for p in to_run}
+        future_to_provider = {executor.submit(run_provider, p): p for p in to_fetch}
         
         futures_list = list(future_to_provider.keys())
         finished_futures = set()
@@ -5901,15 +6024,28 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
         
         try:
             # Loop cu polling non-blocant (0.25 secunde) pentru actualizare GUI cursivă
-            while len(finished_futures) < len(futures_list):
-                elapsed = time.time() - start_time
+            while len(finished_futures) < len(futures_list) and not stopped_early:
+                now = time.time()
+                elapsed = now - start_time
                 if elapsed > MAX_TIMEOUT:
                     log(f"[SCRAPER] Global timeout forțat ({MAX_TIMEOUT}s)")
                     break
-                    
+
+                # Providerii care își depășesc timeout-ul adaptiv sunt abandonați
+                for future in futures_list:
+                    if future in finished_futures or future.done():
+                        continue
+                    pid, pname = future_to_provider[future][0], future_to_provider[future][1]
+                    started = started_at.get(pid)
+                    if started is not None and now - started > timeouts[pid]:
+                        finished_futures.add(future)
+                        timed_out[pid] = now - started
+                        failed_providers.append(pid)
+                        log(f"[SCRAPER] ✗ {pname}: Timeout adaptiv ({timeouts[pid]:.1f}s)")
+
                 # Așteptăm 0.25 sec pentru a nu bloca interfața Kodi
                 done, not_done = concurrent.futures.wait(
-                    futures_list, 
+                    [f for f in futures_list if f not in finished_futures],
                     timeout=0.25, 
                     return_when=concurrent.futures.FIRST_COMPLETED
                 )
@@ -5959,45 +6095,26 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
                 for future in newly_done:
                     finished_futures.add(future)
                     try:
-                        pid, pname, result, success = future.result()
+                        pid, pname, result, success, error = future.result()
                         
                         if not success:
+                            # Doar un rezultat gol real se salvează; erorile nu intră în cache
+                            if not error:
+                                fetched_results[pid] = []
                             failed_providers.append(pid)
                             log(f"[SCRAPER] ✗ {pname}: eșuat sau fără rezultate")
                             continue
                         
                         if result:
-                            items_to_add = []
-                            if isinstance(result, dict):
-                                items_to_add = [result]
-                            elif isinstance(result, list):
-                                items_to_add = result
-                            
-                            added_count = 0
-                            for item in items_to_add:
-                                if not isinstance(item, dict): continue
-                                url = item.get('url', '')
-                                if not url or not isinstance(url, str): continue
-                                
-                                clean_url = url.split('|')[0]
-                                if filter_duplicates:
-                                    if clean_url in seen_urls: continue
-                                    seen_urls.add(clean_url)
-                                
-                                item.setdefault('name', pname)
-                                item.setdefault('quality', 'SD')
-                                item.setdefault('title', '')
-                                
-                                orig_info = item.get('info')
-                                if not isinstance(orig_info, dict):
-                                    item['info'] = {'original_info_str': str(orig_info) if orig_info else ''}
-                                    
-                                item['provider_id'] = pid
-                                all_streams.append(item)
-                                added_count += 1
+                            normalized = normalize_result(pid, pname, result)
+                            fetched_results[pid] = normalized
+                            added_count = merge_streams(normalized)
                             
                             if added_count > 0:
                                 log(f"[SCRAPER] ✓ {pname}: {added_count} surse adăugate")
+                                if emit_streams(all_streams[-added_count:]):
+                                    stopped_early = True
+                                    log(f"[SCRAPER] Oprire anticipată după {pname}")
                             else:
                                 failed_providers.append(pid)
 
@@ -6013,10 +6130,16 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
             log(f"[SCRAPER] Fatal error in execution loop: {e}")
 
         # La final, dacă au rămas unii blocați după Timeout, îi marcăm ca eșuați
+        # (la oprirea anticipată ceilalți provideri nu au eșuat, doar nu mai contează)
         for future in futures_list:
-            if not future.done():
+            if not future.done() and future not in finished_futures and not stopped_early:
                 pid = future_to_provider[future][0]
                 pname = future_to_provider[future][1]
+                # Doar depășirea propriului timeout e un eșantion valid de latență;
+                # o oprire globală sau anularea utilizatorului ar salva timpi prea mici.
+                elapsed = time.time() - started_at[pid] if pid in started_at else None
+                if not was_canceled and elapsed is not None and elapsed > timeouts[pid]:
+                    timed_out[pid] = elapsed
                 if pid not in failed_providers:
                     failed_providers.append(pid)
                     log(f"[SCRAPER] ✗ {pname}: Timeout!")
@@ -6026,5 +6149,11 @@ def get_stream_data(imdb_id, content_type, season=None, episode=None, progress_c
         except Exception:
             executor.shutdown(wait=False)
 
+    # Providerii expirați prin timeout nu se salvează; ceilalți (inclusiv "nimic găsit") da.
+    sources_cache.save_provider_results(cache_key, fetched_results)
+    latencies = {pid: durations[pid] for pid in fetched_results if pid in durations}
+    latencies.update(timed_out)
+    sources_cache.record_provider_latencies(latencies)
+
     log(f"[SCRAPER] Finalizat: {len(all_streams)} surse, {len(failed_providers)} provideri eșuați")
     return all_streams, failed_providers, was_canceled
\ No newline at end of file
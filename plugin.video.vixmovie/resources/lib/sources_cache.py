@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Persistent cache for scraper results and TMDb titles.
+
+Provider results are stored per (content, provider) so reopening a title can
+show the last known sources at once; each provider has its own TTL, and an
+expired entry is still served (stale) while the provider is re-scanned,
+except for tokenised links, which are rescanned like uncached providers.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import xbmcaddon
+import xbmcvfs
+
+ADDON = xbmcaddon.Addon()
+PROFILE_PATH = xbmcvfs.translatePath(ADDON.getAddonInfo("profile"))
+SOURCES_DB = os.path.join(PROFILE_PATH, "sources_cache.db")
+
+# Signed/tokenised stream links die fast; debrid and addon links live longer.
+DEFAULT_PROVIDER_TTL = 3600
+PROVIDER_TTLS = {
+    'vixsrc': 1800,
+    'vidlink': 1800,
+    'vaplayer': 1800,
+    'vsembed': 1800,
+    'videasy': 1800,
+    'netmirror': 1800,
+    'castle': 1800,
+    'vidmody': 1800,
+    'aiostreams': 6 * 3600,
+    'torrentio': 6 * 3600,
+    'mediafusion': 6 * 3600,
+    'comet': 6 * 3600,
+    'meteor': 6 * 3600,
+}
+# A provider that found nothing is not asked again for this long.
+EMPTY_RESULT_TTL = 900
+# Past TTL an entry is still shown while it refreshes, up to this age.
+MAX_STALE_AGE = 24 * 3600
+# Signed/tokenised links are dead past their TTL: never served stale, rescanned instead.
+TOKENISED_PROVIDERS = {
+    'vixsrc', 'vidlink', 'vaplayer', 'vsembed', 'videasy', 'netmirror', 'castle', 'vidmody',
+}
+TITLE_TTL = 30 * 24 * 3600
+# Per-provider timeout = this percentile of recent scan times, times the margin.
+LATENCY_SAMPLES = 20
+LATENCY_PERCENTILE = 0.9
+LATENCY_MARGIN = 1.5
+MIN_PROVIDER_TIMEOUT = 4
+
+_lock = threading.Lock()
+
+
+def _ensure_profile():
+    """Ensure the profile directory exists."""
+    if not xbmcvfs.exists(PROFILE_PATH):
+        xbmcvfs.mkdirs(PROFILE_PATH)
+
+
+def _conn():
+    """Get a database connection, creating tables if needed."""
+    _ensure_profile()
+    c = sqlite3.connect(SOURCES_DB, timeout=5)
+    c.execute("""CREATE TABLE IF NOT EXISTS provider_results (
+                    content_key TEXT,
+                    provider_id TEXT,
+                    streams TEXT,
+                    fetched_at INTEGER,
+                    PRIMARY KEY (content_key, provider_id))""")
+    c.execute("""CREATE TABLE IF NOT EXISTS tmdb_titles (
+                    imdb_id TEXT,
+                    content_type TEXT,
+                    title TEXT,
+                    year TEXT,
+                    fetched_at INTEGER,
+                    PRIMARY KEY (imdb_id, content_type))""")
+    c.execute("""CREATE TABLE IF NOT EXISTS provider_latency (
+                    provider_id TEXT,
+                    recorded_at REAL,
+                    seconds REAL,
+                    PRIMARY KEY (provider_id, recorded_at))""")
+    return c
+
+
+def content_key(imdb_id, content_type, season=None, episode=None):
+    return f"{content_type}:{imdb_id}:{season or 0}:{episode or 0}"
+
+
+def provider_ttl(provider_id, streams):
+    if not streams:
+        return EMPTY_RESULT_TTL
+    return PROVIDER_TTLS.get(provider_id, DEFAULT_PROVIDER_TTL)
+
+
+def max_stale_age(provider_id, streams):
+    """Age after which an entry is not shown at all (its provider is scanned again)."""
+    if streams and provider_id in TOKENISED_PROVIDERS:
+        return provider_ttl(provider_id, streams)
+    return MAX_STALE_AGE
+
+
+# ---------- Provider results ----------
+
+def load_provider_results(key, provider_ids):
+    """Return {provider_id: (streams, is_fresh)} for cached, not-too-old entries."""
+    provider_ids = list(provider_ids)
+    if not provider_ids:
+        return {}
+    try:
+        c = _conn()
+        rows = c.execute(
+            "SELECT provider_id, streams, fetched_at FROM provider_results "
+            "WHERE content_key=? AND provider_id IN (%s)" % ",".join("?" * len(provider_ids)),
+            [key] + provider_ids).fetchall()
+        c.close()
+    except Exception:
+        return {}
+
+    now = time.time()
+    cached = {}
+    for provider_id, payload, fetched_at in rows:
+        age = now - (fetched_at or 0)
+        if age >= MAX_STALE_AGE:
+            continue
+        try:
+            streams = json.loads(payload) or []
+        except Exception:
+            continue
+        if age >= max_stale_age(provider_id, streams):
+            continue
+        cached[provider_id] = (streams, age < provider_ttl(provider_id, streams))
+    return cached
+
+
+def save_provider_results(key, results):
+    """Store {provider_id: streams} (an empty list records 'nothing found')."""
+    if not results:
+        return
+    now = int(time.time())
+    rows = []
+    for provider_id, streams in results.items():
+        try:
+            rows.append((key, provider_id, json.dumps(streams or [], default=str), now))
+        except Exception:
+            continue
+    try:
+        with _lock:
+            c = _conn()
+            c.executemany(
+                "INSERT OR REPLACE INTO provider_results VALUES (?,?,?,?)", rows)
+            c.commit()
+            c.close()
+    except Exception:
+        pass
+
+
+# ---------- TMDb titles ----------
+
+def get_title(imdb_id, content_type):
+    """Return (title, year) if cached and fresh, else None."""
+    try:
+        c = _conn()
+        row = c.execute(
+            "SELECT title, year, fetched_at FROM tmdb_titles WHERE imdb_id=? AND content_type=?",
+            (str(imdb_id), content_type)).fetchone()
+        c.close()
+    except Exception:
+        return None
+    if not row or time.time() - (row[2] or 0) >= TITLE_TTL:
+        return None
+    return row[0] or "", row[1] or ""
+
+
+def save_title(imdb_id, content_type, title, year):
+    if not title:
+        return
+    try:
+        with _lock:
+            c = _conn()
+            c.execute(
+                "INSERT OR REPLACE INTO tmdb_titles VALUES (?,?,?,?,?)",
+                (str(imdb_id), content_type, title, year or "", int(time.time())))
+            c.commit()
+            c.close()
+    except Exception:
+        pass
+
+
+# ---------- Provider latency ----------
+
+def record_provider_latencies(samples):
+    """Store {provider_id: seconds} and keep only the last LATENCY_SAMPLES per provider."""
+    if not samples:
+        return
+    now = time.time()
+    try:
+        with _lock:
+            c = _conn()
+            c.executemany(
+                "INSERT OR REPLACE INTO provider_latency VALUES (?,?,?)",
+                [(pid, now, float(seconds)) for pid, seconds in samples.items()])
+            for pid in samples:
+                c.execute(
+                    "DELETE FROM provider_latency WHERE provider_id=? AND recorded_at NOT IN "
+                    "(SELECT recorded_at FROM provider_latency WHERE provider_id=? "
+                    "ORDER BY recorded_at DESC LIMIT ?)",
+                    (pid, pid, LATENCY_SAMPLES))
+            c.commit()
+            c.close()
+    except Exception:
+        pass
+
+
+def provider_timeouts(provider_ids, max_timeout):
+    """
+    Return {provider_id: seconds} from each provider's latency history:
+    the 90th percentile with a safety margin, clamped to [MIN, max_timeout].
+    Providers without history get max_timeout.
+    """
+    provider_ids = list(provider_ids)
+    timeouts = {pid: float(max_timeout) for pid in provider_ids}
+    if not provider_ids:
+        return timeouts
+    try:
+        c = _conn()
+        rows = c.execute(
+            "SELECT provider_id, seconds FROM provider_latency WHERE provider_id IN (%s)"
+            % ",".join("?" * len(provider_ids)),
+            provider_ids).fetchall()
+        c.close()
+    except Exception:
+        return timeouts
+
+    history = {}
+    for pid, seconds in rows:
+        history.setdefault(pid, []).append(seconds)
+    for pid, values in history.items():
+        if len(values) < 3:
+            continue
+        values.sort()
+        index = min(len(values) - 1, int(round(LATENCY_PERCENTILE * (len(values) - 1))))
+        timeout = values[index] * LATENCY_MARGIN
+        timeouts[pid] = max(float(MIN_PROVIDER_TIMEOUT), min(float(max_timeout), timeout))
+    return timeouts